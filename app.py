@@ -1,13 +1,23 @@
-from flask import Flask, render_template, jsonify, request, session, send_file
+from flask import Flask, render_template, jsonify, request, session, send_file, redirect
+import hmac
 import os
 import uuid
 import csv
 import io
 import logging
-import base64
+import math
+import threading
+import time
 from datetime import datetime, timedelta, timezone
-import requests
+from functools import wraps
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
+from utils.auth_helper import admin_required
+from utils.rolling_stats import LatencyWindow
+from utils.rate_limit import RateLimiter, Throttled
+from utils.sql_trace import tracer
+from utils.stream_shards import ShardPool
+from config import Config
 
 # Load environment variables from .env file if present
 load_dotenv()
@@ -23,25 +33,49 @@ logger = logging.getLogger(__name__)
 # Initialize Flask App
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "ai-master-pro-secure-key-2026")
+if Config.TRUSTED_PROXIES:
+    # remote_addr becomes the client address as reported by the trusted proxies
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXIES)
 
 # Global variables for systems
 model_a = None
 manager_system = None
+signal_cache = None
+screenshot_reader = None
 IS_VERCEL = "VERCEL" in os.environ
+APP_STARTED_AT = time.time()
+# Recent /api/get-signal latencies for the readiness probe
+signal_latency = LatencyWindow(size=1024)
+# Per-session / per-user backpressure on the write and training endpoints
+rate_limiter = RateLimiter(Config.RATE_LIMITS, user_factor=Config.RATE_LIMIT_USER_FACTOR)
+_warmup = None
+# Owning shards for non-default streams (started on first use)
+stream_pool = None
+_stream_pool_lock = threading.Lock()
 
 def get_systems():
-    global model_a, manager_system
+    global model_a, manager_system, signal_cache
     try:
         from models.model_a_core import ModelACore
-        from utils.db_manager import init_db
+        from utils.db_manager import init_db, get_history_store
         from utils.multi_manager import MultiManagerSystem
+        from utils.signal_cache import SignalPrecomputer
         
         if model_a is None:
+            # Idempotent: creates the DB or adds tables introduced since it was built
+            init_db()
+            get_history_store()
             model_a = ModelACore()
-            if not os.path.exists(model_a.db_path):
-                init_db()
         if manager_system is None:
             manager_system = MultiManagerSystem(model_a, model_a.db_path)
+        if signal_cache is None:
+            m_a, m_s = model_a, manager_system
+            signal_cache = SignalPrecomputer(
+                compute=lambda: m_s.process_signal(m_a.predict()),
+                # Data revision as reflected by the manager: it moves only once record_result
+                # (or a reload) has the new trade, so a signal is never cached on stale stats
+                key_fn=lambda: (m_a.get_model_version(), m_s.sync())
+            )
         return model_a, manager_system
     except Exception as e:
         logger.error(f"System Init Error: {e}", exc_info=True)
@@ -49,7 +83,8 @@ def get_systems():
 
 # Helper imports that are safe
 try:
-    from utils.db_manager import add_trade, get_recent_trades, delete_trade, get_total_trades_count, archive_all_trades, get_session_trades
+    from utils.db_manager import add_trade, add_trades, get_recent_trades, delete_trade, get_total_trades_count, archive_all_trades, get_session_trades, get_trade_changes, get_trade_frame, get_query_stats, SQL_TRACE
+    from utils.db_manager import DB_PATH, DEFAULT_STREAM, valid_stream_id, stream_context, stream_exists
 except Exception as e:
     logger.error(f"Utility Import Error: {e}")
 
@@ -62,6 +97,73 @@ def ensure_session():
     if "user_id" not in session:
         session["user_id"] = "guest_user"
 
+@app.before_request
+def begin_sql_trace():
+    if SQL_TRACE: tracer.begin_request()
+
+@app.after_request
+def end_sql_trace(response):
+    """With SQL_TRACE=1, reports the statements this request ran (on its own thread) in response headers."""
+    if SQL_TRACE:
+        statements, ms = tracer.end_request(request.endpoint)
+        response.headers["X-SQL-Queries"] = str(statements)
+        response.headers["X-SQL-Time-Ms"] = f"{ms:.1f}"
+    return response
+
+def get_stream_pool():
+    global stream_pool
+    if stream_pool is None:
+        with _stream_pool_lock:
+            if stream_pool is None:
+                if Config.STREAM_SHARDS and int(os.environ.get("WEB_CONCURRENCY", 1)) > 1:
+                    logger.warning("Stream shards need a single web worker process: every worker starts its own pool")
+                stream_pool = ShardPool(Config.STREAM_SHARDS, DB_PATH, Config.STREAM_CALL_TIMEOUT, Config.STREAM_SHARD_THREADS)
+    return stream_pool
+
+def request_stream():
+    """
+    The stream a request targets (?stream=, X-Stream-Id header or JSON stream_id);
+    None for the default stream, which is served by this process. Raises ValueError
+    if malformed and LookupError if it isn't one of Config.STREAMS.
+    """
+    stream = request.args.get("stream") or request.headers.get("X-Stream-Id")
+    if not stream and request.is_json:
+        stream = (request.get_json(silent=True) or {}).get("stream_id")
+    if not stream or stream == DEFAULT_STREAM: return None
+    if not valid_stream_id(stream):
+        raise ValueError("Invalid stream id.")
+    if stream not in Config.STREAMS:
+        raise LookupError(f"Unknown stream: {stream}")
+    return stream
+
+def stream_error(e):
+    """400 for a malformed stream id, 404 for an unknown one."""
+    return jsonify({"status": "error", "message": str(e)}), 404 if isinstance(e, LookupError) else 400
+
+def stream_has_no_data():
+    # Reads never create a stream's database; its first result does
+    return jsonify({"status": "error", "message": "Stream has no data yet."}), 404
+
+def rate_limited(endpoint):
+    """Applies Config.RATE_LIMITS[endpoint] to the caller's session and user; refusals get 429 + Retry-After."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not Config.RATE_LIMITS_ENABLED:
+                return f(*args, **kwargs)
+            user = session.get("user_id", "guest_user")
+            if user == "guest_user":
+                # Guests share one user id, so their user-level key is the client address
+                user = f"ip:{request.remote_addr}"
+            try:
+                with rate_limiter.limit(endpoint, f"session:{session.get('session_id')}", f"user:{user}"):
+                    return f(*args, **kwargs)
+            except Throttled as e:
+                retry_after = max(1, math.ceil(e.retry_after))
+                return jsonify({"status": "error", "message": str(e), "retry_after": retry_after}), 429, {"Retry-After": str(retry_after)}
+        return wrapper
+    return decorator
+
 @app.route("/health")
 def health_check():
     m_a, _ = get_systems()
@@ -70,6 +172,91 @@ def health_check():
         "is_vercel": IS_VERCEL
     })
 
+def _start_warmup():
+    # Readiness never initializes inline; it starts one background warm-up instead
+    global _warmup
+    if model_a is None and (_warmup is None or not _warmup.is_alive()):
+        _warmup = threading.Thread(target=get_systems, name="warmup", daemon=True)
+        _warmup.start()
+
+def _db_latency_ms():
+    start = time.perf_counter()
+    conn = None
+    try:
+        from utils.db_manager import get_db_connection
+        conn = get_db_connection()
+        conn.execute("SELECT MAX(id) FROM epochs").fetchone()
+        return round((time.perf_counter() - start) * 1000, 2)
+    except Exception as e:
+        logger.error(f"Health DB Probe Error: {e}")
+        return None
+    finally:
+        if conn: conn.close()
+
+def _health_metrics():
+    from utils.db_manager import get_writer_stats
+    now = time.time()
+    writer = get_writer_stats()
+    return {
+        "db_latency_ms": _db_latency_ms(),
+        "writer_queue_depth": writer["queue_depth"],
+        "writer_last_commit_ms": writer["last_commit_ms"],
+        "writer_errors": writer["errors"],
+        "model_version": model_a.model_version,
+        "model_age_s": round(now - model_a.model_updated_at, 1) if model_a.model_updated_at else None,
+        "since_training_s": round(now - model_a.last_trained_at, 1) if model_a.last_trained_at else None,
+        "rebuild": model_a.rebuild_status.get("state"),
+        "signal_cache_hit_ratio": signal_cache.hit_ratio(),
+        "signal_cache": dict(signal_cache.stats),
+        "corrections_cached": len(model_a.corrections) if model_a.corrections is not None else None,
+        "signal_p50_ms": signal_latency.percentile(50),
+        "signal_p99_ms": signal_latency.percentile(99),
+        "signal_samples": len(signal_latency.samples),
+        "throttled": rate_limiter.throttled_total(),
+        "rate_limits": {endpoint: dict(stats) for endpoint, stats in rate_limiter.stats.items()},
+        "stream_calls": dict(stream_pool.stats) if stream_pool else None
+    }
+
+@app.route("/health/live")
+def liveness():
+    """Process is up and answering; never loads the model."""
+    return jsonify({
+        "status": "alive",
+        "uptime_s": round(time.time() - APP_STARTED_AT, 1),
+        "model_loaded": model_a is not None,
+        "is_vercel": IS_VERCEL
+    })
+
+@app.route("/health/ready")
+def readiness():
+    """503 while warming up or when a metric exceeds its Config.READY_* threshold."""
+    if model_a is None or signal_cache is None:
+        _start_warmup()
+        return jsonify({"status": "not_ready", "failed": ["model_loading"], "metrics": {}}), 503
+    
+    metrics = _health_metrics()
+    limits = [
+        ("db_latency_ms", Config.READY_MAX_DB_LATENCY_MS),
+        ("writer_queue_depth", Config.READY_MAX_WRITER_QUEUE),
+        ("signal_p99_ms", Config.READY_MAX_SIGNAL_P99_MS),
+        ("since_training_s", Config.READY_MAX_TRAINING_AGE_S),
+        ("model_age_s", Config.READY_MAX_MODEL_AGE_S)
+    ]
+    failed = [name for name, limit in limits if limit and metrics[name] is not None and metrics[name] > limit]
+    if metrics["db_latency_ms"] is None: failed.append("db_unreachable")
+    thresholds = {name: limit for name, limit in limits}
+    return jsonify({
+        "status": "ready" if not failed else "not_ready",
+        "failed": failed,
+        "metrics": metrics,
+        "thresholds": thresholds
+    }), 200 if not failed else 503
+
+def recent_accuracy(last=50):
+    """Accuracy over the completed trades among the last `last` live trades."""
+    completed, correct = get_trade_frame().accuracy(last=last)
+    return round(correct / completed * 100, 1) if completed else 0.0
+
 @app.route("/")
 def dashboard():
     try:
@@ -78,9 +265,7 @@ def dashboard():
         
         recent_trades = get_recent_trades(10)
         total_collected = get_total_trades_count()
-        all_trades = get_recent_trades(50)
-        completed_trades = [t for t in all_trades if t["actual_result"] is not None]
-        accuracy = round((sum(1 for t in completed_trades if t["ai_prediction"] == t["actual_result"]) / len(completed_trades)) * 100, 1) if completed_trades else 0.0
+        accuracy = recent_accuracy()
         
         loss_streak = m_s.analyze_loss_streak()
         
@@ -98,46 +283,92 @@ def dashboard():
 @app.route("/api/dashboard-data", methods=["GET"])
 def get_dashboard_data():
     try:
-        recent_trades = get_recent_trades(10)
+        stream = request_stream()
+    except (ValueError, LookupError) as e:
+        return stream_error(e)
+    try:
+        # Clients that sync the list through /api/trades pass ?trades=0
+        with_trades = request.args.get("trades", "1") != "0"
+        if stream:
+            data = get_stream_pool().call(stream, "dashboard", with_trades)
+            if data is None: return stream_has_no_data()
+            return jsonify(dict(status="success", **data))
+        recent_trades = get_recent_trades(10) if with_trades else None
         total_collected = get_total_trades_count()
-        all_trades = get_recent_trades(50)
-        completed_trades = [t for t in all_trades if t["actual_result"] is not None]
-        accuracy = round((sum(1 for t in completed_trades if t["ai_prediction"] == t["actual_result"]) / len(completed_trades)) * 100, 1) if completed_trades else 0.0
+        accuracy = recent_accuracy()
         
         _, m_s = get_systems()
-        results = m_s.get_recent_results(20)
-        vol_score, vol_status = m_s.calculate_volatility(results)
+        vol_score, vol_status = m_s.calculate_volatility()
         loss_streak = m_s.analyze_loss_streak()
         
-        return jsonify({
+        data = {
             "status": "success",
-            "trades": recent_trades,
             "total_collected": total_collected,
             "accuracy": accuracy,
             "volatility_score": vol_score,
             "volatility_status": vol_status,
             "loss_streak": loss_streak,
             "learning_percent": 100
-        })
+        }
+        if recent_trades is not None:
+            data["trades"] = recent_trades
+        return jsonify(data)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route("/api/trades", methods=["GET"])
+def get_trades_delta():
+    """
+    Incremental trade sync: ?since=<cursor> returns only rows inserted, changed or
+    deleted after the cursor; ?fields=a,b projects columns; ?limit caps new rows.
+    """
+    try:
+        stream = request_stream() or DEFAULT_STREAM
+    except (ValueError, LookupError) as e:
+        return stream_error(e)
+    if not stream_exists(stream):
+        return stream_has_no_data()
+    try:
+        since = request.args.get("since", 0, type=int)
+        limit = min(request.args.get("limit", 10, type=int), 500)
+        fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()] or None
+        # Reads only: any process can serve a stream's trade list from its database
+        with stream_context(stream):
+            changes = get_trade_changes(since, limit, fields)
+        return jsonify(dict(status="success", **changes))
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route("/api/get-signal", methods=["GET"])
 def get_signal():
+    start = time.perf_counter()
     try:
-        m_a, m_s = get_systems()
-        raw_signal = m_a.predict()
-        processed_signal = m_s.process_signal(raw_signal)
+        stream = request_stream()
+    except (ValueError, LookupError) as e:
+        return stream_error(e)
+    try:
+        if stream:
+            processed_signal = get_stream_pool().call(stream, "signal")
+            if processed_signal is None: return stream_has_no_data()
+        else:
+            get_systems()
+            # Usually precomputed right after the last result; recomputed if stale
+            processed_signal = signal_cache.get()
+        signal_latency.record((time.perf_counter() - start) * 1000)
         
         trade_id = str(uuid.uuid4())[:8]
         session["last_signal"] = {
+            "stream_id": stream or DEFAULT_STREAM,
             "trade_id": trade_id,
             "prediction": processed_signal["prediction"],
             "confidence": processed_signal["confidence"],
-            "source": processed_signal["source"]
+            "source": processed_signal["source"],
+            # Each strategy's own vote, so the result can update every strategy's weight
+            "votes": {s: d["pred"] for s, d in processed_signal.get("details", {}).items()}
         }
         return jsonify({
             "status": "success",
+            "stream_id": stream or DEFAULT_STREAM,
             "trade_id": trade_id,
             "prediction": processed_signal["prediction"],
             "confidence": processed_signal["confidence"],
@@ -154,13 +385,20 @@ def get_signal():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route("/api/submit-result", methods=["POST"])
+@rate_limited("submit_result")
 def submit_result():
     data = request.json
     actual_result = data.get("result")
     if not actual_result or actual_result not in ["BIG", "SMALL"]:
         return jsonify({"status": "error", "message": "Invalid result."}), 400
+    try:
+        stream = request_stream()
+    except (ValueError, LookupError) as e:
+        return stream_error(e)
     
     last_signal = session.get("last_signal")
+    if last_signal and last_signal.get("stream_id", DEFAULT_STREAM) != (stream or DEFAULT_STREAM):
+        last_signal = None # The pending signal was for another stream
     trade_data = {
         "user_id": session.get("user_id", "guest_user"),
         "session_id": session.get("session_id"),
@@ -172,62 +410,290 @@ def submit_result():
     }
     
     try:
-        if add_trade(trade_data):
-            m_a, _ = get_systems()
-            m_a.train_from_db()
+        votes = last_signal.get("votes") if last_signal else None
+        if stream:
+            # The owning shard stores the result and trains the stream's model
+            if get_stream_pool().call(stream, "submit", trade_data, votes):
+                session.pop("last_signal", None)
+                return jsonify({"status": "success", "message": "Result submitted."}), 200
+            return jsonify({"status": "error", "message": "Failed to save."}), 500
+        m_a, m_s = get_systems()
+        # Training runs inside the trade's write transaction and persists only changed model rows
+        revision = add_trade(trade_data, then=lambda conn: m_a.train_from_db(conn=conn, votes=votes, actual=actual_result))
+        if revision:
+            m_s.record_result(trade_data, revision)
+            signal_cache.schedule()
             session.pop("last_signal", None)
             return jsonify({"status": "success", "message": "Result submitted."}), 200
         return jsonify({"status": "error", "message": "Failed to save."}), 500
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def save_bulk_results(pattern, stream=None):
+    """Stores a list of BIG/SMALL results (oldest first) as initial trades and trains once."""
+    ist_now = datetime.now(tz=timezone(timedelta(hours=5, minutes=30)))
+    trades = []
+    for i, result in enumerate(pattern):
+        trades.append({
+            "user_id": session.get("user_id", "guest_user"),
+            "session_id": session.get("session_id"),
+            "trade_id": f"INIT-{str(uuid.uuid4())[:4]}",
+            "timestamp": (ist_now + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "ai_prediction": "INITIAL",
+            "ai_confidence": 0.0,
+            "signal_source": "Bulk Pattern Input",
+            "actual_result": result
+        })
+    if stream:
+        return get_stream_pool().call(stream, "bulk", trades)
+    m_a, m_s = get_systems()
+    saved = add_trades(trades, then=lambda conn: m_a.train_from_db(conn=conn))
+    for trade_data, ok in zip(trades, saved):
+        if ok: m_s.record_result(trade_data)
+    signal_cache.schedule()
+    return sum(1 for ok in saved if ok)
+
 @app.route("/api/save-bulk-pattern", methods=["POST"])
+@rate_limited("save_bulk_pattern")
 def save_bulk_pattern():
     data = request.json
     pattern = data.get("pattern", [])
     try:
-        ist_now = datetime.now(tz=timezone(timedelta(hours=5, minutes=30)))
-        for i, result in enumerate(pattern):
-            trade_data = {
-                "user_id": session.get("user_id", "guest_user"),
-                "session_id": session.get("session_id"),
-                "trade_id": f"INIT-{str(uuid.uuid4())[:4]}",
-                "timestamp": (ist_now + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"),
-                "ai_prediction": "INITIAL",
-                "ai_confidence": 0.0,
-                "signal_source": "Bulk Pattern Input",
-                "actual_result": result
-            }
-            add_trade(trade_data)
-        m_a, _ = get_systems()
-        m_a.train_from_db()
+        stream = request_stream()
+    except (ValueError, LookupError) as e:
+        return stream_error(e)
+    try:
+        save_bulk_results(pattern, stream)
         return jsonify({"status": "success", "message": f"{len(pattern)} patterns saved."}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def get_screenshot_reader():
+    global screenshot_reader
+    if screenshot_reader is None:
+        from utils.screenshot_reader import ScreenshotReader
+        workers = int(os.environ.get("SCREENSHOT_WORKERS", 0)) or None
+        screenshot_reader = ScreenshotReader(workers=workers)
+    return screenshot_reader
+
+@app.route("/api/ocr-screenshot", methods=["POST"])
+@rate_limited("ocr_screenshot")
+def ocr_screenshot():
+    """
+    Reads BIG/SMALL results from an uploaded result-history screenshot, locally.
+    Returns them newest first as B/S; with save=1 they are also stored via the bulk-pattern path.
+    """
+    from utils.screenshot_reader import ScreenshotBusy
+    try:
+        stream = request_stream()
+    except (ValueError, LookupError) as e:
+        return stream_error(e)
+    upload = request.files.get("file")
+    if not upload:
+        return jsonify({"status": "error", "message": "No screenshot uploaded."}), 400
+    reader = get_screenshot_reader()
+    data = upload.read(reader.max_bytes + 1)
+    try:
+        results = reader.read(data)
+    except ScreenshotBusy as e:
+        return jsonify({"status": "error", "message": str(e)}), 503
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if not results:
+        return jsonify({"status": "error", "message": "No BIG/SMALL results found in the screenshot."}), 422
+    
+    saved = 0
+    if request.form.get("save") in ("1", "true"):
+        try:
+            saved = save_bulk_results(["BIG" if r == "B" else "SMALL" for r in reversed(results)], stream)
+        except Exception as e:
+            logger.error(f"Screenshot Save Error: {e}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"status": "success", "results": results, "count": len(results), "saved": saved}), 200
+
 @app.route("/api/undo-trade", methods=["POST"])
+@rate_limited("undo_trade")
 def undo_trade():
     trade_id = request.json.get("trade_id")
     try:
-        delete_trade(trade_id)
-        m_a, _ = get_systems()
-        m_a.train_from_db()
+        stream = request_stream()
+    except (ValueError, LookupError) as e:
+        return stream_error(e)
+    try:
+        if stream:
+            get_stream_pool().call(stream, "undo", trade_id)
+            return jsonify({"status": "success", "message": "Deleted."}), 200
+        m_a, m_s = get_systems()
+        if delete_trade(trade_id, then=lambda conn: m_a.train_from_db(conn=conn)):
+            m_s.forget_result(trade_id)
+        signal_cache.schedule()
         return jsonify({"status": "success", "message": "Deleted."}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route("/api/new-session", methods=["POST"])
+@rate_limited("new_session")
 def new_session():
     try:
-        archive_all_trades()
-        m_a, _ = get_systems()
-        m_a.train_from_db(include_archived=True)
+        stream = request_stream()
+    except (ValueError, LookupError) as e:
+        return stream_error(e)
+    try:
+        if stream:
+            get_stream_pool().call(stream, "new_session")
+        else:
+            m_a, m_s = get_systems()
+            archive_all_trades(then=lambda conn: m_a.train_from_db(include_archived=True, conn=conn))
+            m_s.reset_session()
+            signal_cache.schedule()
         session.pop("last_signal", None)
         session["session_id"] = str(uuid.uuid4())
         return jsonify({"status": "success", "message": "New Session Started!"}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def _days_ago(days):
+    # Rollup buckets are IST date strings like the trade timestamps
+    return (datetime.now(tz=timezone(timedelta(hours=5, minutes=30))) - timedelta(days=days)).strftime("%Y-%m-%d")
+
+@app.route("/admin/login", methods=["GET", "POST"])
+def admin_login():
+    error = None
+    if request.method == "POST":
+        if hmac.compare_digest(request.form.get("password", "").encode(), Config.ADMIN_PASSWORD.encode()):
+            session["is_admin"] = True
+            target = request.args.get("next", "/admin")
+            # Only local paths: never bounce to another site
+            return redirect(target if target.startswith("/") and not target.startswith("//") else "/admin")
+        logger.warning(f"Failed admin login from {request.remote_addr}")
+        error = "Wrong password."
+    return render_template("admin/login.html", error=error), 401 if error else 200
+
+@app.route("/admin/logout", methods=["POST"])
+def admin_logout():
+    session.pop("is_admin", None)
+    return redirect("/")
+
+@app.route("/admin")
+@admin_required
+def admin_panel():
+    try:
+        from utils.analytics import get_rollup_summary, get_trades_page
+        get_systems()
+        sources = get_rollup_summary("source")
+        total = sum(s["total"] for s in sources)
+        correct = sum(s["correct"] for s in sources)
+        recent = get_rollup_summary("source", since=_days_ago(30))
+        users = get_rollup_summary("user", since=_days_ago(7))
+        page = get_trades_page(before=request.args.get("before", type=int))
+        return render_template("admin/panel.html",
+                               global_accuracy=round(correct * 100.0 / total, 1) if total else 0.0,
+                               signals_30d=sum(s["total"] for s in recent),
+                               active_users=len(users),
+                               sources=sources,
+                               trades=page["items"],
+                               next_before=page["next"])
+    except Exception as e:
+        logger.error(f"Admin Panel Error: {e}", exc_info=True)
+        return f"Internal Server Error: {str(e)}", 500
+
+@app.route("/api/admin/analytics", methods=["GET"])
+@admin_required
+def admin_analytics():
+    """Rollup rows (period=hour|day, dimension=source|user|confidence), keyset-paginated via `after`."""
+    from utils.analytics import get_rollups
+    args = request.args
+    try:
+        since = args.get("since") or (_days_ago(args.get("days", type=int)) if args.get("days") else None)
+        page = get_rollups(period=args.get("period", "day"), dimension=args.get("dimension", "source"),
+                           value=args.get("value"), since=since, until=args.get("until"),
+                           after=args.get("after"), limit=args.get("limit", 50, type=int))
+        return jsonify({"status": "success", **page}), 200
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/api/admin/analytics/summary", methods=["GET"])
+@admin_required
+def admin_analytics_summary():
+    from utils.analytics import get_rollup_summary
+    days = request.args.get("days", type=int)
+    try:
+        items = get_rollup_summary(request.args.get("dimension", "source"), since=_days_ago(days) if days else None)
+        return jsonify({"status": "success", "items": items}), 200
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/api/admin/stats", methods=["GET"])
+@admin_required
+def admin_stats():
+    """Trade-frame stats over a window: ?last=N, ?days=N, ?live=0 for all epochs."""
+    args = request.args
+    days = args.get("days", type=int)
+    window = {"last": args.get("last", type=int), "live": args.get("live", "1") != "0",
+              "since": _days_ago(days) if days else None}
+    frame = get_trade_frame()
+    # One state for every figure, even if a sync comes in meanwhile
+    with frame.locked():
+        completed, correct = frame.accuracy(predicted=True, **window)
+        stats = {
+            "accuracy": round(correct * 100.0 / completed, 1) if completed else 0.0,
+            "predicted": completed,
+            "streaks": frame.streak_distribution(**window),
+            "sources": [{"source": s, "total": t, "correct": c} for s, (t, c) in frame.source_accuracy(**window).items()],
+            "calibration": frame.calibration(**window)
+        }
+    return jsonify({"status": "success", **stats}), 200
+
+@app.route("/api/admin/sql", methods=["GET"])
+@admin_required
+def admin_sql():
+    """Statement timings by fingerprint, per-endpoint counts and slow queries (SQL_TRACE=1)."""
+    return jsonify({"status": "success", **get_query_stats(request.args.get("top", 25, type=int))}), 200
+
+@app.route("/api/admin/streams", methods=["GET"])
+@admin_required
+def admin_streams():
+    """Stream shards: process, owned streams and their model versions."""
+    pool = get_stream_pool()
+    try:
+        shards = pool.shard_stats()
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"status": "success", "shards": shards, "configured": pool.shards, "calls": dict(pool.stats)}), 200
+
+@app.route("/api/admin/trades", methods=["GET"])
+@admin_required
+def admin_trades():
+    from utils.analytics import get_trades_page
+    page = get_trades_page(before=request.args.get("before", type=int), limit=request.args.get("limit", 50, type=int))
+    return jsonify({"status": "success", **page}), 200
+
+@app.route("/api/retrain-full", methods=["POST"])
+@admin_required
+@rate_limited("retrain_full")
+def retrain_full():
+    """Starts a background full-history rebuild."""
+    from models.model_a_core import REBUILD_CHUNK_LIMIT
+    m_a, _ = get_systems()
+    data = request.get_json(silent=True) or {}
+    try:
+        chunk_size = int(data.get("chunk_size", 5000))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "chunk_size must be an integer."}), 400
+    if not 1 <= chunk_size <= REBUILD_CHUNK_LIMIT:
+        return jsonify({"status": "error", "message": f"chunk_size must be between 1 and {REBUILD_CHUNK_LIMIT}."}), 400
+    started = m_a.start_background_rebuild(chunk_size=chunk_size, resume=data.get("resume", True))
+    if not started:
+        return jsonify({"status": "error", "message": "A rebuild is already running.", "rebuild": m_a.rebuild_status}), 409
+    return jsonify({"status": "success", "message": "Rebuild started.", "rebuild": m_a.rebuild_status}), 202
+
+@app.route("/api/retrain-full", methods=["GET"])
+@admin_required
+def retrain_full_status():
+    """Progress of the running (or last) full-history rebuild; polling is not rate limited."""
+    m_a, _ = get_systems()
+    return jsonify({"status": "success", "rebuild": m_a.rebuild_status}), 200
+
 @app.route("/api/download-cvc")
 def download_cvc():
     try:
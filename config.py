@@ -1,7 +1,52 @@
+import json
 import os
 
+def _rate_limits():
+    """
+    Backpressure for the write/training endpoints, per session (users get RATE_LIMIT_USER_FACTOR x):
+    token bucket of `rate` calls/s and `burst`, `concurrency` calls in flight, plus a wait `queue`
+    of that many callers for up to `wait` seconds. RATE_LIMITS (JSON) overrides fields per endpoint.
+    """
+    limits = {
+        "submit_result": {"rate": 2.0, "burst": 6, "concurrency": 1, "queue": 2, "wait": 5.0},
+        "undo_trade": {"rate": 1.0, "burst": 3, "concurrency": 1, "queue": 1, "wait": 5.0},
+        "save_bulk_pattern": {"rate": 0.2, "burst": 2, "concurrency": 1, "queue": 0, "wait": 0},
+        "ocr_screenshot": {"rate": 0.2, "burst": 3, "concurrency": 1, "queue": 0, "wait": 0},
+        "new_session": {"rate": 0.1, "burst": 2, "concurrency": 1, "queue": 0, "wait": 0},
+        # Full-history rebuild: one start per minute, never two requests at once
+        "retrain_full": {"rate": 1 / 60, "burst": 1, "concurrency": 1, "queue": 0, "wait": 0},
+    }
+    for endpoint, spec in json.loads(os.environ.get('RATE_LIMITS') or '{}').items():
+        limits[endpoint] = dict(limits.get(endpoint, {}), **spec) if spec else None
+    return limits
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'ai-master-pro-secure-key-2026')
     ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123') # Default for owner
     DATABASE_PATH = 'database.db'
     DEBUG = True
+
+    # Readiness thresholds (/health/ready); 0 disables a check
+    READY_MAX_DB_LATENCY_MS = float(os.environ.get('READY_MAX_DB_LATENCY_MS', 250))
+    READY_MAX_WRITER_QUEUE = int(os.environ.get('READY_MAX_WRITER_QUEUE', 500))
+    READY_MAX_SIGNAL_P99_MS = float(os.environ.get('READY_MAX_SIGNAL_P99_MS', 2000))
+    READY_MAX_TRAINING_AGE_S = float(os.environ.get('READY_MAX_TRAINING_AGE_S', 0))
+    READY_MAX_MODEL_AGE_S = float(os.environ.get('READY_MAX_MODEL_AGE_S', 0))
+
+    # Write/training endpoint backpressure (see _rate_limits); RATE_LIMITS_ENABLED=0 turns it off
+    RATE_LIMITS_ENABLED = os.environ.get('RATE_LIMITS_ENABLED', '1') != '0'
+    RATE_LIMITS = _rate_limits()
+    RATE_LIMIT_USER_FACTOR = int(os.environ.get('RATE_LIMIT_USER_FACTOR', 3))
+    # Reverse proxies in front of the app whose X-Forwarded-For entries are trusted for the
+    # client address (guest rate-limit keys, logs); 0 uses the socket peer address
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 1 if 'VERCEL' in os.environ else 0))
+
+    # Non-default streams that may be served (STREAMS=a,b,c); others get 404. Each keeps a
+    # database and a model in its owning shard, so this list bounds both
+    STREAMS = tuple(s.strip() for s in os.environ.get('STREAMS', '').split(',') if s.strip())
+    # Worker processes owning non-default streams (utils/stream_shards.py); 0 serves them in-process.
+    # Each web process starts its own pool: run one web worker process (threads) when > 0
+    STREAM_SHARDS = int(os.environ.get('STREAM_SHARDS', 0 if 'VERCEL' in os.environ else min(4, os.cpu_count() or 1)))
+    STREAM_CALL_TIMEOUT = float(os.environ.get('STREAM_CALL_TIMEOUT', 30))
+    # Threads per shard; calls for one stream still run one at a time
+    STREAM_SHARD_THREADS = int(os.environ.get('STREAM_SHARD_THREADS', 4))
@@ -0,0 +1,224 @@
+"""
+Offline load generator for AI Master Pro.
+
+Drives the Flask app with many concurrent sessions using a realistic mix of
+get-signal, submit-result, dashboard-data, undo and bulk-pattern calls, and
+prints a JSON report with throughput, p50/p95/p99 latency per endpoint,
+throttled (429) calls, error rates and the database writer's failed writes
+(the routes hide the SQLite error behind a generic message, so lock and busy
+errors are counted where they happen, in the writer).
+
+Usage:
+    python load_test.py --users 200 --duration 30
+    python load_test.py --users 500 --duration 60 --mode server --output report.json
+
+By default the run uses a throwaway database so the live database.db is untouched.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# Weighted endpoint mix for one virtual user step
+DEFAULT_MIX = {
+    "get_signal": 0.40,
+    "submit_result": 0.30,
+    "dashboard_data": 0.20,
+    "undo": 0.05,
+    "bulk_pattern": 0.05
+}
+
+class FlaskClientTransport:
+    """Calls the app in-process through Flask's test client (one client per session)."""
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, payload=None):
+        if method == "GET":
+            resp = self.client.get(path)
+        else:
+            resp = self.client.post(path, json=payload)
+        return resp.status_code, resp.get_json(silent=True) or {}
+
+class HTTPTransport:
+    """Calls a local werkzeug server over HTTP, keeping cookies per session."""
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url
+        self.http = requests.Session()
+
+    def request(self, method, path, payload=None):
+        resp = self.http.request(method, self.base_url + path, json=payload, timeout=60)
+        try:
+            body = resp.json()
+        except ValueError:
+            body = {}
+        return resp.status_code, body
+
+class LoadStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.throttled = {}
+
+    def record(self, endpoint, elapsed_ms, status):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(elapsed_ms)
+            if status == 429:
+                self.throttled[endpoint] = self.throttled.get(endpoint, 0) + 1
+            elif status >= 400:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed_s):
+        endpoints = {}
+        total = total_errors = 0
+        for endpoint, values in sorted(self.latencies.items()):
+            arr = np.asarray(values)
+            errors = self.errors.get(endpoint, 0)
+            p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+            endpoints[endpoint] = {
+                "count": len(values),
+                "throughput_rps": round(len(values) / elapsed_s, 2),
+                "errors": errors,
+                "error_rate": round(errors / len(values), 4),
+                "throttled": self.throttled.get(endpoint, 0),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(arr.max()), 2)
+            }
+            total += len(values)
+            total_errors += errors
+        return {
+            "duration_s": round(elapsed_s, 2),
+            "total_requests": total,
+            "throughput_rps": round(total / elapsed_s, 2) if elapsed_s else 0,
+            "error_rate": round(total_errors / total, 4) if total else 0,
+            "throttled": sum(self.throttled.values()),
+            "endpoints": endpoints
+        }
+
+class VirtualUser:
+    """One browser session: asks for signals, reports results, refreshes, sometimes undoes its own results."""
+    def __init__(self, transport, stats, mix, rng, think_ms=0):
+        self.transport = transport
+        self.stats = stats
+        self.mix_names = list(mix)
+        self.mix_weights = [mix[name] for name in self.mix_names]
+        self.rng = rng
+        self.think_ms = think_ms
+        self.pending_trade_id = None # id of the last signal, used by the next submitted result
+        self.trade_ids = []          # results this user actually saved, newest last
+
+    def _call(self, endpoint, method, path, payload=None):
+        start = time.perf_counter()
+        try:
+            status, body = self.transport.request(method, path, payload)
+        except Exception as e:
+            status, body = 599, {"message": str(e)}
+        self.stats.record(endpoint, (time.perf_counter() - start) * 1000, status)
+        return status, body
+
+    def step(self):
+        action = self.rng.choices(self.mix_names, weights=self.mix_weights)[0]
+        if action == "get_signal":
+            status, body = self._call("get_signal", "GET", "/api/get-signal")
+            if status == 200 and body.get("trade_id"):
+                self.pending_trade_id = body["trade_id"]
+        elif action == "submit_result":
+            status, _ = self._call("submit_result", "POST", "/api/submit-result", {"result": self.rng.choice(["BIG", "SMALL"])})
+            if status == 200 and self.pending_trade_id:
+                self.trade_ids.append(self.pending_trade_id)
+                self.pending_trade_id = None
+        elif action == "dashboard_data":
+            self._call("dashboard_data", "GET", "/api/dashboard-data")
+        elif action == "undo":
+            if self.trade_ids:
+                self._call("undo", "POST", "/api/undo-trade", {"trade_id": self.trade_ids.pop()})
+        elif action == "bulk_pattern":
+            pattern = [self.rng.choice(["BIG", "SMALL"]) for _ in range(self.rng.randint(5, 15))]
+            self._call("bulk_pattern", "POST", "/api/save-bulk-pattern", {"pattern": pattern})
+        if self.think_ms:
+            time.sleep(self.rng.uniform(0, self.think_ms) / 1000)
+
+def run_load_test(users=50, duration=10.0, mode="client", mix=None, think_ms=0, seed=None):
+    """Runs the load test against the already-configured app and returns the report dict."""
+    from app import app
+    from utils.db_manager import get_writer_stats
+
+    mix = mix or DEFAULT_MIX
+    stats = LoadStats()
+    server = None
+    if mode == "server":
+        from werkzeug.serving import make_server
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        make_transport = lambda: HTTPTransport(base_url)
+    else:
+        make_transport = lambda: FlaskClientTransport(app)
+
+    # Warm-up: make sure the model exists and has some history to predict from
+    warm = VirtualUser(make_transport(), LoadStats(), mix, random.Random(seed))
+    warm._call("bulk_pattern", "POST", "/api/save-bulk-pattern", {"pattern": ["BIG", "SMALL"] * 10})
+
+    writer_before = get_writer_stats()
+    deadline = time.perf_counter() + duration
+    def worker(n):
+        user = VirtualUser(make_transport(), stats, mix, random.Random(None if seed is None else seed + n), think_ms)
+        while time.perf_counter() < deadline:
+            user.step()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(users)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - start
+    if server: server.shutdown()
+
+    report = stats.report(elapsed)
+    report["config"] = {"users": users, "duration_s": duration, "mode": mode, "think_ms": think_ms, "mix": mix}
+    report["writer"] = get_writer_stats()
+    # Failed write operations and group commits during the run (lock/busy errors included)
+    report["write_errors"] = report["writer"]["errors"] - writer_before["errors"]
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for AI Master Pro")
+    parser.add_argument("--users", type=int, default=50, help="concurrent sessions (e.g. 50-500)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--mode", choices=["client", "server"], default="client",
+                        help="Flask test client in-process, or a local werkzeug HTTP server")
+    parser.add_argument("--think-ms", type=float, default=0, help="max random pause between calls per user")
+    parser.add_argument("--db", default=None, help="database file (default: a fresh temporary DB)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="keep per-session/per-user rate limits on (all virtual users share one address)")
+    parser.add_argument("--output", default=None, help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    # DATABASE_PATH must be set before the app modules are imported
+    os.environ["DATABASE_PATH"] = args.db or os.path.join(tempfile.mkdtemp(prefix="aimaster-load-"), "load.db")
+    if not args.rate_limits:
+        os.environ["RATE_LIMITS_ENABLED"] = "0"
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import logging
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    report = run_load_test(args.users, args.duration, args.mode, think_ms=args.think_ms, seed=args.seed)
+    report["config"]["db"] = os.environ["DATABASE_PATH"]
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import math
+import numpy as np
+
+def _log_mix(a, b):
+    """log2(0.5 * 2**a + 0.5 * 2**b) without underflow."""
+    high, low = (a, b) if a > b else (b, a)
+    return high - 1.0 + math.log2(1.0 + 2.0 ** (low - high))
+
+class ContextTree:
+    """
+    Context-tree weighting (CTW) over the B/S result sequence with bounded memory.
+    Each node is a context: the root is the empty context, its children the
+    last result, their children the last two results, and so on down to `depth`.
+    A node keeps KT counts, the log2 KT probability of every symbol seen in its
+    context (le) and the log2 weighted probability of its subtree (lw, an even
+    mix of le and the children's lw), so deep contexts only win where they
+    predict better than their parents.
+    All node fields live in arrays preallocated to `budget` nodes. An update or
+    prediction touches only the depth + 1 nodes on the current context path.
+    Counts are halved past `count_limit` so the tree keeps adapting. When fewer
+    than `depth` nodes are free, the least useful leaves (fewest visits, decayed
+    by `half_life` updates since last touched) are evicted in one batch.
+    """
+    SYMBOLS = {"S": 0, "B": 1, "SMALL": 0, "BIG": 1}
+
+    def __init__(self, depth=16, budget=16384, count_limit=256, half_life=2000, evict_fraction=0.125):
+        self.depth = depth
+        # Enough nodes that a batch of leaves can always make room for one full path
+        self.budget = budget = max(budget, (depth + 1) ** 2)
+        self.count_limit = count_limit
+        self.half_life = half_life
+        self.evict_fraction = evict_fraction
+        self.child = np.zeros((budget, 2), dtype=np.int32) # 0 = no child (the root is never a child)
+        self.parent = np.zeros(budget, dtype=np.int32)
+        self.slot = np.zeros(budget, dtype=np.int8)        # which child of its parent
+        self.level = np.zeros(budget, dtype=np.int16)
+        self.counts = np.zeros((budget, 2), dtype=np.float64)
+        self.le = np.zeros(budget, dtype=np.float64)
+        self.lw = np.zeros(budget, dtype=np.float64)
+        self.touched = np.zeros(budget, dtype=np.int64)
+        self.in_use = np.zeros(budget, dtype=np.bool_)
+        self.in_use[0] = True
+        self.free = np.arange(budget - 1, 0, -1, dtype=np.int32) # stack of free slots, top at free_top - 1
+        self.free_top = budget - 1
+        self.history = [] # last `depth` symbols, newest last
+        self.tick = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return self.budget - self.free_top
+
+    def _allocate(self, parent, symbol):
+        self.free_top -= 1
+        node = int(self.free[self.free_top])
+        self.child[node] = 0
+        self.counts[node] = 0.0
+        self.le[node] = self.lw[node] = 0.0
+        self.parent[node] = parent
+        self.slot[node] = symbol
+        self.level[node] = self.level[parent] + 1
+        self.touched[node] = self.tick
+        self.in_use[node] = True
+        self.child[parent, symbol] = node
+        return node
+
+    def _evict(self):
+        used = np.flatnonzero(self.in_use[1:]) + 1
+        leaves = used[(self.child[used] == 0).all(axis=1)]
+        # Never evict a node touched by the update in progress
+        leaves = leaves[self.touched[leaves] < self.tick]
+        if not len(leaves): return
+        score = self.counts[leaves].sum(axis=1) * np.exp2((self.touched[leaves] - self.tick) / self.half_life)
+        count = min(len(leaves), max(self.depth + 1 - self.free_top, int(self.budget * self.evict_fraction)))
+        victims = leaves[np.argpartition(score, count - 1)[:count]] if count < len(leaves) else leaves
+        self.child[self.parent[victims], self.slot[victims]] = 0
+        self.in_use[victims] = False
+        self.free[self.free_top:self.free_top + len(victims)] = victims
+        self.free_top += len(victims)
+        self.evicted += len(victims)
+
+    def _path(self, create):
+        """Nodes from the root down the current context (newest result first)."""
+        node, path = 0, [0]
+        for symbol in reversed(self.history):
+            nxt = int(self.child[node, symbol])
+            if not nxt:
+                if not create: break
+                nxt = self._allocate(node, symbol)
+            path.append(nxt)
+            node = nxt
+        return path
+
+    def _weighted(self, node, le, below=None):
+        """lw of `node` given its le; `below` = (slot, lw) overrides one child's lw."""
+        if self.level[node] >= self.depth: return le
+        children = 0.0
+        for symbol in (0, 1):
+            if below is not None and below[0] == symbol:
+                children += below[1]
+            else:
+                child = self.child[node, symbol]
+                if child: children += self.lw[child]
+        return _log_mix(le, children)
+
+    def update(self, symbol):
+        """Learns the next result ('B'/'S'/'BIG'/'SMALL'): one walk down and back up the context path."""
+        x = self.SYMBOLS[symbol]
+        self.tick += 1
+        while self.free_top < self.depth:
+            before = self.free_top
+            self._evict()
+            if self.free_top == before: break
+        for node in reversed(self._path(create=self.free_top >= self.depth)):
+            counts = self.counts[node]
+            total = counts[0] + counts[1]
+            self.le[node] += math.log2((counts[x] + 0.5) / (total + 1.0))
+            counts[x] += 1.0
+            if total + 1.0 > self.count_limit: counts *= 0.5
+            self.lw[node] = self._weighted(node, self.le[node])
+            self.touched[node] = self.tick
+        self.history.append(x)
+        if len(self.history) > self.depth: del self.history[0]
+
+    def extend(self, symbols):
+        for symbol in symbols:
+            self.update(symbol)
+
+    def _tentative_lw(self, path, x):
+        # Root lw if `x` came next; a context not in the tree yet would be created
+        # with zero counts, and a fresh chain down to `depth` always has lw = -1
+        below = None
+        if len(path) - 1 < len(self.history):
+            below = (self.history[-len(path)], -1.0)
+        for node in reversed(path):
+            counts = self.counts[node]
+            le = self.le[node] + math.log2((counts[x] + 0.5) / (counts[0] + counts[1] + 1.0))
+            below = (self.slot[node], self._weighted(node, le, below))
+        return below[1]
+
+    def predict(self):
+        """
+        Returns P(next result is B): the root's weighted probability with B
+        appended over B or S appended (normalizing cancels stale lw left by evictions).
+        """
+        path = self._path(create=False)
+        lw_small, lw_big = self._tentative_lw(path, 0), self._tentative_lw(path, 1)
+        return 1.0 / (1.0 + 2.0 ** float(lw_small - lw_big))
+
+    def stats(self):
+        return {"nodes": len(self), "budget": self.budget, "depth": self.depth, "evicted": self.evicted, "updates": self.tick}
@@ -0,0 +1,119 @@
+from array import array
+from collections.abc import MutableMapping
+
+class ContextTrie(MutableMapping):
+    """
+    Compact suffix-context trie over B/S sequences.
+    Keys are pattern strings ("BSB") stored reversed, most recent symbol first,
+    so a single backward walk over the history visits every stored suffix of it.
+    Nodes live in flat arrays (two child slots per node); each node can hold one
+    value object (e.g. {"B": x, "S": y} counts or [wins, losses]).
+    Behaves like a dict for the rest of the model code.
+    """
+    SYMBOLS = {"B": 0, "S": 1, "BIG": 0, "SMALL": 1}
+    CHARS = "BS"
+
+    def __init__(self, items=None):
+        self._children = array('i', [-1, -1])
+        self._values = [None]
+        self._size = 0
+        if items:
+            self.update(items)
+
+    def _child(self, node, symbol, create):
+        slot = node * 2 + symbol
+        nxt = self._children[slot]
+        if nxt < 0 and create:
+            nxt = len(self._values)
+            self._values.append(None)
+            self._children.extend((-1, -1))
+            self._children[slot] = nxt
+        return nxt
+
+    def _find(self, key, create=False):
+        node = 0
+        for ch in reversed(key):
+            symbol = self.SYMBOLS.get(ch)
+            if symbol is None:
+                if create: raise KeyError(key)
+                return -1
+            node = self._child(node, symbol, create)
+            if node < 0: return -1
+        return node
+
+    def __getitem__(self, key):
+        node = self._find(key)
+        if node < 0 or self._values[node] is None:
+            raise KeyError(key)
+        return self._values[node]
+
+    def __setitem__(self, key, value):
+        node = self._find(key, create=True)
+        if self._values[node] is None:
+            self._size += 1
+        self._values[node] = value
+
+    def __delitem__(self, key):
+        node = self._find(key)
+        if node < 0 or self._values[node] is None:
+            raise KeyError(key)
+        self._values[node] = None
+        self._size -= 1
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        stack = [(0, "")]
+        while stack:
+            node, key = stack.pop()
+            if self._values[node] is not None:
+                yield key
+            for symbol in (1, 0):
+                child = self._children[node * 2 + symbol]
+                if child >= 0:
+                    stack.append((child, self.CHARS[symbol] + key))
+
+    def node_count(self):
+        return len(self._values)
+
+    def needs_compaction(self):
+        """True when deleted entries leave most nodes empty."""
+        return len(self._values) > 4 * self._size + 256
+
+    def compacted(self):
+        """Returns a new trie holding only the live entries (swap it in atomically)."""
+        return ContextTrie(self.items())
+
+    def suffix_matches(self, history, max_length):
+        """
+        Walks backwards from the end of `history` and returns [(length, value), ...]
+        for every stored suffix up to `max_length`, shortest first.
+        """
+        matches = []
+        node = 0
+        for length in range(1, min(max_length, len(history)) + 1):
+            symbol = self.SYMBOLS.get(history[-length])
+            if symbol is None: break
+            node = self._children[node * 2 + symbol]
+            if node < 0: break
+            value = self._values[node]
+            if value is not None:
+                matches.append((length, value))
+        return matches
+
+    def ensure_suffixes(self, history, end, max_length, factory):
+        """
+        Returns the values for the suffixes of history[:end] of lengths 1..max_length,
+        creating missing entries with `factory()`. One O(max_length) walk.
+        """
+        values = []
+        node = 0
+        for length in range(1, min(max_length, end) + 1):
+            node = self._child(node, self.SYMBOLS[history[end - length]], True)
+            value = self._values[node]
+            if value is None:
+                value = self._values[node] = factory()
+                self._size += 1
+            values.append(value)
+        return values
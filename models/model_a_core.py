@@ -4,50 +4,106 @@ import sqlite3
 import os
 import json
 import time
-import shutil
-from utils.db_manager import get_db_connection
+import threading
+import contextvars
+from datetime import datetime, timezone
+from utils.db_manager import CURRENT_EPOCH, get_db_connection, get_db_path, get_writer, get_history_store, submit_write, register_hot_query
+from models.context_trie import ContextTrie
+from models.context_tree import ContextTree
+
+# Hot-path queries (checked by db_manager.check_query_plans)
+MODEL_VERSION = register_hot_query("model_version", "SELECT value FROM model_meta WHERE key = 'version'")
+TRAINING_WINDOW_ALL = register_hot_query("training_window_all", "SELECT actual_result, ai_prediction, id FROM trades WHERE actual_result IS NOT NULL ORDER BY timestamp DESC LIMIT ?", (300,))
+TRAINING_WINDOW_LIVE = register_hot_query("training_window_live", f"SELECT actual_result, ai_prediction, id FROM trades WHERE actual_result IS NOT NULL AND epoch = {CURRENT_EPOCH} ORDER BY timestamp DESC LIMIT ?", (300,))
+LAST_RESULTS = register_hot_query("last_n_results", "SELECT actual_result FROM trades WHERE actual_result IS NOT NULL ORDER BY timestamp DESC LIMIT ?", (60,))
+CONTEXT_FEED = register_hot_query("context_tree_feed", "SELECT id, actual_result FROM trades WHERE id > ? AND actual_result IS NOT NULL ORDER BY id LIMIT ?", (0, 5000))
+# Highest trades.id ever issued (AUTOINCREMENT): only goes backwards when the database is replaced
+TRADES_SEQUENCE = "SELECT seq FROM sqlite_sequence WHERE name = 'trades'"
+CORRECTION_LOOKUP = register_hot_query("correction_lookup", "SELECT occurrence_count, reliability_score FROM correction_table WHERE pattern = ?", ("BSBS",))
+# Largest rebuild page (rows held in memory at once)
+REBUILD_CHUNK_LIMIT = 50000
 
 class ModelACore:
     """
     Model A (Father): Main live signal provider.
     Optimized for Vercel: Removed fcntl dependency and simplified file handling.
     Enhanced with Incremental Learning and Weight Decay.
+    Model state lives in the model_* tables of the trades database so every
+    worker shares one versioned copy; the JSON files only seed an empty database.
     """
-    def __init__(self):
+    def __init__(self, seed=True, sweeper=True):
+        """
+        seed=False starts an empty database from a blank model instead of the JSON seed files;
+        sweeper=False skips the background correction sweeper (offline replays).
+        """
         self.name = "Model A (Advanced Lite AI)"
         self.is_vercel = "VERCEL" in os.environ
-        BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-        
-        if self.is_vercel:
-            self.db_path = '/tmp/database.db'
-            self.pattern_file = '/tmp/patterns.json'
-            self.performance_file = '/tmp/strategy_performance.json'
-            
-            orig_pattern = os.path.join(os.path.dirname(__file__), 'patterns.json')
-            orig_perf = os.path.join(os.path.dirname(__file__), 'strategy_performance.json')
-            
-            try:
-                if not os.path.exists(self.pattern_file) and os.path.exists(orig_pattern):
-                    shutil.copy2(orig_pattern, self.pattern_file)
-                elif not os.path.exists(self.pattern_file):
-                    with open(self.pattern_file, 'w') as f:
-                        json.dump({"patterns": {}, "markov_probabilities": {}, "error_matrix": {}}, f)
-                        
-                if not os.path.exists(self.performance_file) and os.path.exists(orig_perf):
-                    shutil.copy2(orig_perf, self.performance_file)
-                elif not os.path.exists(self.performance_file):
-                    with open(self.performance_file, 'w') as f:
-                        json.dump({s: 1.0 for s in self.strategies}, f)
-            except Exception as e:
-                print(f"Vercel File Copy Error: {e}")
-        else:
-            self.db_path = os.path.join(BASE_DIR, 'database.db')
-            self.pattern_file = os.path.join(os.path.dirname(__file__), 'patterns.json')
-            self.performance_file = os.path.join(os.path.dirname(__file__), 'strategy_performance.json')
+        self.db_path = get_db_path()
+        # Seed files shipped with the package (read-only, imported once into an empty DB)
+        self.pattern_file = os.path.join(os.path.dirname(__file__), 'patterns.json')
+        self.performance_file = os.path.join(os.path.dirname(__file__), 'strategy_performance.json')
         
-        self.strategies = ["pattern", "trend", "fib", "rsi", "markov", "chaos", "streak_reversal"]
-        self.patterns = self._load_patterns()
-        self.strategy_weights = self._load_performance()
+        self.strategies = ["pattern", "trend", "fib", "rsi", "markov", "chaos", "streak_reversal", "ctw"]
+        # Error matrix limits: per-result decay and hard size cap
+        self.error_decay = 0.998
+        self.error_matrix_limit = 2500
+        self.error_min_weight = 0.05
+        # Context lengths learned by training and probed by the pattern strategy
+        # (both tables are suffix tries, so longer contexts only cost one deeper walk)
+        self.pattern_train_length = 8
+        self.pattern_match_length = 6
+        # Pattern training: per-result decay, recency weights (last 5 / last 15 / older) and size cap
+        self.pattern_decay = 0.95
+        self.recency_weights = (15.0, 8.0, 2.0)
+        self.pattern_limit = 2500
+        # Context-tree weighting strategy (models/context_tree.py): per-process, follows the
+        # trades table by id and starts from the newest context_warmup results
+        self.context_depth = 16
+        self.context_budget = 16384
+        self.context_warmup = 3000
+        self.context_min_results = 50
+        self.context_tree = None
+        self._context_cursor = 0
+        self._context_lock = threading.Lock()
+        # How often (seconds) to check whether another worker saved a newer model
+        self.sync_interval = 1.0
+        # Correction table: in-memory write-through mirror, expired by a background sweeper
+        self.correction_ttl = 7 * 86400
+        self.correction_sweep_interval = 600
+        self.corrections = None
+        self._corrections_lock = threading.Lock()
+        self._sweeper = None
+        self._sweeper_enabled = sweeper
+        self._stop = threading.Event()
+        # Full-history rebuild (rebuild_from_history / start_background_rebuild)
+        self._rebuilder = None
+        self._rebuild_lock = threading.Lock()
+        self.rebuild_status = {"state": "idle"}
+        self.model_version = 0
+        # Model journal: each save appends the rows that changed (plus any decay factors);
+        # the model_* tables are a snapshot rewritten after journal_limit entries or
+        # snapshot_interval seconds, which bounds the replay done on load
+        self.journal_limit = 200
+        self.snapshot_interval = 600
+        self._journal_entries = 0
+        self._snapshot_at = time.time()
+        self._pending_scale = {}
+        # Wall-clock times for health reporting: last local training, last model change
+        self.last_trained_at = None
+        self.model_updated_at = None
+        self._persisted = None
+        self._last_sync = 0.0
+        self.patterns = {"patterns": ContextTrie(), "markov_probabilities": {}, "error_matrix": ContextTrie()}
+        # Online strategy weights: exponential moving accuracy of each strategy's own votes
+        # (alpha 2/51 matches the old 50-trade window); weights persist in 0.01 steps
+        self.weight_alpha = 2 / 51
+        self.weight_precision = 2
+        self.strategy_weights = {s: 1.0 for s in self.strategies}
+        self.strategy_accuracy = self._accuracy_from_weights(self.strategy_weights)
+        if not self._load_state() and seed:
+            self.patterns = self._load_patterns()
+            self.strategy_weights = self._load_performance()
+            self.strategy_accuracy = self._accuracy_from_weights(self.strategy_weights)
 
     def _load_patterns(self):
         default_data = {"patterns": {}, "markov_probabilities": {}, "error_matrix": {}}
@@ -59,20 +115,50 @@ class ModelACore:
                     if "patterns" not in data: data["patterns"] = {}
                     if "markov_probabilities" not in data: data["markov_probabilities"] = {}
                     if "error_matrix" not in data: data["error_matrix"] = {}
+                    data["patterns"] = ContextTrie(data["patterns"])
+                    data["error_matrix"] = self._compact_error_matrix(data["error_matrix"])
                     return data
             except Exception as e:
                 print(f"Error loading patterns: {e}")
                 return default_data
         return default_data
 
-    def _save_patterns(self):
-        try:
-            temp_file = self.pattern_file + ".tmp"
-            with open(temp_file, 'w') as f:
-                json.dump(self.patterns, f)
-            os.replace(temp_file, self.pattern_file)
-        except Exception as e:
-            print(f"Error saving patterns: {e}")
+    def _compact_error_matrix(self, error_matrix):
+        """
+        Normalizes error matrix entries to compact [wins, losses] pairs
+        (legacy files store {"wins": x, "losses": y}) and enforces the size cap.
+        """
+        compact = ContextTrie()
+        for pattern, stats in error_matrix.items():
+            if isinstance(stats, dict):
+                stats = [stats.get("wins", 0), stats.get("losses", 0)]
+            if len(stats) == 2:
+                compact[pattern] = [float(stats[0]), float(stats[1])]
+        self._prune_error_matrix(compact)
+        return compact
+
+    def _prune_error_matrix(self, error_matrix):
+        # Prune down to 90% of the cap so the sort is amortized over many results
+        if len(error_matrix) <= self.error_matrix_limit: return
+        keep = int(self.error_matrix_limit * 0.9)
+        ranked = sorted(error_matrix.items(), key=lambda x: x[1][0] + x[1][1], reverse=True)
+        for pattern, _ in ranked[keep:]:
+            del error_matrix[pattern]
+
+    def _compact_trie(self, key):
+        # Deleted contexts leave empty nodes behind; rebuild and swap in one assignment
+        trie = self.patterns[key]
+        if trie.needs_compaction():
+            self.patterns[key] = trie.compacted()
+
+    def _decay_error_matrix(self, error_matrix, steps):
+        factor = self.error_decay ** steps
+        for pattern in list(error_matrix):
+            stats = error_matrix[pattern]
+            stats[0] *= factor
+            stats[1] *= factor
+            if stats[0] + stats[1] < self.error_min_weight:
+                del error_matrix[pattern]
 
     def _load_performance(self):
         default_weights = {s: 1.0 for s in self.strategies}
@@ -88,167 +174,669 @@ class ModelACore:
                 return default_weights
         return default_weights
 
-    def _save_performance(self):
-        try:
-            temp_file = self.performance_file + ".tmp"
-            with open(temp_file, 'w') as f:
-                json.dump(self.strategy_weights, f)
-            os.replace(temp_file, self.performance_file)
-        except Exception as e:
-            print(f"Error saving performance: {e}")
+    def _accuracy_from_weights(self, weights, saved=None):
+        # Inverse of the weight mapping, so switching to online updates does not jump the weights
+        accuracy = {s: w / 3.0 for s, w in weights.items()}
+        accuracy.update({s: a for s, a in (saved or {}).items() if s in accuracy})
+        return accuracy
 
-    def update_correction_table(self, pattern, pred, actual):
-        if not pattern or pred == actual: return
+    def _load_state(self, conn=None):
+        """
+        Loads the model from the model_* tables. Returns False when the database
+        holds no saved model yet (or the schema is missing).
+        """
+        own_conn = conn is None
+        try:
+            if own_conn: conn = get_db_connection()
+            row = conn.execute(MODEL_VERSION).fetchone()
+            if not row: return False
+            meta = dict(conn.execute("SELECT key, value FROM model_meta").fetchall())
+            patterns = ContextTrie((r[0], {"B": r[1], "S": r[2]}) for r in conn.execute("SELECT pattern, big, small FROM model_patterns"))
+            error_matrix = ContextTrie((r[0], [r[1], r[2]]) for r in conn.execute("SELECT pattern, wins, losses FROM model_error_matrix"))
+            markov = {r[0]: {"B": r[1], "S": r[2]} for r in conn.execute("SELECT state, big, small FROM model_markov")}
+            weights = {s: 1.0 for s in self.strategies}
+            weights.update({r[0]: r[1] for r in conn.execute("SELECT strategy, weight FROM model_weights")})
+            journal = conn.execute("SELECT version, delta FROM model_journal WHERE id > ? ORDER BY id",
+                                   (int(meta.get("journal_id", 0)),)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error loading model state: {e}")
+            return False
+        finally:
+            if own_conn and conn: conn.close()
         
+        self.patterns = {"patterns": patterns, "markov_probabilities": markov, "error_matrix": error_matrix}
+        if meta.get("error_cursor"):
+            self.patterns["error_cursor"] = int(meta["error_cursor"])
+        self.strategy_weights = weights
+        self.strategy_accuracy = self._accuracy_from_weights(weights, json.loads(meta.get("strategy_accuracy") or "{}"))
+        # Snapshot + journal = current model
+        for _, delta in journal:
+            self._apply_delta(json.loads(delta))
+        self._compact_trie("patterns")
+        self._compact_trie("error_matrix")
+        self._journal_entries = len(journal)
+        self._snapshot_at = float(meta.get("snapshot_at", time.time()))
+        self._pending_scale = {}
+        self.model_version = int(meta["version"])
+        self.model_updated_at = time.time()
+        self._persisted = self._state_rows()
+        # Another worker may have written corrections too
+        self.corrections = None
+        self._last_sync = time.time()
+        return True
+
+    def _sync_state(self):
+        """
+        Reloads the model if another worker saved a newer version (throttled). The
+        version check is a plain read; the reload itself runs on the writer thread,
+        after any _persist_state still queued there, so it never reads a stale model.
+        """
+        now = time.time()
+        if now - self._last_sync < self.sync_interval: return
+        self._last_sync = now
         conn = None
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM correction_table WHERE last_seen < datetime('now', '-7 days')")
-            cursor.execute("SELECT occurrence_count, reliability_score FROM correction_table WHERE pattern = ?", (pattern,))
-            row = cursor.fetchone()
-            if row:
-                count, score = row
-                new_count = count + 1
-                # Incremental reliability boost
-                new_score = min(0.98, score + 0.02)
-                cursor.execute("""
-                    UPDATE correction_table 
-                    SET occurrence_count = ?, reliability_score = ?, last_seen = CURRENT_TIMESTAMP, 
-                        incorrect_prediction = ?, correct_result = ?
-                    WHERE pattern = ?
-                """, (new_count, new_score, pred, actual, pattern))
-            else:
-                cursor.execute("""
-                    INSERT INTO correction_table (pattern, incorrect_prediction, correct_result, occurrence_count, reliability_score)
-                    VALUES (?, ?, ?, 1, 0.6)
-                """, (pattern, pred, actual))
-            conn.commit()
-        except Exception as e:
-            print(f"Correction Table Update Error: {e}")
+            row = conn.execute(MODEL_VERSION).fetchone()
+            if not row or int(row[0]) == self.model_version: return
+        except sqlite3.Error as e:
+            print(f"Error syncing model state: {e}")
+            return
         finally:
             if conn: conn.close()
+        try:
+            submit_write(self._reload_newer).result()
+        except Exception as e:
+            print(f"Error syncing model state: {e}")
 
-    def get_correction(self, pattern):
+    def _reload_newer(self, conn):
+        row = conn.execute(MODEL_VERSION).fetchone()
+        if row and int(row[0]) != self.model_version:
+            self._load_state(conn)
+
+    def get_model_version(self):
+        """Returns the model version, picking up a newer one saved by another worker."""
+        self._sync_state()
+        return self.model_version
+
+    def _state_rows(self):
+        """Flattens the in-memory model into {table: {key: row_values}}."""
+        return {
+            "model_patterns": {p: (c.get("B", 0), c.get("S", 0)) for p, c in self.patterns.get("patterns", {}).items()},
+            "model_error_matrix": {p: (v[0], v[1]) for p, v in self.patterns.get("error_matrix", {}).items()},
+            "model_markov": {st: (c.get("B", 0), c.get("S", 0)) for st, c in self.patterns.get("markov_probabilities", {}).items()},
+            # Rounded so small EWMA moves do not rewrite the row on every result
+            "model_weights": {st: (round(w, self.weight_precision),) for st, w in self.strategy_weights.items()},
+        }
+
+    # Column names of the snapshot tables, in _state_rows value order
+    STATE_COLUMNS = {
+        "model_patterns": ("pattern", "big", "small"),
+        "model_error_matrix": ("pattern", "wins", "losses"),
+        "model_markov": ("state", "big", "small"),
+        "model_weights": ("strategy", "weight"),
+    }
+
+    def _state_containers(self):
+        """Maps each snapshot table to its in-memory container and a row -> value constructor."""
+        return {
+            "model_patterns": (self.patterns["patterns"], lambda v: {"B": v[0], "S": v[1]}),
+            "model_error_matrix": (self.patterns["error_matrix"], lambda v: [v[0], v[1]]),
+            "model_markov": (self.patterns["markov_probabilities"], lambda v: {"B": v[0], "S": v[1]}),
+            "model_weights": (self.strategy_weights, lambda v: v[0]),
+        }
+
+    def _note_scale(self, table, factor):
+        # Whole-table decays are journaled as one factor instead of one row per entry
+        self._pending_scale.setdefault(table, []).append(factor)
+
+    def _state_meta(self, rows, full=False):
+        meta = {"error_cursor": str(self.patterns.get("error_cursor", 0))}
+        if full or self._persisted is None or rows["model_weights"] != self._persisted.get("model_weights"):
+            meta["strategy_accuracy"] = json.dumps({s: round(a, 4) for s, a in self.strategy_accuracy.items()})
+        return meta
+
+    def _diff_state(self, rows):
+        """
+        Builds a journal entry: the decay factors applied since the last save, then
+        the rows that differ from the last save scaled by those factors, then removals.
+        """
+        delta = {"scale": dict(self._pending_scale), "set": {}, "del": {}, "meta": self._state_meta(rows)}
+        for table, current in rows.items():
+            previous = self._persisted.get(table, {})
+            factors = self._pending_scale.get(table, ())
+            changed = []
+            for key, values in current.items():
+                expected = previous.get(key)
+                if expected is not None:
+                    for factor in factors:
+                        expected = tuple(v * factor for v in expected)
+                if expected != values:
+                    changed.append([key, *values])
+            removed = [key for key in previous if key not in current]
+            if changed: delta["set"][table] = changed
+            if removed: delta["del"][table] = removed
+        return delta
+
+    def _apply_delta(self, delta):
+        """Replays one journal entry onto the in-memory model."""
+        containers = self._state_containers()
+        for table, factors in delta.get("scale", {}).items():
+            container = containers[table][0]
+            for factor in factors:
+                for value in container.values():
+                    for k in (value.keys() if isinstance(value, dict) else range(len(value))):
+                        value[k] *= factor
+        for table, changed in delta.get("set", {}).items():
+            container, make = containers[table]
+            for key, *values in changed:
+                container[key] = make(values)
+        for table, removed in delta.get("del", {}).items():
+            container = containers[table][0]
+            for key in removed:
+                container.pop(key, None)
+        meta = delta.get("meta", {})
+        if "error_cursor" in meta:
+            self.patterns["error_cursor"] = int(meta["error_cursor"])
+        if "strategy_accuracy" in meta:
+            self.strategy_accuracy.update(json.loads(meta["strategy_accuracy"]))
+
+    def _persist_state(self, conn):
+        """
+        Saves the model and bumps the model version. Normally this appends one small
+        entry to model_journal; the model_* snapshot is rewritten (and the journal
+        cleared) when the journal is due for compaction or another worker saved since
+        this one last loaded. Runs as a writer operation, so when training happens
+        inside a trade write it shares that transaction; if that transaction rolls
+        back, the version is restored and the next save writes a full snapshot.
+        """
+        rows = self._state_rows()
+        version = self.model_version + 1
+        head = conn.execute(MODEL_VERSION).fetchone()
+        stale = self._persisted is None or (head is not None and int(head[0]) != self.model_version)
+        due = self._journal_entries >= self.journal_limit or time.time() - self._snapshot_at >= self.snapshot_interval
+        now = time.time()
+        get_writer().on_rollback(self._undo_persist(self.model_version, self.model_updated_at,
+                                                    self._journal_entries, self._snapshot_at))
+        
+        if stale or due:
+            changed_rows = self._write_snapshot(conn, rows, version, now)
+        else:
+            delta = self._diff_state(rows)
+            conn.execute("INSERT INTO model_journal (version, created_at, delta) VALUES (?, ?, ?)",
+                         (version, now, json.dumps(delta, separators=(",", ":"))))
+            self._journal_entries += 1
+            changed_rows = sum(len(v) for v in delta["set"].values()) + sum(len(v) for v in delta["del"].values())
+        
+        conn.execute("INSERT OR REPLACE INTO model_meta (key, value) VALUES ('version', ?)", (str(version),))
+        self.model_version = version
+        self.model_updated_at = now
+        self._persisted = rows
+        self._pending_scale = {}
+        return changed_rows
+
+    def _undo_persist(self, version, updated_at, journal_entries, snapshot_at):
+        def undo():
+            self.model_version, self.model_updated_at = version, updated_at
+            self._journal_entries, self._snapshot_at = journal_entries, snapshot_at
+            # The rolled-back rows and decay factors are no longer a valid diff base
+            self._persisted = None
+        return undo
+
+    def _write_snapshot(self, conn, rows, version, now):
+        """Rewrites the model_* tables from `rows` and folds the journal into them."""
+        for table, current in rows.items():
+            cols = self.STATE_COLUMNS[table]
+            placeholders = ", ".join("?" * (len(cols) + 1))
+            conn.execute(f"DELETE FROM {table}")
+            conn.executemany(f"INSERT INTO {table} ({', '.join(cols)}, version) VALUES ({placeholders})",
+                             [(key,) + values + (version,) for key, values in current.items()])
+        # The journal id only grows, so an empty marker entry records where this snapshot starts
+        journal_id = conn.execute("INSERT INTO model_journal (version, created_at, delta) VALUES (?, ?, '{}')",
+                                  (version, now)).lastrowid
+        conn.execute("DELETE FROM model_journal WHERE id <= ?", (journal_id,))
+        meta = dict(self._state_meta(rows, full=True), journal_id=str(journal_id), snapshot_at=str(now))
+        conn.executemany("INSERT OR REPLACE INTO model_meta (key, value) VALUES (?, ?)", meta.items())
+        self._journal_entries = 0
+        self._snapshot_at = now
+        return sum(len(current) for current in rows.values())
+
+    def _save_state(self):
+        try:
+            submit_write(self._persist_state).result()
+        except Exception as e:
+            self._persisted = None
+            print(f"Error saving model state: {e}")
+
+    def _load_corrections(self):
         conn = None
+        corrections = {}
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT correct_result, reliability_score FROM correction_table WHERE pattern = ?", (pattern,))
-            row = cursor.fetchone()
-            if row:
-                return {"correct_result": row[0], "reliability": row[1]}
+            rows = conn.execute("""
+                SELECT pattern, correct_result, reliability_score, last_seen FROM correction_table
+                WHERE last_seen >= datetime('now', '-7 days')
+            """).fetchall()
+            for pattern, correct, score, last_seen in rows:
+                corrections[pattern] = {"correct_result": correct, "reliability": score, "last_seen": self._utc_epoch(last_seen)}
         except Exception as e:
-            print(f"Error getting correction: {e}")
+            print(f"Error loading corrections: {e}")
         finally:
             if conn: conn.close()
+        return corrections
+
+    def _utc_epoch(self, value):
+        # last_seen is written by CURRENT_TIMESTAMP, i.e. UTC
+        try:
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+        except (TypeError, ValueError):
+            return time.time()
+
+    def _get_corrections(self):
+        corrections = self.corrections
+        if corrections is None:
+            with self._corrections_lock:
+                if self.corrections is None:
+                    self.corrections = self._load_corrections()
+                    self._start_sweeper()
+                corrections = self.corrections
+        return corrections
+
+    def _apply_correction(self, conn, pattern, pred, actual):
+        cursor = conn.cursor()
+        cursor.execute(CORRECTION_LOOKUP, (pattern,))
+        row = cursor.fetchone()
+        if row:
+            count, score = row
+            new_count = count + 1
+            # Incremental reliability boost
+            new_score = min(0.98, score + 0.02)
+            cursor.execute("""
+                UPDATE correction_table 
+                SET occurrence_count = ?, reliability_score = ?, last_seen = CURRENT_TIMESTAMP, 
+                    incorrect_prediction = ?, correct_result = ?
+                WHERE pattern = ?
+            """, (new_count, new_score, pred, actual, pattern))
+        else:
+            new_score = 0.6
+            cursor.execute("""
+                INSERT INTO correction_table (pattern, incorrect_prediction, correct_result, occurrence_count, reliability_score)
+                VALUES (?, ?, ?, 1, 0.6)
+            """, (pattern, pred, actual))
+        # Write-through to the in-memory mirror, reverted if the write is rolled back
+        corrections = self.corrections
+        if corrections is not None:
+            previous = corrections.get(pattern)
+            corrections[pattern] = {"correct_result": actual, "reliability": new_score, "last_seen": time.time()}
+            get_writer().on_rollback(lambda: self._restore_correction(corrections, pattern, previous))
+
+    def _restore_correction(self, corrections, pattern, previous):
+        if previous is None:
+            corrections.pop(pattern, None)
+        else:
+            corrections[pattern] = previous
+
+    def update_correction_table(self, pattern, pred, actual):
+        if not pattern or pred == actual: return
+        try:
+            submit_write(self._apply_correction, pattern, pred, actual).result()
+        except Exception as e:
+            print(f"Correction Table Update Error: {e}")
+
+    def get_correction(self, pattern):
+        """Memory-only lookup; expired entries are ignored even before the sweeper removes them."""
+        entry = self._get_corrections().get(pattern)
+        if entry and time.time() - entry["last_seen"] <= self.correction_ttl:
+            return {"correct_result": entry["correct_result"], "reliability": entry["reliability"]}
         return None
 
-    def train_from_db(self, include_archived=True):
+    def _sweep_corrections(self, conn):
+        deleted = conn.execute("DELETE FROM correction_table WHERE last_seen < datetime('now', '-7 days')").rowcount
+        corrections = self.corrections
+        if corrections:
+            cutoff = time.time() - self.correction_ttl
+            for pattern in [p for p, e in corrections.items() if e["last_seen"] < cutoff]:
+                corrections.pop(pattern, None)
+        return deleted
+
+    def sweep_expired_corrections(self):
+        """Deletes correction entries not seen for 7 days (uses idx_correction_last_seen)."""
+        try:
+            return submit_write(self._sweep_corrections).result()
+        except Exception as e:
+            print(f"Correction Sweep Error: {e}")
+            return 0
+
+    def _start_sweeper(self):
+        if self._sweeper or not self._sweeper_enabled or self._stop.is_set(): return
+        def loop():
+            while not self._stop.wait(self.correction_sweep_interval):
+                self.sweep_expired_corrections()
+        self._sweeper = threading.Thread(target=contextvars.copy_context().run, args=(loop,), name="correction-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def close(self):
+        """Stops the correction sweeper; the model stays usable for predictions and training."""
+        self._stop.set()
+        sweeper, self._sweeper = self._sweeper, None
+        if sweeper: sweeper.join()
+
+    def update_strategy_weights(self, votes, actual):
+        """
+        Folds one result into the moving accuracy of every strategy that voted on it.
+        `votes` maps strategy -> "BIG"/"SMALL" (from predict's details). O(strategies).
+        """
+        alpha = self.weight_alpha
+        for strategy, pred in (votes or {}).items():
+            if strategy not in self.strategy_accuracy: continue
+            hit = 1.0 if pred == actual else 0.0
+            accuracy = self.strategy_accuracy[strategy] + alpha * (hit - self.strategy_accuracy[strategy])
+            self.strategy_accuracy[strategy] = accuracy
+            # Reinforcement: Adjust weights based on recent success
+            self.strategy_weights[strategy] = max(0.3, min(3.0, accuracy * 3.0))
+        return bool(votes)
+
+    def train_from_db(self, include_archived=True, conn=None, votes=None, actual=None):
         """
         Enhanced Training with Incremental Learning and Weight Decay.
+        Pass the writer's `conn` to train inside a trade write, so the new rows are
+        visible and the model update commits in the same transaction.
+        Pass the served signal's per-strategy `votes` and the `actual` result to
+        update the strategy weights online first.
         """
-        conn = None
+        own_conn = conn is None
         try:
-            conn = get_db_connection()
+            if own_conn: conn = get_db_connection()
             cursor = conn.cursor()
             
-            # 1. Strategy Performance Update (Reinforcement Learning)
-            cursor.execute("SELECT ai_prediction, actual_result, signal_source FROM trades WHERE actual_result IS NOT NULL AND is_archived = 0 ORDER BY timestamp DESC LIMIT 50")
-            recent_trades = cursor.fetchall()
+            # Catch up with saves from other workers first, so this result lands on the latest model
+            row = cursor.execute(MODEL_VERSION).fetchone()
+            if row and int(row[0]) != self.model_version:
+                self._load_state(conn)
             
-            if recent_trades:
-                source_map = {
-                    "Pattern Analysis": "pattern",
-                    "Trend Detection": "trend",
-                    "Fibonacci Sequence": "fib",
-                    "RSI Analysis": "rsi",
-                    "Markov Chain Analysis": "markov",
-                    "Chaos Theory": "chaos",
-                    "Streak Reversal": "streak_reversal"
-                }
-                
-                perf = {s: {"wins": 0, "total": 0} for s in self.strategies}
-                for pred, actual, source in recent_trades:
-                    strat = source_map.get(source)
-                    if strat:
-                        perf[strat]["total"] += 1
-                        if pred == actual:
-                            perf[strat]["wins"] += 1
-                
-                for s in self.strategies:
-                    if perf[s]["total"] > 0:
-                        accuracy = perf[s]["wins"] / perf[s]["total"]
-                        # Reinforcement: Adjust weights based on recent success
-                        self.strategy_weights[s] = max(0.3, min(3.0, accuracy * 3.0))
-                self._save_performance()
+            # 1. Strategy Performance Update (online; no trade scan)
+            weights_changed = self.update_strategy_weights(votes, actual)
 
             # 2. Pattern Analysis with Weight Decay (Incremental Learning)
             limit = 300
-            if include_archived:
-                cursor.execute("SELECT actual_result, ai_prediction FROM trades WHERE actual_result IS NOT NULL ORDER BY timestamp DESC LIMIT ?", (limit,))
-            else:
-                cursor.execute("SELECT actual_result, ai_prediction FROM trades WHERE actual_result IS NOT NULL AND is_archived = 0 ORDER BY timestamp DESC LIMIT ?", (limit,))
-            
-            results_rows = list(reversed(cursor.fetchall()))
+            # The full history comes from the bit-packed store (in id order); the live
+            # window needs the epoch column, so it stays on SQLite
+            store = get_history_store(create=False) if include_archived else None
+            results_rows = store.last(limit, conn) if store is not None else None
+            if results_rows is None:
+                cursor.execute(TRAINING_WINDOW_ALL if include_archived else TRAINING_WINDOW_LIVE, (limit,))
+                results_rows = list(reversed(cursor.fetchall()))
             if len(results_rows) < 5:
+                if weights_changed: self._save_state()
                 return False
                 
             results = ["B" if r[0] == "BIG" else "S" for r in results_rows]
             
-            # Apply Weight Decay to existing patterns
-            new_patterns = {}
-            for p, counts in self.patterns.get("patterns", {}).items():
-                new_patterns[p] = {k: v * 0.95 for k, v in counts.items()} # 5% decay
+            # Apply Weight Decay to existing patterns (in place; the trie keeps its nodes)
+            patterns = self.patterns.get("patterns")
+            if not isinstance(patterns, ContextTrie):
+                patterns = self.patterns["patterns"] = ContextTrie(patterns or {})
+            for counts in patterns.values():
+                for k in counts:
+                    counts[k] *= self.pattern_decay # 5% decay
+            self._note_scale("model_patterns", self.pattern_decay)
                 
-            error_matrix = self.patterns.get("error_matrix", {}).copy()
+            error_matrix = self.patterns.get("error_matrix")
+            if not isinstance(error_matrix, ContextTrie):
+                error_matrix = self.patterns["error_matrix"] = self._compact_error_matrix(error_matrix or {})
             
             total_results = len(results)
-            max_pattern_length = min(8, total_results - 1)
+            max_pattern_length = self.pattern_train_length
+            recent_weight, mid_weight, old_weight = self.recency_weights
+            new_counts = lambda: {"B": 0, "S": 0}
+            
+            # One backward walk per outcome updates every context length ending before it
+            for t in range(max(1, total_results - 100), total_results):
+                next_val = results[t]
+                # Distance-based weighting (Recency Bias)
+                dist_from_end = total_results - t
+                weight = recent_weight if dist_from_end <= 5 else mid_weight if dist_from_end <= 15 else old_weight
+                for counts in patterns.ensure_suffixes(results, t, max_pattern_length, new_counts):
+                    counts[next_val] += weight
             
-            for length in range(1, max_pattern_length + 1):
-                start_idx = max(0, total_results - length - 100)
-                for i in range(start_idx, total_results - length):
-                    pattern = "".join(results[i:i+length])
-                    next_val = results[i+length]
-                    
-                    # Distance-based weighting (Recency Bias)
-                    dist_from_end = total_results - (i + length)
-                    weight = 15.0 if dist_from_end <= 5 else 8.0 if dist_from_end <= 15 else 2.0
-                    
-                    if pattern not in new_patterns:
-                        new_patterns[pattern] = {"B": 0, "S": 0}
-                    new_patterns[pattern][next_val] += weight
-                    
-                    # Error Analysis
-                    actual = results_rows[i+length][0]
-                    pred = results_rows[i+length][1]
-                    if pattern not in error_matrix:
-                        error_matrix[pattern] = {"wins": 0, "losses": 0}
-                    
-                    inc = 5 if dist_from_end <= 5 else 2 if dist_from_end <= 15 else 1
+            # Error Analysis: each result is counted exactly once (tracked by trade id),
+            # so retraining over overlapping windows no longer inflates the counts.
+            last_counted = self.patterns.get("error_cursor", 0)
+            newest_id = max(r[2] for r in results_rows)
+            if newest_id < last_counted:
+                last_counted = 0 # Database was reset underneath us
+            fresh = [j for j in range(1, total_results) if results_rows[j][2] > last_counted]
+            if fresh:
+                self._decay_error_matrix(error_matrix, len(fresh))
+                self._note_scale("model_error_matrix", self.error_decay ** len(fresh))
+            corrections = []
+            for j in fresh:
+                actual = results_rows[j][0]
+                pred = results_rows[j][1]
+                # Only results served with a real prediction are scored; bulk input and
+                # warmup rows carry none (None from the history store, 'INITIAL' in SQLite)
+                if pred not in ("BIG", "SMALL"): continue
+                contexts = error_matrix.ensure_suffixes(results, j, max_pattern_length, lambda: [0.0, 0.0])
+                for length, stats in enumerate(contexts, 1):
                     if actual == pred:
-                        error_matrix[pattern]["wins"] += inc
+                        stats[0] += 1
                     else:
-                        error_matrix[pattern]["losses"] += inc
-                        self.update_correction_table(pattern, pred, actual)
+                        stats[1] += 1
+                        pattern = "".join(results[j-length:j])
+                        corrections.append(submit_write(self._apply_correction, pattern, pred, actual))
+            self._prune_error_matrix(error_matrix)
+            self._compact_trie("error_matrix")
+            # Corrections were queued together so they land in one group commit
+            for future in corrections:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Correction Table Update Error: {e}")
+            self.patterns["error_cursor"] = newest_id
             
             # Pruning old/weak patterns
-            if len(new_patterns) > 2500:
-                sorted_patterns = sorted(new_patterns.items(), key=lambda x: sum(x[1].values()), reverse=True)
-                new_patterns = dict(sorted_patterns[:2500])
+            if len(patterns) > self.pattern_limit:
+                sorted_patterns = sorted(patterns.items(), key=lambda x: sum(x[1].values()), reverse=True)
+                for pattern, _ in sorted_patterns[self.pattern_limit:]:
+                    del patterns[pattern]
+                self._compact_trie("patterns")
                 
-            self.patterns["patterns"] = new_patterns
-            self.patterns["error_matrix"] = error_matrix
             self.patterns["markov_probabilities"] = self._calculate_markov_probabilities(results)
-            self._save_patterns()
+            self._save_state()
+            self.last_trained_at = time.time()
             return True
             
         except Exception as e:
             print(f"Training error: {e}")
             return False
+        finally:
+            if own_conn and conn: conn.close()
+
+    def _rebuild_checkpoint_path(self):
+        return os.path.splitext(self.db_path)[0] + '.rebuild.json'
+
+    def _save_rebuild_checkpoint(self, state):
+        path = self._rebuild_checkpoint_path()
+        data = dict(state)
+        data["patterns"] = dict(state["patterns"].items())
+        data["error_matrix"] = dict(state["error_matrix"].items())
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+
+    def _load_rebuild_checkpoint(self):
+        path = self._rebuild_checkpoint_path()
+        if not os.path.exists(path): return None
+        try:
+            with open(path, 'r') as f:
+                state = json.load(f)
+            state["patterns"] = ContextTrie(state["patterns"])
+            state["error_matrix"] = ContextTrie(state["error_matrix"])
+            return state
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading rebuild checkpoint: {e}")
+            return None
+
+    def rebuild_from_history(self, chunk_size=5000, resume=True, checkpoint_every=10, progress=None):
+        """
+        Full rebuild of the pattern tables, error matrix and Markov chain from every
+        stored result (archived included), streamed in id order with bounded memory:
+        pages of `chunk_size` results are read by keyset (id > last) from the history
+        store (from SQLite with fetchmany if it isn't open), the last
+        `pattern_train_length` results are carried across pages, and progress is
+        checkpointed every `checkpoint_every` pages so an interrupted run resumes.
+        Each result is counted once with the per-result error decay; the normal
+        incremental training then keeps the recent window weighted as usual.
+        """
+        chunk_size = max(1, min(int(chunk_size), REBUILD_CHUNK_LIMIT))
+        status = self.rebuild_status = {"state": "running", "processed": 0, "total": 0, "rows_per_sec": 0.0, "started": time.time()}
+        max_len = self.pattern_train_length
+        decay = self.error_decay
+        state = self._load_rebuild_checkpoint() if resume else None
+        if not state:
+            state = {"last_id": 0, "processed": 0, "tail": [], "markov": {"B": {"B": 0, "S": 0}, "S": {"B": 0, "S": 0}},
+                     "patterns": ContextTrie(), "error_matrix": ContextTrie()}
+        patterns, error_matrix, markov = state["patterns"], state["error_matrix"], state["markov"]
+        new_counts = lambda: {"B": 0, "S": 0}
+        new_stats = lambda: [0.0, 0.0]
+        
+        conn = None
+        start = time.time()
+        resumed_from = state["processed"]
+        pages = 0
+        try:
+            conn = get_db_connection()
+            store = get_history_store(create=False)
+            if store is not None:
+                store.sync(conn)
+                status["total"] = store.count()
+            else:
+                status["total"] = conn.execute("SELECT COUNT(*) FROM trades WHERE actual_result IS NOT NULL").fetchone()[0]
+            status["processed"] = state["processed"]
+            while True:
+                if store is not None:
+                    rows = store.page(state["last_id"], chunk_size)
+                else:
+                    # Keyset page: a short statement per chunk, so writers are never blocked for long
+                    cursor = conn.execute("SELECT actual_result, ai_prediction, id FROM trades WHERE id > ? AND actual_result IS NOT NULL ORDER BY id LIMIT ?",
+                                          (state["last_id"], chunk_size))
+                    rows = cursor.fetchmany(chunk_size)
+                    cursor.close()
+                if not rows: break
+                
+                history = state["tail"] + ["B" if r[0] == "BIG" else "S" for r in rows]
+                base = len(state["tail"])
+                # Lazy decay: add growing weights, then scale everything back once per page
+                # (or sooner, before the weights could overflow on a long page)
+                boost, steps = 1.0, 0
+                for j, row in enumerate(rows):
+                    t = base + j
+                    if boost > 1e100:
+                        self._rescale_rebuild(patterns, error_matrix, boost, steps)
+                        boost, steps = 1.0, 0
+                    boost /= decay
+                    steps += 1
+                    if t == 0: continue
+                    actual = history[t]
+                    markov[history[t - 1]][actual] += 1
+                    for counts in patterns.ensure_suffixes(history, t, max_len, new_counts):
+                        counts[actual] += boost
+                    if row[1] not in ("BIG", "SMALL"): continue
+                    correct = row[1] == row[0]
+                    for stats in error_matrix.ensure_suffixes(history, t, max_len, new_stats):
+                        stats[0 if correct else 1] += boost
+                
+                self._rescale_rebuild(patterns, error_matrix, boost, steps)
+                self._prune_error_matrix(error_matrix)
+                if len(patterns) > self.pattern_limit:
+                    ranked = sorted(patterns.items(), key=lambda x: sum(x[1].values()), reverse=True)
+                    for pattern, _ in ranked[self.pattern_limit:]:
+                        del patterns[pattern]
+                if patterns.needs_compaction(): patterns = state["patterns"] = patterns.compacted()
+                if error_matrix.needs_compaction(): error_matrix = state["error_matrix"] = error_matrix.compacted()
+                
+                state["tail"] = history[-max_len:]
+                state["last_id"] = rows[-1][2]
+                state["processed"] += len(rows)
+                pages += 1
+                elapsed = max(time.time() - start, 1e-6)
+                status["processed"] = state["processed"]
+                status["rows_per_sec"] = round((state["processed"] - resumed_from) / elapsed, 1)
+                if progress: progress(dict(status))
+                if checkpoint_every and pages % checkpoint_every == 0:
+                    self._save_rebuild_checkpoint(state)
+        except Exception as e:
+            # The checkpoint of the last completed pages stays on disk for a resume
+            print(f"Rebuild error: {e}")
+            status.update(state="failed", error=str(e))
+            return status
         finally:
             if conn: conn.close()
+        
+        markov_probs = {}
+        for st, counts in markov.items():
+            total = sum(counts.values())
+            if total: markov_probs[st] = {k: v / total for k, v in counts.items()}
+        try:
+            status["changed_rows"] = submit_write(self._install_rebuild, patterns, error_matrix, markov_probs, state["last_id"]).result()
+        except Exception as e:
+            print(f"Rebuild error: {e}")
+            self._persisted = None
+            status.update(state="failed", error=str(e))
+            return status
+        if os.path.exists(self._rebuild_checkpoint_path()):
+            os.remove(self._rebuild_checkpoint_path())
+        status.update(state="done", seconds=round(time.time() - start, 2), model_version=self.model_version)
+        if progress: progress(dict(status))
+        return status
+
+    def _rescale_rebuild(self, patterns, error_matrix, boost, steps):
+        for counts in patterns.values():
+            for k in counts:
+                counts[k] /= boost
+        # boost == decay ** -steps: rescales and drops entries below the minimum weight
+        self._decay_error_matrix(error_matrix, steps)
+
+    def _install_rebuild(self, conn, patterns, error_matrix, markov, last_id):
+        # Runs on the writer thread, so it never interleaves with incremental training
+        self.patterns = {"patterns": patterns, "markov_probabilities": markov or self.patterns.get("markov_probabilities", {}),
+                         "error_matrix": error_matrix, "error_cursor": last_id}
+        self._persisted = None # Replaced wholesale: write a snapshot, not a journal entry
+        return self._persist_state(conn)
+
+    def start_background_rebuild(self, **kwargs):
+        """Runs rebuild_from_history in a daemon thread. Returns False if one is already running."""
+        with self._rebuild_lock:
+            if self._rebuilder and self._rebuilder.is_alive(): return False
+            self.rebuild_status = {"state": "starting"}
+            self._rebuilder = threading.Thread(target=contextvars.copy_context().run, args=(lambda: self.rebuild_from_history(**kwargs),),
+                                               name="model-rebuild", daemon=True)
+            self._rebuilder.start()
+        return True
+
+    def _sync_context_tree(self):
+        """Feeds results committed since the tree's cursor into the context tree, in trades.id order."""
+        with self._context_lock:
+            conn = None
+            try:
+                conn = get_db_connection()
+                row = conn.execute(TRADES_SEQUENCE).fetchone()
+                newest = row[0] if row else 0
+                if self.context_tree is None or newest < self._context_cursor:
+                    # First use, or the database was replaced underneath us
+                    self.context_tree = ContextTree(self.context_depth, self.context_budget)
+                    self._context_cursor = max(0, newest - self.context_warmup)
+                while True:
+                    rows = conn.execute(CONTEXT_FEED, (self._context_cursor, 5000)).fetchall()
+                    if not rows: break
+                    for _, result in rows:
+                        self.context_tree.update(result)
+                    self._context_cursor = rows[-1][0]
+            except sqlite3.Error as e:
+                print(f"Error syncing context tree: {e}")
+            finally:
+                if conn: conn.close()
+            return self.context_tree
 
     def _calculate_markov_probabilities(self, results):
         if len(results) < 2: return {}
@@ -268,6 +856,7 @@ class ModelACore:
         """
         Enhanced Prediction with Multi-Strategy Weighted Consensus.
         """
+        self._sync_state()
         results = self._get_last_n_results(60)
         if not results:
             return {"prediction": random.choice(["BIG", "SMALL"]), "confidence": 50.0, "source": "Random (No Data)"}
@@ -305,6 +894,13 @@ class ModelACore:
             votes[f_pred] += f_conf * weight
             details["fib"] = {"pred": f_pred, "conf": f_conf}
 
+        # 5. Context Tree Weighting Strategy
+        c_pred, c_conf = self._strategy_context_tree()
+        if c_pred:
+            weight = self.strategy_weights.get("ctw", 1.0)
+            votes[c_pred] += c_conf * weight
+            details["ctw"] = {"pred": c_pred, "conf": c_conf}
+
         # Consensus
         prediction = "BIG" if votes["BIG"] > votes["SMALL"] else "SMALL"
         total_votes = votes["BIG"] + votes["SMALL"]
@@ -316,7 +912,8 @@ class ModelACore:
             "pattern": "Pattern Analysis",
             "trend": "Trend Detection",
             "markov": "Markov Chain Analysis",
-            "fib": "Fibonacci Sequence"
+            "fib": "Fibonacci Sequence",
+            "ctw": "Context Tree Weighting"
         }
         
         return {
@@ -327,10 +924,10 @@ class ModelACore:
         }
 
     def _strategy_pattern(self, results):
-        for length in range(6, 1, -1):
-            pattern = "".join(results[-length:])
-            if pattern in self.patterns.get("patterns", {}):
-                counts = self.patterns["patterns"][pattern]
+        # One walk back from the latest result finds every known context; use the longest
+        matches = self.patterns["patterns"].suffix_matches(results, self.pattern_match_length)
+        for length, counts in reversed(matches):
+            if length > 1:
                 total = sum(counts.values())
                 if total > 5:
                     pred = "BIG" if counts["B"] > counts["S"] else "SMALL"
@@ -356,6 +953,14 @@ class ModelACore:
             return pred, conf
         return None, 0
 
+    def _strategy_context_tree(self):
+        # The tree keeps its own context (the newest results in id order)
+        tree = self._sync_context_tree()
+        if tree is None or tree.tick < self.context_min_results: return None, 0
+        p_big = tree.predict()
+        pred = "BIG" if p_big >= 0.5 else "SMALL"
+        return pred, max(p_big, 1.0 - p_big) * 100
+
     def _strategy_fibonacci(self, results):
         # Simple Fibonacci-based pattern detection
         if len(results) < 8: return None, 0
@@ -376,8 +981,11 @@ class ModelACore:
         conn = None
         try:
             conn = get_db_connection()
+            store = get_history_store(create=False)
+            rows = store.last(n, conn) if store is not None else None
+            if rows is not None: return [row[0] for row in rows]
             cursor = conn.cursor()
-            cursor.execute("SELECT actual_result FROM trades WHERE actual_result IS NOT NULL ORDER BY timestamp DESC LIMIT ?", (n,))
+            cursor.execute(LAST_RESULTS, (n,))
             rows = cursor.fetchall()
             return [row[0] for row in reversed(rows)]
         except Exception as e:
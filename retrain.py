@@ -0,0 +1,26 @@
+from utils.db_manager import init_db, DB_PATH
+from models.model_a_core import ModelACore
+import argparse
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the model from the full trade history")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows read per page")
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="pages between checkpoints (0 = never)")
+    parser.add_argument("--no-resume", action="store_true", help="ignore an existing checkpoint and start over")
+    args = parser.parse_args()
+
+    print(f"Rebuilding model from {DB_PATH}...")
+    init_db()
+    model = ModelACore()
+
+    def report(status):
+        if status["state"] == "running":
+            total = status["total"] or 1
+            print(f"  {status['processed']}/{status['total']} results ({status['processed'] * 100 / total:.1f}%), {status['rows_per_sec']} rows/s")
+
+    status = model.rebuild_from_history(chunk_size=args.chunk_size, resume=not args.no_resume,
+                                        checkpoint_every=args.checkpoint_every, progress=report)
+    if status["state"] == "done":
+        print(f"Done in {status['seconds']}s: {status['processed']} results, model version {status['model_version']}")
+    else:
+        print(f"Rebuild failed: {status.get('error')} (rerun to resume from the last checkpoint)")
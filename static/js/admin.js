@@ -0,0 +1,39 @@
+// Admin analytics: rollup rows from /api/admin/analytics, paged with the keyset cursor
+let analyticsCursor = null;
+
+function analyticsRow(item) {
+    const tr = document.createElement('tr');
+    [item.bucket, item.value, item.total, item.correct, item.accuracy + '%'].forEach(text => {
+        const td = document.createElement('td');
+        td.innerText = text;
+        tr.appendChild(td);
+    });
+    return tr;
+}
+
+async function loadAnalytics(reset) {
+    const period = document.getElementById('analytics-period').value;
+    const dimension = document.getElementById('analytics-dimension').value;
+    const body = document.getElementById('analytics-body');
+    const more = document.getElementById('analytics-more');
+    if (reset) analyticsCursor = null;
+
+    const params = new URLSearchParams({ period: period, dimension: dimension, limit: 50 });
+    if (analyticsCursor) params.set('after', analyticsCursor);
+
+    try {
+        const response = await fetch('/api/admin/analytics?' + params.toString());
+        const data = await response.json();
+        if (data.status !== 'success') return;
+        if (reset) body.innerHTML = '';
+        data.items.forEach(item => body.appendChild(analyticsRow(item)));
+        analyticsCursor = data.next;
+        more.style.display = data.next ? 'block' : 'none';
+    } catch (error) {
+        console.error('Analytics Error:', error);
+    }
+}
+
+document.getElementById('analytics-period').addEventListener('change', () => loadAnalytics(true));
+document.getElementById('analytics-dimension').addEventListener('change', () => loadAnalytics(true));
+document.getElementById('analytics-more').addEventListener('click', () => loadAnalytics(false));
@@ -130,46 +130,76 @@ async function submitResult(actualResult) {
     }
 }
 
+// Incremental trade sync state: rows keyed by trade_id plus the server change cursor
+const TRADE_FIELDS = 'id,trade_id,timestamp,ai_prediction,actual_result,ai_confidence';
+const HISTORY_SIZE = 10;
+let tradeCursor = 0;
+let tradeRows = new Map();
+
+async function syncTrades() {
+    const response = await fetch(`/api/trades?since=${tradeCursor}&limit=${HISTORY_SIZE}&fields=${TRADE_FIELDS}`);
+    const data = await response.json();
+    if (data.status !== 'success') return;
+
+    const wasFull = tradeRows.size >= HISTORY_SIZE;
+    if (data.reset) tradeRows = new Map();
+    data.deleted.forEach(tradeId => tradeRows.delete(tradeId));
+    data.upserts.forEach(trade => tradeRows.set(trade.trade_id, trade));
+    tradeCursor = data.cursor;
+
+    // Keep only the newest rows that are displayed
+    const newest = [...tradeRows.values()].sort((a, b) => b.id - a.id);
+    newest.slice(HISTORY_SIZE).forEach(trade => tradeRows.delete(trade.trade_id));
+    if (!data.reset && wasFull && tradeRows.size < HISTORY_SIZE) {
+        // An undo exposed older rows this client never received: take a fresh snapshot
+        tradeCursor = 0;
+        return syncTrades();
+    }
+    renderHistory(newest.slice(0, HISTORY_SIZE));
+}
+
+function renderHistory(trades) {
+    const historyList = document.getElementById('history-list');
+    if (trades.length === 0) {
+        historyList.innerHTML = '<p style="text-align: center; color: var(--text-secondary); font-size: 0.9rem; padding: 20px;">এখনো কোনো ট্রেড নেই। শুরু করতে সিগন্যাল নিন!</p>';
+        return;
+    }
+    let html = '';
+    trades.forEach(trade => {
+        const time = trade.timestamp.includes(' ') ? trade.timestamp.split(' ')[1] : trade.timestamp;
+        const statusClass = trade.actual_result === trade.ai_prediction ? 'status-win' : 'status-loss';
+        const statusText = trade.actual_result === trade.ai_prediction ? 'জয়' : 'হার';
+        const predText = trade.ai_prediction === 'BIG' ? 'BIG' : trade.ai_prediction === 'SMALL' ? 'SMALL' : trade.ai_prediction;
+        const actualText = trade.actual_result === 'BIG' ? 'BIG' : trade.actual_result === 'SMALL' ? 'SMALL' : '???';
+        
+        html += `
+        <div class="history-item">
+            <div class="item-info">
+                <span class="item-main">${predText} → ${actualText}</span>
+                <span class="item-sub">${time} | কনফিডেন্স: ${trade.ai_confidence}%</span>
+            </div>
+            <div style="display: flex; align-items: center;">
+                ${trade.ai_prediction !== 'INITIAL' ? 
+                    `<span class="item-status ${statusClass}">${statusText}</span>` : 
+                    `<span class="item-status" style="background: #555;">ডেটা</span>`}
+                <button onclick="undoTrade('${trade.trade_id}')" class="undo-btn">মুছুন</button>
+            </div>
+        </div>`;
+    });
+    historyList.innerHTML = html;
+}
+
 async function updateDashboardUI() {
     try {
-        const response = await fetch('/api/dashboard-data');
+        const [response] = await Promise.all([fetch('/api/dashboard-data?trades=0'), syncTrades()]);
         const data = await response.json();
         
         if (data.status === 'success') {
             document.getElementById('live-accuracy').innerText = data.accuracy + '%';
-            document.querySelector('.learning-stats').innerText = data.total_collected + ' প্যাটার্ন ট্র্যাক করা হয়েছে';
+            document.querySelector('.learning-stats').innerText = data.total_collected + ' প্যাটার্ন ট্র্যাক করা হয়েছে';
             document.querySelector('.progress-bar-fill').style.width = data.learning_percent + '%';
             document.querySelectorAll('.progress-text')[1].innerText = data.learning_percent + '% অপ্টিমাইজেশন';
             
-            const historyList = document.getElementById('history-list');
-            if (data.trades.length === 0) {
-                historyList.innerHTML = '<p style="text-align: center; color: var(--text-secondary); font-size: 0.9rem; padding: 20px;">এখনো কোনো ট্রেড নেই। শুরু করতে সিগন্যাল নিন!</p>';
-            } else {
-                let html = '';
-                data.trades.forEach(trade => {
-                    const time = trade.timestamp.includes(' ') ? trade.timestamp.split(' ')[1] : trade.timestamp;
-                    const statusClass = trade.actual_result === trade.ai_prediction ? 'status-win' : 'status-loss';
-                    const statusText = trade.actual_result === trade.ai_prediction ? 'জয়' : 'হার';
-                    const predText = trade.ai_prediction === 'BIG' ? 'BIG' : trade.ai_prediction === 'SMALL' ? 'SMALL' : trade.ai_prediction;
-                    const actualText = trade.actual_result === 'BIG' ? 'BIG' : trade.actual_result === 'SMALL' ? 'SMALL' : '???';
-                    
-                    html += `
-                    <div class="history-item">
-                        <div class="item-info">
-                            <span class="item-main">${predText} → ${actualText}</span>
-                            <span class="item-sub">${time} | কনফিডেন্স: ${trade.ai_confidence}%</span>
-                        </div>
-                        <div style="display: flex; align-items: center;">
-                            ${trade.ai_prediction !== 'INITIAL' ? 
-                                `<span class="item-status ${statusClass}">${statusText}</span>` : 
-                                `<span class="item-status" style="background: #555;">ডেটা</span>`}
-                            <button onclick="undoTrade('${trade.trade_id}')" class="undo-btn">মুছুন</button>
-                        </div>
-                    </div>`;
-                });
-                historyList.innerHTML = html;
-            }
-            
             const predDisplay = document.getElementById('prediction-display');
             predDisplay.innerText = '---';
             predDisplay.style.color = '';
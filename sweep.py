@@ -0,0 +1,212 @@
+"""
+Offline hyperparameter sweep for the signal stack.
+
+Loads the result history once and hands it read-only to a pool of worker
+processes. Each worker scores parameter sets by walk-forward replay: every
+result is first predicted by ModelACore + MultiManagerSystem running that
+configuration, then saved and trained on, just like /api/get-signal and
+/api/submit-result do live. Configurations are ranked by signal accuracy.
+
+Usage:
+    python sweep.py --last 1000 --samples 64
+    python sweep.py --grid --param model.pattern_decay=0.9,0.95,0.98 --param manager.skip_win_rate=40,45,50
+    python sweep.py --workers 8 --output sweep.json
+
+Workers replay into their own throwaway databases, so the source database is only read.
+"""
+import argparse
+import ast
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Tunable constants, as "<model|manager>.<attribute>": candidate values (first = current default)
+DEFAULT_GRID = {
+    "model.pattern_decay": [0.95, 0.9, 0.98],
+    "model.recency_weights": [(15.0, 8.0, 2.0), (10.0, 5.0, 1.0), (20.0, 8.0, 1.0)],
+    "model.pattern_limit": [2500, 1500, 4000],
+    "manager.cid_thresholds": [(0.55, 0.60, 0.70), (0.50, 0.55, 0.65), (0.60, 0.65, 0.75)],
+    "manager.loss_threshold": [3, 2, 4],
+    "manager.skip_win_rate": [45.0, 40.0, 50.0],
+    "manager.dragon_priority_streak": [5, 4, 6],
+    "manager.cid_override_confidence": [75, 70, 80],
+}
+
+# Everything a replay writes; cleared between configurations
+REPLAY_TABLES = ("trades", "trade_changes", "trade_rollups", "correction_table", "model_patterns",
+                 "model_error_matrix", "model_markov", "model_weights", "model_journal", "model_meta")
+
+_history = None
+
+def _init_worker(history, db_dir):
+    global _history
+    _history = history
+    # DATABASE_PATH must be set before the app modules are imported
+    os.environ["DATABASE_PATH"] = os.path.join(db_dir, f"sweep-{os.getpid()}.db")
+
+def _clear_replay(conn):
+    for table in REPLAY_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+
+def evaluate(config, warmup=50):
+    """Walk-forward replay of the worker's history under `config`. Returns its score card."""
+    from datetime import datetime, timedelta
+    from utils.db_manager import DB_PATH, IST, TIMESTAMP_FORMAT, init_db, add_trade, submit_write
+    from models.model_a_core import ModelACore
+    from utils.multi_manager import MultiManagerSystem
+
+    init_db()
+    submit_write(_clear_replay).result()
+    # Every configuration starts from the same blank model, not the shipped seed files
+    model = ModelACore(seed=False, sweeper=False)
+    manager = MultiManagerSystem(model, DB_PATH)
+    for key, value in config.items():
+        target, name = key.split(".", 1)
+        setattr(model if target == "model" else manager, name, tuple(value) if isinstance(value, list) else value)
+
+    start = time.time()
+    # Distinct, recent timestamps keep ORDER BY timestamp stable and inside the 7-day CID window
+    base = datetime.now(tz=IST) - timedelta(seconds=len(_history))
+    signals = correct = skipped = streak = max_streak = 0
+    for i, symbol in enumerate(_history):
+        actual = "BIG" if symbol == "B" else "SMALL"
+        prediction, confidence, source, votes = "INITIAL", 0.0, "Sweep Warmup", None
+        if i >= warmup:
+            raw = model.predict()
+            votes = {s: d["pred"] for s, d in raw.get("details", {}).items()}
+            signal = manager.process_signal(raw)
+            prediction, confidence, source = signal["prediction"], signal["confidence"], signal["source"]
+            if prediction in ("BIG", "SMALL"):
+                signals += 1
+                if prediction == actual:
+                    correct += 1
+                    streak = 0
+                else:
+                    streak += 1
+                    max_streak = max(max_streak, streak)
+            else:
+                skipped += 1
+        trade = {
+            "user_id": "sweep",
+            "session_id": "sweep",
+            "trade_id": f"sweep_{i}",
+            "timestamp": (base + timedelta(seconds=i)).strftime(TIMESTAMP_FORMAT),
+            "ai_prediction": prediction,
+            "ai_confidence": confidence,
+            "signal_source": source,
+            "actual_result": actual
+        }
+        revision = add_trade(trade, then=lambda conn, v=votes, a=actual: model.train_from_db(conn=conn, votes=v, actual=a))
+        if revision: manager.record_result(trade, revision)
+    model.close()
+
+    scored = max(1, len(_history) - warmup)
+    return {
+        "config": config,
+        "signals": signals,
+        "correct": correct,
+        "accuracy": round(correct / signals * 100, 2) if signals else 0.0,
+        "coverage": round(signals / scored * 100, 2),
+        "skipped": skipped,
+        "max_loss_streak": max_streak,
+        "seconds": round(time.time() - start, 2)
+    }
+
+def load_history(db_path, last=None):
+    """Results oldest first as a compact 'B'/'S' string (archived epochs included)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT actual_result FROM trades WHERE actual_result IN ('BIG', 'SMALL') ORDER BY timestamp, id").fetchall()
+    finally:
+        conn.close()
+    history = "".join("B" if r[0] == "BIG" else "S" for r in rows)
+    return history[-last:] if last else history
+
+def make_configs(grid, samples=None, seed=None):
+    """Every combination of `grid` (samples=None) or `samples` distinct random draws from it."""
+    keys = list(grid)
+    combos = itertools.product(*(grid[k] for k in keys))
+    if samples is None:
+        return [dict(zip(keys, c)) for c in combos]
+    rng = random.Random(seed)
+    total = 1
+    for k in keys: total *= len(grid[k])
+    picks = set()
+    # The defaults (first value of each parameter) are always included as the baseline
+    configs = [{k: grid[k][0] for k in keys}]
+    picks.add(tuple(0 for _ in keys))
+    while len(configs) < min(samples, total):
+        pick = tuple(rng.randrange(len(grid[k])) for k in keys)
+        if pick in picks: continue
+        picks.add(pick)
+        configs.append({k: grid[k][i] for k, i in zip(keys, pick)})
+    return configs
+
+def rank(results, min_coverage=20.0):
+    """Best first: enough coverage, then accuracy, then number of signals."""
+    return sorted(results, key=lambda r: (r["coverage"] >= min_coverage, r["accuracy"], r["signals"]), reverse=True)
+
+def run_sweep(history, configs, workers=None, warmup=50, progress=None):
+    """Scores `configs` on `history` across a process pool; results come back in `configs` order."""
+    workers = workers or os.cpu_count() or 1
+    results = []
+    with tempfile.TemporaryDirectory(prefix="aimaster-sweep-") as db_dir:
+        # spawn: workers import the app modules fresh, after DATABASE_PATH is set
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(history, db_dir)) as pool:
+            for result in pool.map(evaluate, configs, itertools.repeat(warmup)):
+                results.append(result)
+                if progress: progress(result, len(results), len(configs))
+    return results
+
+def _parse_params(specs):
+    grid = dict(DEFAULT_GRID)
+    for spec in specs or []:
+        name, _, values = spec.partition("=")
+        if name not in DEFAULT_GRID:
+            raise SystemExit(f"Unknown parameter {name!r} (choose from {', '.join(DEFAULT_GRID)})")
+        grid[name] = ast.literal_eval(f"[{values}]")
+    return grid
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep for the signal stack")
+    parser.add_argument("--db", default="database.db", help="database to read the history from")
+    parser.add_argument("--last", type=int, default=None, help="replay only the newest N results")
+    parser.add_argument("--warmup", type=int, default=50, help="results trained on before scoring starts")
+    parser.add_argument("--grid", action="store_true", help="evaluate every combination instead of sampling")
+    parser.add_argument("--samples", type=int, default=32, help="random configurations to evaluate")
+    parser.add_argument("--param", action="append", help="override a grid, e.g. model.pattern_decay=0.9,0.95")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--min-coverage", type=float, default=20.0, help="min % of results that must get a signal")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", default=None, help="also write all ranked results as JSON")
+    args = parser.parse_args()
+
+    history = load_history(args.db, args.last)
+    if len(history) <= args.warmup:
+        raise SystemExit(f"Only {len(history)} results in {args.db}; need more than --warmup ({args.warmup})")
+    configs = make_configs(_parse_params(args.param), None if args.grid else args.samples, args.seed)
+    print(f"Replaying {len(history)} results under {len(configs)} configurations...")
+
+    def report(result, done, total):
+        print(f"  [{done}/{total}] accuracy {result['accuracy']}% coverage {result['coverage']}% ({result['seconds']}s)")
+
+    start = time.time()
+    ranked = rank(run_sweep(history, configs, args.workers, args.warmup, report), args.min_coverage)
+    print(f"Done in {time.time() - start:.1f}s. Top {min(args.top, len(ranked))}:")
+    for i, r in enumerate(ranked[:args.top], 1):
+        print(f"{i:>3}. {r['accuracy']:6.2f}% on {r['signals']} signals ({r['coverage']}% coverage, "
+              f"max loss streak {r['max_loss_streak']}): {json.dumps(r['config'])}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(ranked, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import random
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.db_manager import init_db, add_trades, delete_trade, get_db_connection
+from utils.analytics import get_rollups, get_rollup_summary
+
+def test_analytics():
+    print("--- Starting Admin Analytics Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+    rng = random.Random(3)
+    add_trades([{
+        "user_id": f"user_{i % 4}",
+        "session_id": "analytics_session",
+        "trade_id": f"a_{i}",
+        "timestamp": f"2026-03-{1 + i % 5:02d} {i % 24:02d}:15:00",
+        "ai_prediction": rng.choice(["BIG", "SMALL", "INITIAL"]),
+        "ai_confidence": rng.uniform(40, 100),
+        "signal_source": rng.choice(["Pattern Analysis", "CID Scanner", "Trend Detection"]),
+        "actual_result": rng.choice(["BIG", "SMALL"])
+    } for i in range(400)])
+    for i in range(0, 400, 7):
+        delete_trade(f"a_{i}")
+
+    # 1. Write-time rollups match a full scan of trades
+    print("\n[Step 1] Rollups vs full scan...")
+    conn = get_db_connection()
+    try:
+        expected = {r[0]: (r[1], r[2]) for r in conn.execute("""
+            SELECT signal_source, COUNT(*), SUM(ai_prediction = actual_result) FROM trades
+            WHERE actual_result IS NOT NULL AND ai_prediction IN ('BIG', 'SMALL') GROUP BY signal_source
+        """)}
+    finally:
+        conn.close()
+    summary = {s["value"]: (s["total"], s["correct"]) for s in get_rollup_summary("source")}
+    print(f"Per source: {summary}")
+    assert summary == expected
+    confidence = get_rollup_summary("confidence")
+    assert sum(c["total"] for c in confidence) == sum(t for t, _ in expected.values())
+
+    # 2. Keyset pages cover every hourly row exactly once
+    print("\n[Step 2] Keyset pagination...")
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = get_rollups(period="hour", dimension="user", after=cursor, limit=25)
+        seen += [(r["bucket"], r["value"]) for r in page["items"]]
+        pages += 1
+        cursor = page["next"]
+        if not cursor: break
+    print(f"Rows: {len(seen)} in {pages} pages")
+    assert len(seen) == len(set(seen)) and seen == sorted(seen, reverse=True)
+    assert sum(r["total"] for r in get_rollup_summary("user")) == sum(t for t, _ in expected.values())
+
+    # Admin routes need the admin password
+    print("\n[Step 3] Admin access...")
+    import app as app_module
+    from config import Config
+    client = app_module.app.test_client()
+    assert client.get("/api/admin/analytics/summary").status_code == 403
+    assert client.get("/api/admin/sql").status_code == 403
+    response = client.get("/admin")
+    assert response.status_code == 302 and "/admin/login" in response.headers["Location"]
+    assert client.post("/admin/login", data={"password": "wrong"}).status_code == 401
+    response = client.post("/admin/login?next=//evil.example", data={"password": Config.ADMIN_PASSWORD})
+    assert response.status_code == 302 and response.headers["Location"].endswith("/admin")
+    assert client.get("/api/admin/analytics/summary").status_code == 200
+    client.post("/admin/logout")
+    assert client.get("/api/admin/stats").status_code == 403
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_analytics()
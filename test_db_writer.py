@@ -0,0 +1,77 @@
+import os
+import sys
+import threading
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.db_manager import init_db, add_trade, add_trades, delete_trade, get_total_trades_count, get_writer, submit_write, \
+    archive_all_trades, get_trade_changes
+
+def _trade(trade_id):
+    return {
+        "user_id": "test",
+        "session_id": "writer_session",
+        "trade_id": trade_id,
+        "ai_prediction": "BIG",
+        "ai_confidence": 60.0,
+        "signal_source": "Test",
+        "actual_result": "SMALL"
+    }
+
+def test_db_writer():
+    print("--- Starting DB Writer Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+    writer = get_writer()
+    before = writer.get_stats()
+
+    # 1. Concurrent writers are funnelled through one thread and group-committed
+    print("\n[Step 1] 16 threads x 25 inserts...")
+    def worker(n):
+        for i in range(25):
+            add_trade(_trade(f"w{n}_{i}"))
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(16)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    stats = writer.get_stats()
+    ops = stats["operations"] - before["operations"]
+    batches = stats["batches"] - before["batches"]
+    print(f"Rows: {get_total_trades_count()}, operations: {ops}, commits: {batches}, queue depth: {stats['queue_depth']}")
+    assert get_total_trades_count() == 400
+    assert batches <= ops
+
+    # 2. Duplicate trade ids are reported per operation, not per batch
+    print("\n[Step 2] Bulk insert with a duplicate...")
+    results = add_trades([_trade("bulk_1"), _trade("w0_0"), _trade("bulk_2")])
+    print(f"Bulk results: {results}")
+    assert results == [True, False, True]
+
+    # 3. A failing operation rolls back alone and surfaces through its Future
+    print("\n[Step 3] Failing operation...")
+    def broken(conn):
+        conn.execute("INSERT INTO trades (user_id) VALUES ('x')")
+    future = submit_write(broken)
+    ok = submit_write(lambda conn: conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0])
+    print(f"Failure raised: {future.exception() is not None}, sibling result: {ok.result()}")
+    assert future.exception() is not None
+    assert ok.result() == 402
+
+    print(f"Deleted rows: {delete_trade('bulk_1')}")
+
+    # 4. Archiving starts a new epoch instead of rewriting the live rows
+    print("\n[Step 4] New session...")
+    cursor = get_trade_changes()["cursor"]
+    archive_all_trades()
+    add_trade(_trade("next_session"))
+    changes = get_trade_changes(since=cursor)
+    print(f"Live trades: {get_total_trades_count()}, total: {get_total_trades_count(include_archived=True)}, reset: {changes['reset']}")
+    assert get_total_trades_count() == 1 and get_total_trades_count(include_archived=True) == 402
+    assert changes["reset"] and [t["trade_id"] for t in changes["upserts"]] == ["next_session"]
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_db_writer()
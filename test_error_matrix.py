@@ -0,0 +1,108 @@
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.model_a_core import ModelACore
+import utils.db_manager as db_manager
+from utils.db_manager import init_db, add_trade, get_db_connection, get_db_path, get_history_store, submit_write
+
+def _train_blank(use_store):
+    """Trains a blank model over the whole table, from the history store or from SQLite."""
+    submit_write(lambda conn: conn.execute("DELETE FROM correction_table")).result()
+    path = get_db_path()
+    hidden = None
+    if use_store:
+        get_history_store()
+    else:
+        hidden = db_manager._histories.pop(path, None)
+    model = ModelACore(seed=False, sweeper=False)
+    model.patterns = {"patterns": {}, "markov_probabilities": {}, "error_matrix": {}}
+    try:
+        model.train_from_db()
+    finally:
+        if hidden is not None: db_manager._histories[path] = hidden
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("SELECT pattern, incorrect_prediction, correct_result, occurrence_count FROM correction_table ORDER BY pattern").fetchall()
+    finally:
+        conn.close()
+    matrix = {p: [round(x, 6) for x in v] for p, v in model.patterns["error_matrix"].items()}
+    return matrix, [tuple(r) for r in rows]
+
+def test_error_matrix():
+    print("--- Starting Error Matrix Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+
+    model = ModelACore()
+    model.patterns = {"patterns": {}, "markov_probabilities": {}, "error_matrix": {}}
+
+    for i in range(30):
+        add_trade({
+            "user_id": "test",
+            "session_id": "test_session",
+            "trade_id": f"em_{i}",
+            "timestamp": f"2026-02-18 12:00:{i:02d}",
+            "ai_prediction": "BIG",
+            "ai_confidence": 70.0,
+            "signal_source": "Test",
+            "actual_result": "BIG" if i % 3 else "SMALL"
+        })
+
+    # 1. Count-once: retraining without new results must not change the matrix
+    print("\n[Step 1] Retraining over the same window...")
+    model.train_from_db()
+    first = {p: list(v) for p, v in model.patterns["error_matrix"].items()}
+    model.train_from_db()
+    second = model.patterns["error_matrix"]
+    print(f"Patterns tracked: {len(first)}, unchanged after retrain: {first == second}")
+    assert first == second
+    # 29 results have a preceding context, each counted once for length 1
+    wins, losses = second["B"]
+    print(f"'B' stats: wins={wins:.2f}, losses={losses:.2f}")
+    assert round(wins + losses + sum(second["S"])) == 29
+
+    # 2. Legacy dict entries are compacted and capped on load
+    print("\n[Step 2] Compacting legacy entries...")
+    legacy = {f"{i:b}".replace("0", "S").replace("1", "B"): {"wins": i, "losses": 1} for i in range(4000)}
+    compact = model._compact_error_matrix(legacy)
+    print(f"Legacy size: {len(legacy)}, compacted size: {len(compact)}")
+    assert len(compact) <= model.error_matrix_limit
+    assert all(isinstance(v, list) and len(v) == 2 for v in compact.values())
+
+    # 3. One backward walk returns every stored suffix context, shortest first
+    print("\n[Step 3] Suffix walk over the error matrix...")
+    history = list("SBBSBBSB")
+    matches = second.suffix_matches(history, 16)
+    expected = [(n, second["".join(history[-n:])]) for n in range(1, len(history) + 1) if "".join(history[-n:]) in second]
+    print(f"Matched lengths: {[n for n, _ in matches]}")
+    assert matches == expected
+    del second["B"]
+    assert "B" not in second and second.compacted().suffix_matches(history, 16) == matches[1:]
+
+    # 4. Rows without a real prediction are skipped the same way on both read paths
+    print("\n[Step 4] History store vs SQLite fallback...")
+    for i in range(30, 60):
+        add_trade({
+            "user_id": "test",
+            "session_id": "test_session",
+            "trade_id": f"em_{i}",
+            "timestamp": f"2026-02-18 12:00:{i:02d}",
+            "ai_prediction": "INITIAL" if i % 4 == 0 else "SMALL",
+            "ai_confidence": 0.0,
+            "signal_source": "Test",
+            "actual_result": "BIG" if i % 5 else "SMALL"
+        })
+    from_store, store_rows = _train_blank(use_store=True)
+    from_sqlite, sqlite_rows = _train_blank(use_store=False)
+    print(f"Patterns: {len(from_store)} vs {len(from_sqlite)}, corrections: {len(store_rows)} vs {len(sqlite_rows)}")
+    assert from_store == from_sqlite and store_rows == sqlite_rows
+    assert store_rows and all(r[1] in ("BIG", "SMALL") for r in store_rows)
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_error_matrix()
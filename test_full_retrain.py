@@ -0,0 +1,71 @@
+import os
+import random
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.model_a_core import ModelACore
+from utils.db_manager import init_db, add_trades
+
+def _close(a, b, tol):
+    return a.keys() == b.keys() and all(abs(x - y) <= tol for k in a for x, y in zip(a[k], b[k]))
+
+def test_full_retrain():
+    print("--- Starting Full Retrain Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+    rng = random.Random(7)
+    add_trades([{
+        "user_id": "test",
+        "session_id": "retrain_session",
+        "trade_id": f"r_{i}",
+        "timestamp": "2026-02-18 12:00:00",
+        "ai_prediction": rng.choice(["BIG", "SMALL"]),
+        "ai_confidence": 60.0,
+        "signal_source": "Test",
+        "actual_result": rng.choice(["BIG", "SMALL", "BIG"])
+    } for i in range(3000)])
+
+    # 1. One page vs many small pages (windows carried across page boundaries)
+    print("\n[Step 1] Single page vs 250-row pages...")
+    model = ModelACore()
+    status = model.rebuild_from_history(chunk_size=10000, resume=False)
+    single = model._state_rows()
+    print(f"Single page: {status['state']}, {status['processed']} results")
+    assert status["state"] == "done" and status["processed"] == 3000
+
+    # 2. An interrupted run resumes from its checkpoint
+    print("\n[Step 2] Interrupt after 5 pages, then resume...")
+    pages = []
+    def interrupt(s):
+        pages.append(s)
+        if len(pages) == 5: raise RuntimeError("interrupted")
+    chunked = ModelACore()
+    assert chunked.rebuild_from_history(chunk_size=250, checkpoint_every=2, progress=interrupt)["state"] == "failed"
+    status = chunked.rebuild_from_history(chunk_size=250, checkpoint_every=2)
+    print(f"Resumed: {status['state']}, {status['rows_per_sec']} rows/s")
+    rows = chunked._state_rows()
+    assert _close(single["model_patterns"], rows["model_patterns"], 1e-6)
+    # Entries below error_min_weight are dropped per page, so allow that much drift
+    assert _close(single["model_error_matrix"], rows["model_error_matrix"], chunked.error_min_weight)
+    assert chunked.patterns["error_cursor"] == 3000
+    assert not os.path.exists(chunked._rebuild_checkpoint_path())
+
+    # 3. A steep decay renormalizes inside a long page instead of overflowing
+    print("\n[Step 3] Renormalization within a page...")
+    results = []
+    for chunk_size in (3000, 250):
+        steep = ModelACore()
+        steep.error_decay = 0.5 # 0.5 ** -3000 would overflow a float
+        status = steep.rebuild_from_history(chunk_size=chunk_size, resume=False)
+        assert status["state"] == "done", status
+        results.append(steep._state_rows())
+    assert _close(results[0]["model_patterns"], results[1]["model_patterns"], 1e-6)
+    assert _close(results[0]["model_error_matrix"], results[1]["model_error_matrix"], steep.error_min_weight)
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_full_retrain()
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_health():
+    print("--- Starting Health Probe Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    import app as app_module
+    from config import Config
+    client = app_module.app.test_client()
+
+    # 1. Liveness never loads the model
+    print("\n[Step 1] Liveness...")
+    loaded = app_module.model_a is not None
+    live = client.get("/health/live").get_json()
+    print(f"Liveness: {live}")
+    assert live["status"] == "alive" and live["model_loaded"] == loaded
+    assert (app_module.model_a is not None) == loaded
+
+    # 2. Readiness warms up in the background, then reports metrics
+    print("\n[Step 2] Readiness...")
+    for _ in range(50):
+        resp = client.get("/health/ready")
+        if resp.status_code == 200: break
+        time.sleep(0.1)
+    body = resp.get_json()
+    print(f"Ready: {body['status']}, metrics: {sorted(body['metrics'])}")
+    assert resp.status_code == 200
+    for key in ("db_latency_ms", "writer_queue_depth", "model_version", "signal_p99_ms", "signal_cache_hit_ratio"):
+        assert key in body["metrics"]
+
+    # 3. A metric over its threshold fails readiness
+    print("\n[Step 3] Threshold breach...")
+    client.get("/api/get-signal")
+    saved = Config.READY_MAX_SIGNAL_P99_MS
+    Config.READY_MAX_SIGNAL_P99_MS = 1e-6
+    try:
+        resp = client.get("/health/ready")
+    finally:
+        Config.READY_MAX_SIGNAL_P99_MS = saved
+    print(f"Status: {resp.status_code}, failed: {resp.get_json()['failed']}")
+    assert resp.status_code == 503 and "signal_p99_ms" in resp.get_json()["failed"]
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_health()
@@ -0,0 +1,87 @@
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.db_manager import init_db, add_trade, add_trades, delete_trade, get_db_connection, get_history_store, HISTORY_PATH
+from utils.history_store import HistoryStore
+
+def _db_results():
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("SELECT actual_result FROM trades WHERE actual_result IS NOT NULL ORDER BY id").fetchall()
+        return [r[0] == "BIG" for r in rows]
+    finally:
+        conn.close()
+
+def test_history_store():
+    print("--- Starting History Store Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+    store = get_history_store()
+
+    # 1. Inserts are mirrored after each commit
+    print("\n[Step 1] Bulk insert...")
+    trades = [{
+        "user_id": "test",
+        "session_id": "history_session",
+        "trade_id": f"h_{i}",
+        "ai_prediction": "INITIAL" if i < 20 else "BIG",
+        "ai_confidence": 60.0,
+        "signal_source": "Test",
+        "actual_result": "BIG" if i % 3 else "SMALL"
+    } for i in range(40)]
+    add_trades(trades)
+    print(f"Slots: {len(store)}, packed bytes: {store.packed().nbytes}")
+    assert store.results().tolist() == _db_results()
+    predicted, correct = store.accuracy()
+    print(f"Predicted: {predicted}, correct: {correct}")
+    assert predicted == 20 and correct == sum(1 for i in range(20, 40) if i % 3)
+
+    # 2. Undo clears the slot
+    print("\n[Step 2] Undo...")
+    delete_trade("h_39")
+    assert store.results().tolist() == _db_results()
+    assert len(store.results()) == 39
+
+    # 3. A reopened file resumes from its cursor; a stale one rebuilds
+    print("\n[Step 3] Reopen and rebuild...")
+    store.flush()
+    reopened = HistoryStore(HISTORY_PATH)
+    conn = get_db_connection()
+    try:
+        assert reopened.sync(conn) == 0
+        reopened.header[3] = 10 ** 9 # cursor the log no longer has
+        assert reopened.sync(conn) == -1
+    finally:
+        conn.close()
+    assert reopened.results().tolist() == _db_results()
+
+    # 4. Read API: last-N and keyset pages match SQLite; inside the writer's open
+    # transaction the new row is overlaid, and a rollback never reaches the file
+    print("\n[Step 4] last() and page()...")
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("SELECT actual_result, ai_prediction, id FROM trades WHERE actual_result IS NOT NULL ORDER BY id").fetchall()
+        expected = [(a, p if p in ("BIG", "SMALL") else None, i) for a, p, i in rows]
+        assert store.last(10, conn) == expected[-10:]
+        assert store.last(1000, conn) == expected
+        assert store.page(0, 15) + store.page(expected[14][2], 100) == expected
+        assert store.count() == len(expected)
+    finally:
+        conn.close()
+    seen = []
+    def peek(conn):
+        seen.append(store.last(2, conn))
+        raise RuntimeError("roll back")
+    assert not add_trade(dict(trades[0], trade_id="h_rolled_back", actual_result="SMALL", ai_prediction="SMALL"), then=peek)
+    print(f"Inside the transaction: {seen[0]}")
+    assert seen[0][0] == expected[-1] and seen[0][1][:2] == ("SMALL", "SMALL")
+    assert len(store.results()) == 39 and store.results().tolist() == _db_results()
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_history_store()
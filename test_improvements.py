@@ -74,5 +74,25 @@ def test_logic():
     else:
         print("FAILURE: Master Selector did not adapt to loss streak.")
 
+    # 5. Test Online Strategy Weights
+    print("\n5. Testing Online Strategy Weights...")
+    before = dict(model.strategy_weights)
+    votes = {"trend": "BIG", "markov": "SMALL"}
+    add_trade({
+        "user_id": "test",
+        "session_id": "test_session",
+        "trade_id": "test_votes",
+        "ai_prediction": "BIG",
+        "ai_confidence": 70.0,
+        "signal_source": "Trend Detection",
+        "actual_result": "BIG"
+    }, then=lambda conn: model.train_from_db(conn=conn, votes=votes, actual="BIG"))
+    print(f"Weights: {before} -> {model.strategy_weights}")
+    assert model.strategy_weights["trend"] > before["trend"]
+    assert model.strategy_weights["markov"] < before["markov"]
+    assert model.strategy_weights["fib"] == before["fib"]
+    reloaded = ModelACore()
+    assert abs(reloaded.strategy_weights["trend"] - model.strategy_weights["trend"]) <= 0.005
+
 if __name__ == "__main__":
     test_logic()
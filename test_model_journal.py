@@ -0,0 +1,104 @@
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.model_a_core import ModelACore
+from utils.db_manager import init_db, add_trade, get_db_connection, submit_write
+
+def _journal():
+    conn = get_db_connection()
+    try:
+        return conn.execute("SELECT id, delta FROM model_journal ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+def _submit(model, i, rng):
+    actual = rng.choice(["BIG", "SMALL"])
+    votes = {s: rng.choice(["BIG", "SMALL"]) for s in ("pattern", "trend", "markov")}
+    add_trade({
+        "user_id": "test",
+        "session_id": "journal_session",
+        "trade_id": f"j_{i}",
+        "ai_prediction": votes["trend"],
+        "ai_confidence": 60.0,
+        "signal_source": "Test",
+        "actual_result": actual
+    }, then=lambda conn: model.train_from_db(conn=conn, votes=votes, actual=actual))
+
+def test_model_journal():
+    print("--- Starting Model Journal Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+    rng = random.Random(11)
+    model = ModelACore()
+    for i in range(60):
+        _submit(model, i, rng)
+
+    # 1. Results append small deltas instead of rewriting the model
+    print("\n[Step 1] Journal entries per result...")
+    journal = _journal()
+    snapshot_bytes = len(json.dumps(model._state_rows()))
+    largest = max(len(delta) for _, delta in journal)
+    print(f"Entries: {len(journal)}, largest delta: {largest} bytes, full model: {snapshot_bytes} bytes")
+    assert len(journal) >= 50 and largest < snapshot_bytes / 2
+
+    # 2. Snapshot + journal replay reproduces the live model exactly
+    print("\n[Step 2] Replay on startup...")
+    restarted = ModelACore()
+    assert restarted._state_rows() == model._state_rows()
+    assert restarted.patterns["error_cursor"] == model.patterns["error_cursor"]
+    assert restarted.model_version == model.model_version
+
+    # 3. Compaction folds the journal into the snapshot
+    print("\n[Step 3] Compaction...")
+    model.journal_limit = 5
+    for i in range(60, 70):
+        _submit(model, i, rng)
+    journal = _journal()
+    print(f"Entries after compaction: {len(journal)}")
+    assert len(journal) < 5
+    assert ModelACore()._state_rows() == model._state_rows()
+
+    # 4. A rolled-back trade write leaves no stale diff base behind
+    print("\n[Step 4] Rollback after training...")
+    model.journal_limit = 50
+    version = model.model_version
+    def train_then_fail(conn):
+        model.train_from_db(conn=conn, votes={"trend": "BIG"}, actual="BIG")
+        raise sqlite3.OperationalError("disk I/O error")
+    assert not add_trade({"user_id": "test", "session_id": "journal_session", "trade_id": "j_fail",
+                          "ai_prediction": "BIG", "ai_confidence": 60.0, "signal_source": "Test",
+                          "actual_result": "BIG"}, then=train_then_fail)
+    print(f"Version: {version} -> {model.model_version}, diff base: {model._persisted is not None}")
+    assert model.model_version == version == ModelACore().model_version
+    assert model._persisted is None
+    _submit(model, 70, rng)
+    restarted = ModelACore()
+    assert restarted._state_rows() == model._state_rows() == model._persisted
+
+    # 5. Another worker's reload waits for the writer instead of reading mid-commit
+    print("\n[Step 5] Cross-worker reload on the writer thread...")
+    _submit(model, 71, rng)
+    restarted._last_sync = 0.0
+    gate = threading.Event()
+    submit_write(lambda conn: gate.wait(5))
+    reload = threading.Thread(target=restarted._sync_state)
+    reload.start()
+    reload.join(0.3)
+    assert reload.is_alive() and restarted.model_version != model.model_version
+    gate.set()
+    reload.join()
+    assert restarted.model_version == model.model_version
+    assert restarted._state_rows() == model._state_rows()
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_model_journal()
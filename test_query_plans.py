@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.db_manager import init_db, add_trades, check_query_plans, get_db_connection, HOT_QUERIES
+from utils.sql_trace import TracedConnection, tracer, fingerprint, plan_problems
+# Importing the model and manager registers their hot queries
+import models.model_a_core
+import utils.multi_manager
+
+def test_query_plans():
+    print("--- Starting Query Plan Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+    add_trades([{
+        "user_id": "test", "session_id": f"plan_{i % 3}", "trade_id": f"plan_{i}",
+        "timestamp": f"2026-04-01 10:{i // 60:02d}:{i % 60:02d}", "ai_prediction": "BIG",
+        "ai_confidence": 60.0, "signal_source": "Pattern Analysis", "actual_result": "BIG" if i % 2 else "SMALL"
+    } for i in range(200)])
+
+    # 1. Every hot query is served by an index
+    print("\n[Step 1] EXPLAIN QUERY PLAN on hot queries...")
+    failures = check_query_plans()
+    print(f"Checked {len(HOT_QUERIES)} queries, failures: {failures}")
+    assert len(HOT_QUERIES) >= 10 and failures == {}
+
+    # ...and the check does catch table scans and unbounded index walks
+    conn = get_db_connection()
+    try:
+        assert plan_problems(conn, "SELECT * FROM trades WHERE signal_source = ?", ("x",))
+        assert plan_problems(conn, "SELECT * FROM trades WHERE session_id = ? ORDER BY timestamp", ("plan_1",))
+        assert not plan_problems(conn, "SELECT * FROM trades ORDER BY timestamp DESC LIMIT 5")
+    finally:
+        conn.close()
+
+    # 2. Tracing: fingerprints, per-statement totals, per-request counts, slow log
+    print("\n[Step 2] Statement tracing...")
+    assert fingerprint("SELECT * FROM t WHERE a = 'x''y' AND b IN (1, 2,3)\n LIMIT 10") == "SELECT * FROM t WHERE a = ? AND b IN (?+) LIMIT ?"
+    tracer.reset()
+    tracer.slow_ms = 1e9
+    conn = sqlite3.connect(':memory:', factory=TracedConnection)
+    conn.execute("CREATE TABLE t (a INTEGER)")
+    tracer.begin_request()
+    for i in range(5):
+        conn.execute(f"INSERT INTO t VALUES ({i})")
+    rows = conn.execute("SELECT a FROM t WHERE a > 1").fetchall()
+    statements, ms = tracer.end_request("test")
+    tracer.slow_ms = 0
+    conn.execute("SELECT COUNT(*) FROM t").fetchone()
+    conn.close()
+    stats = tracer.snapshot()
+    print(f"Request: {statements} statements in {ms:.2f} ms; slow log: {len(stats['slow'])}")
+    counts = {s["sql"]: s["count"] for s in stats["statements"]}
+    assert len(rows) == 3 and statements == 6
+    assert counts["INSERT INTO t VALUES (?)"] == 5 and counts["SELECT a FROM t WHERE a > ?"] == 1
+    assert stats["requests"]["test"]["statements"] == 6
+    assert [s["sql"] for s in stats["slow"]] == ["SELECT COUNT(*) FROM t"]
+    tracer.slow_ms = 50.0
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_query_plans()
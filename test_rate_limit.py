@@ -0,0 +1,89 @@
+import os
+import sys
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.rate_limit import RateLimiter, Throttled
+
+def _call(limiter, endpoint, session_key, user_key="user:u", hold=0.0):
+    try:
+        with limiter.limit(endpoint, session_key, user_key):
+            time.sleep(hold)
+        return "ok"
+    except Throttled as e:
+        return e.retry_after
+
+def test_rate_limit():
+    print("--- Starting Backpressure Validation ---")
+    limiter = RateLimiter({
+        "write": {"rate": 5.0, "burst": 3},
+        "train": {"concurrency": 1, "queue": 1, "wait": 2.0},
+        "rebuild": {"rate": 0.1, "burst": 2, "concurrency": 1, "queue": 0},
+    }, user_factor=2)
+
+    # 1. Token bucket: a burst, then 429 with a retry hint; other sessions are unaffected
+    print("\n[Step 1] Token bucket per session...")
+    results = [_call(limiter, "write", "session:a") for _ in range(4)]
+    print(f"Session a: {results}")
+    assert results[:3] == ["ok"] * 3 and 0 < results[3] <= 0.2
+    assert _call(limiter, "write", "session:b") == "ok"
+    # The user bucket (burst 6) is shared by all of the user's sessions
+    assert [_call(limiter, "write", "session:c") for _ in range(3)][-1] != "ok"
+
+    # 2. Concurrency: one in flight, one queued, the next refused
+    print("\n[Step 2] Concurrency limit with a bounded queue...")
+    out = {}
+    first = threading.Thread(target=lambda: out.setdefault("first", _call(limiter, "train", "session:a", hold=0.3)))
+    first.start()
+    time.sleep(0.05)
+    second = threading.Thread(target=lambda: out.setdefault("queued", _call(limiter, "train", "session:a")))
+    second.start()
+    time.sleep(0.05)
+    out["refused"] = _call(limiter, "train", "session:a")
+    first.join(); second.join()
+    print(f"Results: {out}, stats: {limiter.stats['train']}")
+    assert out["first"] == "ok" and out["queued"] == "ok" and out["refused"] != "ok"
+    assert limiter.stats["train"]["queued"] == 1 and limiter.throttled_total() >= 3
+    # A call refused for concurrency spends no token, so the next one still fits the burst
+    out = {}
+    first = threading.Thread(target=lambda: out.setdefault("first", _call(limiter, "rebuild", "session:a", hold=0.2)))
+    first.start()
+    time.sleep(0.05)
+    out["refused"] = _call(limiter, "rebuild", "session:a")
+    first.join()
+    out["next"] = _call(limiter, "rebuild", "session:a")
+    print(f"Results: {out}, stats: {limiter.stats['rebuild']}")
+    assert out["first"] == "ok" and out["refused"] == 1.0 and out["next"] == "ok"
+    assert limiter.stats["rebuild"]["concurrency_limited"] == 1 and limiter.stats["rebuild"]["rate_limited"] == 0
+
+    # 3. The app answers 429 with Retry-After; new-session rotates the session id,
+    #    so the per-user (guest: per-address) bucket is what stops it
+    print("\n[Step 3] 429 from /api/new-session...")
+    if os.path.exists('database.db'): os.remove('database.db')
+    from utils.db_manager import init_db
+    init_db()
+    from app import app
+    client = app.test_client()
+    statuses = [client.post("/api/new-session") for _ in range(8)]
+    print(f"Statuses: {[r.status_code for r in statuses]}")
+    assert statuses[0].status_code == 200 and statuses[-1].status_code == 429 and int(statuses[-1].headers["Retry-After"]) >= 1
+    # Without trusted proxies (TRUSTED_PROXIES=0) a forged X-Forwarded-For is not a new address
+    forged = client.post("/api/new-session", headers={"X-Forwarded-For": "203.0.113.9"})
+    assert forged.status_code == 429
+
+    # 4. A full rebuild can be started once a minute; polling its status is never limited
+    print("\n[Step 4] 429 from /api/retrain-full...")
+    with client.session_transaction() as sess:
+        sess["is_admin"] = True
+    statuses = [client.post("/api/retrain-full", json={"resume": False}).status_code for _ in range(2)]
+    print(f"Statuses: {statuses}")
+    assert statuses == [202, 429]
+    assert all(client.get("/api/retrain-full").status_code == 200 for _ in range(5))
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_rate_limit()
@@ -0,0 +1,131 @@
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.rolling_stats import RollingStats, TimeBucketedAccuracy
+from utils.db_manager import init_db, add_trades, IST, TIMESTAMP_FORMAT
+from models.model_a_core import ModelACore
+from utils.multi_manager import MultiManagerSystem
+
+def _skipped(row):
+    return row[1] == "INITIAL" or row[2] is None
+
+def _brute_force(rows):
+    """The original per-request scans over the newest-first rows."""
+    streak = 0
+    for row in rows[:10]:
+        if _skipped(row): continue
+        if row[1] != row[2]: streak += 1
+        else: break
+    completed = [r for r in rows[:20] if not _skipped(r)]
+    win_rate = sum(1 for r in completed if r[1] == r[2]) / len(completed) * 100 if completed else 100.0
+    actuals = [r[2] for r in rows[:10]]
+    flips = sum(1 for a, b in zip(actuals, actuals[1:]) if a != b)
+    dragon = 0
+    for row in rows[:15]:
+        if row[2] != rows[0][2]: break
+        dragon += 1
+    return streak, win_rate, (flips, max(len(actuals) - 1, 0)), (rows[0][2] if rows else None, dragon)
+
+def _counters(stats):
+    return stats.loss_streak(), stats.win_rate(), stats.volatility(), stats.dragon()
+
+def test_rolling_stats():
+    print("--- Starting Rolling Stats Validation ---")
+
+    # 1. Random pushes and undos match a full recomputation after every step
+    print("\n[Step 1] Push / undo sequence against brute force...")
+    rng = random.Random(7)
+    stats = RollingStats(capacity=30, win_window=20, vol_window=10, streak_window=10, dragon_window=15)
+    stats.load([])
+    rows = [] # newest first
+    reloads = 0
+    for step in range(3000):
+        roll = rng.random()
+        if roll < 0.25 and rows:
+            # Undo: usually the newest result, sometimes an older one
+            index = 0 if rng.random() < 0.8 else rng.randrange(len(rows))
+            stats.remove(rows.pop(index)[0])
+        else:
+            prediction = "INITIAL" if rng.random() < 0.1 else rng.choice(["BIG", "SMALL"])
+            actual = None if rng.random() < 0.05 else rng.choice(["BIG", "SMALL"])
+            row = (f"t{step}", prediction, actual, "Test")
+            rows.insert(0, row)
+            stats.push(*row)
+        if not stats.loaded:
+            # Undo past the kept rows (or of an older row): reload, as get_rolling_stats does
+            reloads += 1
+            stats.load(rows[:stats.capacity], complete=len(rows) <= stats.capacity)
+        assert _counters(stats) == _brute_force(rows), f"step {step}: {_counters(stats)} != {_brute_force(rows)}"
+    print(f"Steps: 3000, live rows: {len(rows)}, reloads: {reloads}, counters: {_counters(stats)}")
+    assert reloads > 0
+
+    # 2. Undoing back to empty
+    print("\n[Step 2] Undo everything...")
+    stats.load(rows[:stats.capacity], complete=len(rows) <= stats.capacity)
+    while rows:
+        stats.remove(rows.pop(0)[0])
+        if not stats.loaded:
+            stats.load(rows[:stats.capacity], complete=len(rows) <= stats.capacity)
+        assert _counters(stats) == _brute_force(rows)
+    assert _counters(stats) == (0, 100.0, (0, 0), (None, 0))
+
+    print("\n--- Validation Complete ---")
+
+def _cid_trade(i, hours_ago, correct):
+    ts = (datetime.now(tz=IST) - timedelta(hours=hours_ago)).strftime(TIMESTAMP_FORMAT)
+    return {"user_id": "test", "session_id": "cid_session", "trade_id": f"cid_{i}", "timestamp": ts,
+            "ai_prediction": "BIG", "ai_confidence": 80.0, "signal_source": "CID Scanner (Trap Detected)",
+            "actual_result": "BIG" if correct else "SMALL"}
+
+def test_time_bucketed_accuracy():
+    print("--- Starting Bucketed Accuracy Validation ---")
+
+    # 1. Whole hour buckets expire once they end before the horizon
+    print("\n[Step 1] Hour-bucket expiry...")
+    rng = random.Random(3)
+    acc = TimeBucketedAccuracy(horizon_seconds=6 * 3600, bucket_seconds=3600)
+    results = [(rng.uniform(0, 24 * 3600), rng.random() < 0.6) for _ in range(500)]
+    acc.load(results[:400])
+    for ts, correct in results[400:]:
+        acc.add(ts, correct) # out of order
+    for now in range(6 * 3600, 30 * 3600, 1800):
+        cutoff = now - acc.horizon
+        # A result counts while its bucket still ends after the cutoff
+        live = [c for ts, c in results if (ts // 3600 + 1) * 3600 > cutoff]
+        assert acc.snapshot(now) == (len(live), sum(live)), now
+    assert acc.snapshot(40 * 3600) == (0, 0) and not acc.buckets
+    print(f"Buckets after expiry: {len(acc.buckets)}")
+
+    # 2. The 7-day cutoff is taken on the IST clock the timestamps are stored in
+    print("\n[Step 2] IST cutoff...")
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+    manager = MultiManagerSystem(ModelACore(), 'database.db')
+    # Just inside and 2h outside 7 days; a UTC cutoff would be 5.5h too early and count both
+    add_trades([_cid_trade(0, 7 * 24 - 2, True), _cid_trade(1, 7 * 24 + 2, False), _cid_trade(2, 1, False)])
+    perf = manager.track_cid_performance()
+    print(f"CID performance: {perf}")
+    assert perf["cid_total_signals"] == 2 and perf["cid_correct_signals"] == 1
+
+    # 3. Reloaded on a data change, not on a model save
+    print("\n[Step 3] Reload key...")
+    revision = manager.sync()
+    assert manager.cid_stats.loaded and manager.cid_stats.version == revision
+    manager.model_a.model_version += 1
+    manager.sync()
+    assert manager.cid_stats.loaded
+    add_trades([_cid_trade(3, 0, True)]) # e.g. another worker's result
+    manager.sync()
+    assert not manager.cid_stats.loaded
+    assert manager.track_cid_performance()["cid_total_signals"] == 3
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_rolling_stats()
+    test_time_bucketed_accuracy()
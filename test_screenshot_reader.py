@@ -0,0 +1,101 @@
+import io
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.screenshot_reader import decode_png, read_results
+
+ORANGE = (255, 150, 40)
+BLUE = (70, 130, 240)
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    return a if pa <= pb and pa <= pc else b if pb <= pc else c
+
+def _encode_png(rgb):
+    """Minimal RGB PNG encoder that cycles through all five row filters."""
+    height, width, _ = rgb.shape
+    raw = bytearray()
+    prev = bytes(width * 3)
+    for y in range(height):
+        line = rgb[y].tobytes()
+        ftype = y % 5
+        raw.append(ftype)
+        for i, x in enumerate(line):
+            a = line[i - 3] if i >= 3 else 0
+            b = prev[i]
+            c = prev[i - 3] if i >= 3 else 0
+            pred = [0, a, b, (a + b) >> 1, _paeth(a, b, c)][ftype]
+            raw.append((x - pred) & 0xFF)
+        prev = line
+    def chunk(ctype, body):
+        return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", zlib.crc32(ctype + body) & 0xFFFFFFFF)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(bytes(raw))) + chunk(b"IEND", b"")
+
+def _screenshot(results):
+    """White result list: a grey header bar and one coloured badge per row, newest on top."""
+    img = np.full((40 + 30 * len(results), 120, 3), 245, dtype=np.uint8)
+    img[5:25, :] = (60, 60, 60)
+    for i, r in enumerate(results):
+        top = 40 + 30 * i
+        img[top + 5:top + 23, 70:110] = ORANGE if r == "B" else BLUE
+        img[top + 10:top + 18, 10:50] = (30, 30, 30) # period number text
+    return img
+
+def test_screenshot_reader():
+    print("--- Starting Screenshot Reader Validation ---")
+    expected = list("BSSBBBSBSS")
+    img = _screenshot(expected)
+    png = _encode_png(img)
+
+    print("\n[Step 1] Decoding PNG with all filter types...")
+    assert np.array_equal(decode_png(png), img)
+    # Oversized headers are refused before inflating; trailing data past the image is never inflated
+    def _raw_png(width, height, body):
+        header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+        chunk = lambda ctype, data: struct.pack(">I", len(data)) + ctype + data + b"\0\0\0\0"
+        return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(body)) + chunk(b"IEND", b"")
+    for bad, message in ((_raw_png(50000, 50000, bytes(100)), "too large"), (_raw_png(8, 8, bytes(20)), "truncated"),
+                         (_raw_png(300000, 1, bytes(100)), "not supported")):
+        try:
+            decode_png(bad)
+            assert False, "decoded a bad image"
+        except ValueError as e:
+            assert message in str(e), e
+    assert decode_png(_raw_png(8, 8, bytes(50 * 1024 * 1024))).shape == (8, 8, 3)
+    # Tall, narrow images are unfiltered in row tiles (the diagonal buffer stays O(tile * width))
+    tall = np.random.default_rng(1).integers(0, 256, (12000, 4, 3), dtype=np.uint8)
+    assert np.array_equal(decode_png(_encode_png(tall)), tall)
+
+    print("\n[Step 2] Classifying result cells...")
+    results = read_results(png)
+    print(f"Detected: {''.join(results)}")
+    assert results == expected
+
+    print("\n[Step 3] Upload endpoint with save=1...")
+    if os.path.exists('database.db'): os.remove('database.db')
+    from utils.db_manager import init_db
+    init_db()
+    from app import app
+    client = app.test_client()
+    resp = client.post("/api/ocr-screenshot", data={"file": (io.BytesIO(png), "shot.png"), "save": "1"},
+                       content_type="multipart/form-data")
+    body = resp.get_json()
+    print(f"Status: {resp.status_code}, results: {body.get('results')}, saved: {body.get('saved')}")
+    assert resp.status_code == 200 and body["results"] == expected and body["saved"] == len(expected)
+    bad = client.post("/api/ocr-screenshot", data={"file": (io.BytesIO(b"not an image"), "x.png")},
+                      content_type="multipart/form-data")
+    assert bad.status_code == 400
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_screenshot_reader()
@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.signal_cache import SignalPrecomputer
+from utils.db_manager import init_db, add_trade, get_data_revision, DB_PATH
+from models.model_a_core import ModelACore
+from utils.multi_manager import MultiManagerSystem
+
+def _trade(i, prediction, actual):
+    return {"user_id": "test", "session_id": "cache_session", "trade_id": f"c_{i}", "ai_prediction": prediction,
+            "ai_confidence": 60.0, "signal_source": "Test", "actual_result": actual}
+
+def test_signal_cache():
+    print("--- Starting Signal Single-Flight Validation ---")
+    state = {"key": 1, "computed": 0}
+
+    def compute():
+        state["computed"] += 1
+        time.sleep(0.2)
+        return {"prediction": "BIG", "confidence": 70.0, "key": state["key"]}
+
+    cache = SignalPrecomputer(compute=compute, key_fn=lambda: state["key"])
+
+    # 1. A burst of concurrent misses runs one computation
+    print("\n[Step 1] 20 concurrent requests on a cold cache...")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(20)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    print(f"Computations: {state['computed']}, stats: {cache.stats}")
+    assert state["computed"] == 1 and len(results) == 20
+    assert all(r == results[0] for r in results) and len({id(r) for r in results}) == 20
+
+    # 2. A request arriving during a background precompute joins it
+    print("\n[Step 2] Request during a precompute...")
+    state["key"] = 2
+    cache.schedule()
+    time.sleep(0.05)
+    signal = cache.get()
+    print(f"Computations: {state['computed']}, signal key: {signal['key']}, hit ratio: {cache.hit_ratio()}")
+    assert state["computed"] == 2 and signal["key"] == 2
+
+    # 3. The key follows the database, not this process's writes
+    print("\n[Step 3] Trade committed by another worker...")
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+    model = ModelACore()
+    manager = MultiManagerSystem(model, DB_PATH)
+    cache = SignalPrecomputer(compute=lambda: manager.process_signal({"prediction": "BIG", "confidence": 70.0, "source": "Test"}),
+                              key_fn=lambda: (model.get_model_version(), manager.sync()))
+    for i in range(6):
+        add_trade(_trade(i, "BIG", "BIG"))
+    assert cache.get()["loss_streak"] == 0
+    other = sqlite3.connect(DB_PATH)
+    other.execute("INSERT INTO trades (user_id, session_id, trade_id, timestamp, ai_prediction, ai_confidence, signal_source, actual_result, epoch) "
+                  "VALUES ('w2', 's', 'c_other', '2099-01-01 00:00:00', 'BIG', 60.0, 'Test', 'SMALL', (SELECT MAX(id) FROM epochs))")
+    other.commit()
+    other.close()
+    signal = cache.get()
+    print(f"Loss streak after the other worker's trade: {signal['loss_streak']}, stats: {cache.stats}")
+    assert signal["loss_streak"] == 1
+
+    # 4. A read between COMMIT and record_result caches the committed state; the result is not counted twice
+    print("\n[Step 4] Signal read before record_result...")
+    trade = dict(_trade(7, "BIG", "SMALL"), timestamp="2099-01-01 00:00:01")
+    revision = add_trade(trade)
+    assert cache.get()["loss_streak"] == 2
+    manager.record_result(trade, revision)
+    hits = cache.stats["hits"]
+    signal = cache.get()
+    print(f"Loss streak: {signal['loss_streak']}, rows: {len(manager.rolling.rows)}, stats: {cache.stats}")
+    assert signal["loss_streak"] == 2 and cache.stats["hits"] == hits + 1
+    assert len(manager.rolling.rows) == 8
+
+    # 5. A recorded result of our own moves the key to its revision
+    print("\n[Step 5] Recorded result...")
+    trade = dict(_trade(8, "BIG", "SMALL"), timestamp="2099-01-01 00:00:02")
+    revision = add_trade(trade)
+    manager.record_result(trade, revision)
+    assert manager.rolling.version == revision == get_data_revision()
+    assert cache.get()["loss_streak"] == 3
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_signal_cache()
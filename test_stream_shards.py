@@ -0,0 +1,112 @@
+import os
+import shutil
+import sys
+import threading
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.db_manager import init_db, add_trade, get_db_connection, get_db_path, stream_context, STREAMS_DIR
+from utils.stream_shards import ShardPool, StreamLanes, shard_for
+
+def _trade(stream, i, result):
+    return {"user_id": "test", "session_id": f"s_{stream}", "trade_id": f"{stream}_{i}", "ai_prediction": "INITIAL",
+            "ai_confidence": 0.0, "signal_source": "Direct Entry", "actual_result": result}
+
+def _rows(stream):
+    conn = get_db_connection(get_db_path(stream))
+    try:
+        return [r[0] for r in conn.execute("SELECT actual_result FROM trades ORDER BY id")]
+    finally:
+        conn.close()
+
+def test_stream_shards():
+    print("--- Starting Stream Shard Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    shutil.rmtree(STREAMS_DIR, ignore_errors=True)
+    init_db()
+    add_trade(_trade("default", 0, "BIG"))
+
+    # 1. Streams are isolated: own database, own model
+    print("\n[Step 1] In-process engine...")
+    pool = ShardPool(0)
+    for i in range(12):
+        assert pool.call("alpha", "submit", _trade("alpha", i, "BIG"), None)
+        assert pool.call("beta", "submit", _trade("beta", i, "SMALL" if i % 3 else "BIG"), None)
+    alpha, beta = _rows("alpha"), _rows("beta")
+    print(f"alpha: {len(alpha)} rows, beta: {len(beta)} rows, default: {len(_rows('default'))} rows")
+    assert len(alpha) == len(beta) == 12 and len(_rows("default")) == 1
+    assert set(alpha) == {"BIG"} and beta.count("BIG") == 4
+    assert pool.call("alpha", "signal")["prediction"] in ("BIG", "SMALL")
+    assert [t["trade_id"] for t in pool.call("beta", "recent", 2)] == ["beta_11", "beta_10"]
+    with stream_context("alpha"):
+        add_trade(_trade("alpha", 99, "SMALL"))
+    assert _rows("alpha")[-1] == "SMALL"
+    assert pool.shard_stats()[0]["streams"].keys() == {"alpha", "beta"}
+
+    # 2. Worker processes: each stream lives on exactly one shard
+    print("\n[Step 2] Sharded worker processes...")
+    pool = ShardPool(2, timeout=60)
+    streams = [f"game_{n}" for n in range(6)]
+    try:
+        for i in range(6):
+            for stream in streams:
+                assert pool.call(stream, "submit", _trade(stream, i, "BIG" if i % 2 else "SMALL"), None)
+        signals = {stream: pool.call(stream, "signal") for stream in streams}
+        shards = pool.shard_stats()
+    finally:
+        pool.close()
+    owners = {s: shard["shard"] for shard in shards for s in shard["streams"]}
+    print(f"Owners: {owners}, pids: {[shard['pid'] for shard in shards]}")
+    assert owners == {stream: shard_for(stream, 2) for stream in streams}
+    assert len({shard["pid"] for shard in shards} | {os.getpid()}) == len(shards) + 1
+    assert all(len(_rows(stream)) == 6 for stream in streams)
+    assert all(s["prediction"] in ("BIG", "SMALL") for s in signals.values())
+
+    # 3. Inside a shard, a blocked call only holds up its own stream
+    print("\n[Step 3] Per-stream lanes...")
+    lanes = StreamLanes(threads=2)
+    release, done = threading.Event(), []
+    lanes.submit("slow", lambda: (release.wait(10), done.append("slow 1")))
+    lanes.submit("slow", lambda: done.append("slow 2"))
+    finished = threading.Event()
+    lanes.submit("fast", lambda: (done.append("fast"), finished.set()))
+    assert finished.wait(5) and done == ["fast"]
+    release.set()
+    lanes.shutdown()
+    print(f"Order: {done}")
+    assert done == ["fast", "slow 1", "slow 2"]
+
+    # 4. App routes: only configured streams, reads never create one, and every
+    #    write endpoint acts on the stream's own database
+    print("\n[Step 4] App routes...")
+    import app as app_module
+    from config import Config
+    streams, limits = Config.STREAMS, Config.RATE_LIMITS_ENABLED
+    Config.STREAMS, Config.RATE_LIMITS_ENABLED = ("gamma",), False
+    app_module.stream_pool = ShardPool(0)
+    client = app_module.app.test_client()
+    try:
+        assert client.get("/api/trades?stream=nosuch").status_code == 404
+        assert client.post("/api/submit-result?stream=nosuch", json={"result": "BIG"}).status_code == 404
+        for url in ("/api/trades?stream=gamma", "/api/get-signal?stream=gamma", "/api/dashboard-data?stream=gamma"):
+            assert client.get(url).status_code == 404, url
+        assert not os.path.exists(get_db_path("nosuch")) and not os.path.exists(get_db_path("gamma"))
+        assert client.post("/api/save-bulk-pattern?stream=gamma", json={"pattern": ["BIG", "SMALL", "BIG"]}).status_code == 200
+        assert _rows("gamma") == ["BIG", "SMALL", "BIG"]
+        data = client.get("/api/dashboard-data?stream=gamma").get_json()
+        print(f"gamma dashboard: {data['total_collected']} trades, accuracy {data['accuracy']}")
+        assert data["total_collected"] == 3 and len(data["trades"]) == 3
+        assert client.post("/api/undo-trade?stream=gamma", json={"trade_id": data["trades"][0]["trade_id"]}).status_code == 200
+        assert len(_rows("gamma")) == 2
+        assert client.post("/api/new-session?stream=gamma").status_code == 200
+        assert client.get("/api/dashboard-data?stream=gamma").get_json()["total_collected"] == 0
+        assert len(_rows("default")) == 1
+    finally:
+        Config.STREAMS, Config.RATE_LIMITS_ENABLED = streams, limits
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_stream_shards()
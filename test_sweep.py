@@ -0,0 +1,62 @@
+import os
+import random
+import sys
+import threading
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.db_manager import init_db, add_trades
+import sweep
+from sweep import DEFAULT_GRID, evaluate, load_history, make_configs, rank, run_sweep
+
+def test_sweep():
+    print("--- Starting Parameter Sweep Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+    rng = random.Random(5)
+    add_trades([{
+        "user_id": "test",
+        "session_id": "sweep_session",
+        "trade_id": f"s_{i}",
+        "timestamp": f"2026-02-18 12:{i // 60:02d}:{i % 60:02d}",
+        "ai_prediction": "INITIAL",
+        "ai_confidence": 0.0,
+        "signal_source": "Test",
+        "actual_result": rng.choice(["BIG", "SMALL", "BIG"])
+    } for i in range(120)])
+
+    # 1. History loads once, oldest first
+    print("\n[Step 1] Loading history...")
+    history = load_history('database.db')
+    assert len(history) == 120 and set(history) <= {"B", "S"}
+
+    # 2. Configurations replay in parallel; identical configs score identically
+    print("\n[Step 2] Walk-forward replay across 2 workers...")
+    configs = make_configs(DEFAULT_GRID, samples=3, seed=1)
+    assert configs[0] == {k: v[0] for k, v in DEFAULT_GRID.items()}
+    results = run_sweep(history, configs + configs[:1], workers=2, warmup=40)
+    for r in results:
+        print(f"accuracy {r['accuracy']}% on {r['signals']} signals, coverage {r['coverage']}%")
+    assert len(results) == 4 and all(r["signals"] + r["skipped"] == 80 for r in results)
+    assert results[0]["accuracy"] == results[3]["accuracy"] and results[0]["signals"] == results[3]["signals"]
+
+    # 3. Ranking puts the most accurate well-covered configuration first
+    ranked = rank(results, min_coverage=0)
+    assert [r["accuracy"] for r in ranked] == sorted((r["accuracy"] for r in results), reverse=True)
+
+    # 4. In-process evaluations start from the same blank model and leave no threads behind
+    print("\n[Step 4] Repeated in-process evaluations...")
+    sweep._history = history
+    baseline = evaluate(configs[0], warmup=40)
+    threads = threading.active_count()
+    for config in configs + configs[:1]:
+        evaluate(config, warmup=40)
+    assert threading.active_count() == threads, f"{threading.active_count()} threads, expected {threads}"
+    assert evaluate(configs[0], warmup=40)["signals"] == baseline["signals"] == results[0]["signals"]
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_sweep()
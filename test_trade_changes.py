@@ -0,0 +1,89 @@
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import utils.db_manager as db_manager
+from utils.db_manager import init_db, add_trade, add_trades, delete_trade, archive_all_trades, get_trade_changes, submit_write
+
+def _trade(i, result="BIG"):
+    return {"user_id": "test", "session_id": "sync_session", "trade_id": f"s_{i}", "ai_prediction": "BIG",
+            "ai_confidence": 60.0, "signal_source": "Test", "actual_result": result}
+
+def _ids(changes):
+    return [t["trade_id"] for t in changes["upserts"]]
+
+def test_trade_changes():
+    print("--- Starting Trade Change Log Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+    add_trades([_trade(i) for i in range(5)])
+
+    # 1. No cursor: the newest live trades, newest first
+    print("\n[Step 1] Initial snapshot...")
+    changes = get_trade_changes(0, limit=3)
+    print(f"Reset: {changes['reset']}, upserts: {_ids(changes)}, cursor: {changes['cursor']}")
+    assert changes["reset"] and _ids(changes) == ["s_4", "s_3", "s_2"]
+    cursor = changes["cursor"]
+
+    # 2. Insert, update and delete since the cursor
+    print("\n[Step 2] Insert / update / delete...")
+    add_trade(_trade(5, "SMALL"))
+    submit_write(lambda conn: conn.execute("UPDATE trades SET actual_result = 'SMALL' WHERE trade_id = 's_1'")).result()
+    delete_trade("s_3")
+    changes = get_trade_changes(cursor, limit=10)
+    print(f"Upserts: {_ids(changes)}, deleted: {changes['deleted']}")
+    assert not changes["reset"]
+    assert _ids(changes) == ["s_5", "s_1"] and changes["deleted"] == ["s_3"]
+    assert {t["trade_id"]: t["actual_result"] for t in changes["upserts"]} == {"s_5": "SMALL", "s_1": "SMALL"}
+    # Nothing new since the returned cursor
+    cursor = changes["cursor"]
+    assert get_trade_changes(cursor) == {"cursor": cursor, "reset": False, "upserts": [], "deleted": []}
+
+    # 3. A row inserted and deleted between two polls is only reported as deleted
+    add_trade(_trade(6))
+    delete_trade("s_6")
+    changes = get_trade_changes(cursor)
+    assert changes["upserts"] == [] and changes["deleted"] == ["s_6"]
+    cursor = changes["cursor"]
+
+    # 4. limit keeps the newest upserts; fields projects columns (id and trade_id are always sent)
+    print("\n[Step 3] limit and fields...")
+    add_trades([_trade(i) for i in range(7, 12)])
+    changes = get_trade_changes(cursor, limit=2, fields=["actual_result", "no_such_column"])
+    print(f"Upserts: {changes['upserts']}")
+    assert _ids(changes) == ["s_11", "s_10"]
+    assert all(set(t) == {"id", "trade_id", "actual_result"} for t in changes["upserts"])
+    snapshot = get_trade_changes(0, limit=4, fields=["timestamp"])
+    assert _ids(snapshot) == ["s_11", "s_10", "s_9", "s_8"] and set(snapshot["upserts"][0]) == {"id", "trade_id", "timestamp"}
+
+    # 5. A cursor older than the retained log, or from the future, gets a full resync
+    print("\n[Step 4] Expired cursor...")
+    cursor = snapshot["cursor"]
+    retained = db_manager.TRADE_CHANGES_RETAINED
+    db_manager.TRADE_CHANGES_RETAINED = 3
+    try:
+        add_trades([_trade(i) for i in range(12, 20)])
+    finally:
+        db_manager.TRADE_CHANGES_RETAINED = retained
+    changes = get_trade_changes(cursor, limit=3)
+    print(f"Reset: {changes['reset']}, upserts: {_ids(changes)}")
+    assert changes["reset"] and _ids(changes) == ["s_19", "s_18", "s_17"]
+    assert get_trade_changes(changes["cursor"] + 100)["reset"]
+    assert not get_trade_changes(changes["cursor"])["reset"]
+
+    # 6. A new session replaces the live list
+    print("\n[Step 5] New epoch...")
+    cursor = changes["cursor"]
+    archive_all_trades()
+    add_trade(_trade(20))
+    changes = get_trade_changes(cursor)
+    print(f"Reset: {changes['reset']}, upserts: {_ids(changes)}")
+    assert changes["reset"] and _ids(changes) == ["s_20"]
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_trade_changes()
@@ -0,0 +1,83 @@
+import os
+import random
+import sys
+import threading
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.db_manager import init_db, add_trades, delete_trade, archive_all_trades, get_db_connection, get_trade_frame, submit_write
+
+def _trades(rng, start, count):
+    return [{
+        "user_id": "test",
+        "session_id": "frame_session",
+        "trade_id": f"f_{i}",
+        "timestamp": f"2026-03-{1 + i // 100:02d} 10:{(i // 60) % 60:02d}:{i % 60:02d}",
+        "ai_prediction": rng.choice(["BIG", "SMALL", "INITIAL"]),
+        "ai_confidence": rng.uniform(40, 99),
+        "signal_source": rng.choice(["Pattern Analysis", "CID Scanner (Trap Detected 80%)", "Trend Detection"]),
+        "actual_result": rng.choice(["BIG", "SMALL"])
+    } for i in range(start, start + count)]
+
+def _query(sql, *params):
+    conn = get_db_connection()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+def test_trade_frame():
+    print("--- Starting Trade Frame Validation ---")
+
+    if os.path.exists('database.db'): os.remove('database.db')
+    init_db()
+    rng = random.Random(9)
+    add_trades(_trades(rng, 0, 300))
+    frame = get_trade_frame()
+    assert frame.size == 300
+
+    # 1. Incremental changes: appends, an update, a delete and an archive
+    print("\n[Step 1] Following the change log...")
+    archive_all_trades()
+    add_trades(_trades(rng, 300, 120))
+    delete_trade("f_10")
+    submit_write(lambda conn: conn.execute("UPDATE trades SET actual_result = 'BIG', ai_prediction = 'BIG' WHERE trade_id = 'f_320'")).result()
+    frame = get_trade_frame()
+    print(f"Rows: {frame.size}, live epoch: {frame.current_epoch}, sources: {len(frame.sources)}")
+    assert frame.size == 420 and frame.alive[:frame.size].sum() == 419
+
+    # 2. Vectorized stats match SQL over the same windows
+    print("\n[Step 2] Stats vs SQL...")
+    live = _query("SELECT ai_prediction, actual_result FROM trades WHERE epoch = (SELECT MAX(id) FROM epochs) ORDER BY id DESC LIMIT 50")
+    assert frame.accuracy(last=50) == (len(live), sum(p == a for p, a in live))
+    expected = {s: (t, c) for s, t, c in _query("""
+        SELECT signal_source, COUNT(*), SUM(ai_prediction = actual_result) FROM trades
+        WHERE ai_prediction IN ('BIG', 'SMALL') GROUP BY signal_source""")}
+    assert frame.source_accuracy(live=False) == expected
+    calibration = frame.calibration(live=False)
+    print(f"Calibration bands: {[(c['band'], c['total']) for c in calibration]}")
+    assert sum(c["total"] for c in calibration) == sum(t for t, _ in expected.values())
+    outcomes = [r[0] for r in _query("SELECT actual_result FROM trades WHERE epoch = (SELECT MAX(id) FROM epochs) ORDER BY id")]
+    streaks = frame.streak_distribution()
+    assert sum(length * count for length, count in streaks.items()) == len(outcomes)
+    times, correct = frame.timeline(live=False, since="2026-03-04 00:00:00", source="CID")
+    assert len(times) == _query("SELECT COUNT(*) FROM trades WHERE timestamp >= '2026-03-04 00:00:00' AND signal_source LIKE '%CID%'")[0][0]
+
+    # 3. locked() holds a sync off until the reads under it are done
+    print("\n[Step 3] Reads under the frame lock...")
+    add_trades(_trades(rng, 420, 10))
+    synced = threading.Thread(target=get_trade_frame)
+    with frame.locked():
+        before = (frame.cursor, frame.size, frame.accuracy(live=False))
+        synced.start()
+        synced.join(0.2)
+        assert synced.is_alive()
+        assert (frame.cursor, frame.size, frame.accuracy(live=False)) == before
+    synced.join()
+    assert frame.size == 430 and frame.cursor > before[0]
+
+    print("\n--- Validation Complete ---")
+
+if __name__ == "__main__":
+    test_trade_frame()
@@ -8,7 +8,7 @@ sys.path.append(os.path.dirname(__file__))
 
 from models.model_a_core import ModelACore
 from utils.multi_manager import MultiManagerSystem
-from utils.db_manager import init_db
+from utils.db_manager import init_db, submit_write
 
 def test_v6():
     print("--- Starting v6.0 Logic Validation ---")
@@ -94,13 +94,27 @@ def test_v6():
                    ("OLD_PAT", "BIG", "SMALL", "2026-01-01 00:00:00"))
     conn.commit()
     
-    # Trigger update_correction_table to run purge
+    # Expiry is handled by the background sweeper; run one sweep directly
     model.update_correction_table("NEW_PAT", "SMALL", "BIG")
+    model.sweep_expired_corrections()
     
     cursor.execute("SELECT * FROM correction_table WHERE pattern = 'OLD_PAT'")
     old_entry = cursor.fetchone()
     print(f"Old Entry Found: {old_entry is not None} (Should be False)")
     conn.close()
+
+    # 6. Test Case 4: a rolled-back correction write leaves the in-memory mirror as it was
+    print("\n[Step 5] Testing Correction Rollback...")
+    before = model.get_correction("BBSS")
+    def failing(conn):
+        model._apply_correction(conn, "BBSS", "BIG", "SMALL")
+        model._apply_correction(conn, "ROLLED", "BIG", "SMALL")
+        raise sqlite3.OperationalError("database is locked")
+    assert submit_write(failing).exception() is not None
+    print(f"Mirror after rollback: {model.get_correction('BBSS')} / {model.get_correction('ROLLED')}")
+    assert model.get_correction("BBSS") == before and model.get_correction("ROLLED") is None
+    model.corrections = None
+    assert model.get_correction("BBSS") == before
     
     print("\n--- Validation Complete ---")
 
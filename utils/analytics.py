@@ -0,0 +1,154 @@
+"""
+Admin analytics over write-time rollups.
+
+trade_rollups holds total/correct counts per (period, bucket, dimension, value):
+period is 'hour' or 'day', dimension is 'source' (signal_source), 'user' (user_id)
+or 'confidence' (10-point ai_confidence bucket). Triggers on trades keep it current
+inside the same write transaction, so dashboards never scan the trades table.
+Only resolved trades with a real BIG/SMALL prediction are counted.
+"""
+from utils.db_manager import get_db_connection
+
+PERIODS = ('hour', 'day')
+DIMENSIONS = ('source', 'user', 'confidence')
+
+# Bucket expressions over a trades row alias (NEW / OLD / t); timestamps are 'YYYY-MM-DD HH:MM:SS' IST
+def _bucket_sql(row):
+    return f"CASE p.period WHEN 'hour' THEN substr({row}.timestamp, 1, 13) || ':00' ELSE substr({row}.timestamp, 1, 10) END"
+
+def _confidence_sql(row):
+    low = f"(min(max(CAST({row}.ai_confidence AS INTEGER), 0), 99) / 10 * 10)"
+    return f"printf('%02d-%02d', {low}, {low} + 9)"
+
+def _counted_sql(row):
+    return f"{row}.actual_result IS NOT NULL AND {row}.ai_prediction IN ('BIG', 'SMALL')"
+
+def _rollup_upsert(row, sign):
+    return f'''
+        INSERT INTO trade_rollups (period, bucket, dimension, value, total, correct)
+        SELECT p.period, {_bucket_sql(row)}, d.dimension, d.value, {sign}, {sign} * ({row}.ai_prediction = {row}.actual_result)
+        FROM (SELECT 'hour' AS period UNION ALL SELECT 'day') p,
+             (SELECT 'source' AS dimension, {row}.signal_source AS value
+              UNION ALL SELECT 'user', {row}.user_id
+              UNION ALL SELECT 'confidence', {_confidence_sql(row)}) d
+        WHERE 1
+        ON CONFLICT (period, dimension, bucket, value)
+        DO UPDATE SET total = total + excluded.total, correct = correct + excluded.correct;
+    '''
+
+def init_rollups(cursor):
+    """Creates the rollup table and its triggers; backfills it once from existing trades."""
+    exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trade_rollups'").fetchone()
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS trade_rollups (
+        period TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        value TEXT NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        correct INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (period, dimension, bucket, value)
+    )
+    ''')
+    columns = "timestamp, ai_prediction, actual_result, signal_source, user_id, ai_confidence"
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trades_rollup_insert AFTER INSERT ON trades WHEN {_counted_sql('NEW')} BEGIN
+        {_rollup_upsert('NEW', 1)}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trades_rollup_delete AFTER DELETE ON trades WHEN {_counted_sql('OLD')} BEGIN
+        {_rollup_upsert('OLD', -1)}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trades_rollup_update_old AFTER UPDATE OF {columns} ON trades WHEN {_counted_sql('OLD')} BEGIN
+        {_rollup_upsert('OLD', -1)}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trades_rollup_update_new AFTER UPDATE OF {columns} ON trades WHEN {_counted_sql('NEW')} BEGIN
+        {_rollup_upsert('NEW', 1)}
+    END
+    ''')
+    if not exists:
+        cursor.execute(f'''
+        INSERT INTO trade_rollups (period, bucket, dimension, value, total, correct)
+        SELECT p.period, {_bucket_sql('t')}, d.dimension,
+               CASE d.dimension WHEN 'source' THEN t.signal_source WHEN 'user' THEN t.user_id ELSE {_confidence_sql('t')} END,
+               COUNT(*), SUM(t.ai_prediction = t.actual_result)
+        FROM trades t,
+             (SELECT 'hour' AS period UNION ALL SELECT 'day') p,
+             (SELECT 'source' AS dimension UNION ALL SELECT 'user' UNION ALL SELECT 'confidence') d
+        WHERE {_counted_sql('t')}
+        GROUP BY 1, 2, 3, 4
+        ''')
+
+def _accuracy(total, correct):
+    return round(correct * 100.0 / total, 1) if total else 0.0
+
+def get_rollups(period='day', dimension='source', value=None, since=None, until=None, after=None, limit=50):
+    """
+    Keyset-paginated rollup rows, newest bucket first.
+    `after` is the opaque cursor returned as `next` by the previous page.
+    """
+    if period not in PERIODS or dimension not in DIMENSIONS:
+        raise ValueError("Unknown period or dimension")
+    limit = max(1, min(int(limit), 500))
+    query = 'SELECT bucket, value, total, correct FROM trade_rollups WHERE period = ? AND dimension = ? AND total > 0'
+    params = [period, dimension]
+    if value is not None:
+        query += ' AND value = ?'
+        params.append(value)
+    if since:
+        query += ' AND bucket >= ?'
+        params.append(since)
+    if until:
+        query += ' AND bucket <= ?'
+        params.append(until)
+    if after:
+        bucket, _, last_value = after.partition('|')
+        query += ' AND (bucket, value) < (?, ?)'
+        params += [bucket, last_value]
+    query += ' ORDER BY bucket DESC, value DESC LIMIT ?'
+    params.append(limit + 1)
+
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+    items = [{"bucket": b, "value": v, "total": t, "correct": c, "accuracy": _accuracy(t, c)} for b, v, t, c in rows[:limit]]
+    next_cursor = f"{items[-1]['bucket']}|{items[-1]['value']}" if len(rows) > limit else None
+    return {"items": items, "next": next_cursor}
+
+def get_rollup_summary(dimension='source', since=None):
+    """Totals per value over day buckets (one row per day and value, not per trade)."""
+    if dimension not in DIMENSIONS:
+        raise ValueError("Unknown dimension")
+    query = "SELECT value, SUM(total), SUM(correct) FROM trade_rollups WHERE period = 'day' AND dimension = ?"
+    params = [dimension]
+    if since:
+        query += ' AND bucket >= ?'
+        params.append(since)
+    query += ' GROUP BY value HAVING SUM(total) > 0 ORDER BY SUM(total) DESC'
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+    return [{"value": v, "total": t, "correct": c, "accuracy": _accuracy(t, c)} for v, t, c in rows]
+
+def get_trades_page(before=None, limit=50):
+    """Admin activity log, newest first, keyset-paginated by trade id."""
+    limit = max(1, min(int(limit), 500))
+    conn = get_db_connection()
+    try:
+        if before:
+            rows = conn.execute('SELECT * FROM trades WHERE id < ? ORDER BY id DESC LIMIT ?', (before, limit + 1)).fetchall()
+        else:
+            rows = conn.execute('SELECT * FROM trades ORDER BY id DESC LIMIT ?', (limit + 1,)).fetchall()
+    finally:
+        conn.close()
+    trades = [dict(r) for r in rows[:limit]]
+    return {"items": trades, "next": trades[-1]["id"] if len(rows) > limit else None}
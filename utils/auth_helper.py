@@ -1,5 +1,5 @@
 from functools import wraps
-from flask import session, redirect, url_for, request
+from flask import session, redirect, url_for, request, jsonify
 
 def login_required(f):
     @wraps(f)
@@ -13,10 +13,10 @@ def login_required(f):
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Basic admin check
+        # Set by /admin/login once the ADMIN_PASSWORD has been given
         if not session.get('is_admin'):
-            # For local dev, we might want to allow it or redirect
-            # return redirect(url_for('dashboard'))
-            pass
+            if request.path.startswith('/api/'):
+                return jsonify({"status": "error", "message": "Admin access required."}), 403
+            return redirect(url_for('admin_login', next=request.path))
         return f(*args, **kwargs)
     return decorated_function
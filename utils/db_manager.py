@@ -1,14 +1,29 @@
 import sqlite3
 import os
 import shutil
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta, timezone
+from utils.db_writer import DBWriter
+from utils.history_store import HistoryStore
+from utils.trade_frame import TradeFrame
+from utils.sql_trace import TracedConnection, tracer, plan_problems
+
+# Trade timestamps are stored as naive IST ('Asia/Kolkata', UTC+05:30) strings
+IST = timezone(timedelta(hours=5, minutes=30))
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
 
 # Database path configuration
 IS_VERCEL = "VERCEL" in os.environ
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 ORIGINAL_DB_PATH = os.path.join(BASE_DIR, 'database.db')
 
-if IS_VERCEL:
+if os.environ.get('DATABASE_PATH'):
+    # Explicit override (load tests, tooling, alternate deployments)
+    DB_PATH = os.environ['DATABASE_PATH']
+elif IS_VERCEL:
     DB_PATH = '/tmp/database.db'
     # Copy the original database to /tmp if it doesn't exist there yet
     if not os.path.exists(DB_PATH) and os.path.exists(ORIGINAL_DB_PATH):
@@ -19,15 +34,57 @@ if IS_VERCEL:
 else:
     DB_PATH = ORIGINAL_DB_PATH
 
-def get_db_connection():
-    """Creates and returns a sqlite3 connection. Simplified for Vercel."""
+# Bit-packed full result history kept next to the database (see utils/history_store.py)
+HISTORY_PATH = os.path.splitext(DB_PATH)[0] + '.history'
+
+# Independent game streams: the default stream is DB_PATH, every other stream has its own
+# database (trades, model state, history) under STREAMS_DIR. Code runs against the stream
+# of the current context, see stream_context().
+DEFAULT_STREAM = 'default'
+STREAMS_DIR = os.path.splitext(DB_PATH)[0] + '.streams'
+STREAM_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+_stream = ContextVar('stream', default=DEFAULT_STREAM)
+
+def valid_stream_id(stream_id):
+    return bool(stream_id) and bool(STREAM_ID_PATTERN.match(stream_id))
+
+def current_stream():
+    return _stream.get()
+
+@contextmanager
+def stream_context(stream_id):
+    """Runs the block against `stream_id`'s database (threads started inside inherit it)."""
+    if not valid_stream_id(stream_id):
+        raise ValueError(f"Invalid stream id: {stream_id!r}")
+    token = _stream.set(stream_id)
+    try:
+        yield
+    finally:
+        _stream.reset(token)
+
+def get_db_path(stream_id=None):
+    stream_id = stream_id or _stream.get()
+    return DB_PATH if stream_id == DEFAULT_STREAM else os.path.join(STREAMS_DIR, f'{stream_id}.db')
+
+def stream_exists(stream_id):
+    """True once the stream's database has been created (by its first write)."""
+    return os.path.exists(get_db_path(stream_id))
+
+# Opt-in statement tracing (utils/sql_trace.py): per-fingerprint timings, a slow-query
+# log for statements over SQL_SLOW_MS, and per-request statement counts
+SQL_TRACE = os.environ.get('SQL_TRACE', '0') == '1'
+tracer.slow_ms = float(os.environ.get('SQL_SLOW_MS', 50))
+
+def get_db_connection(path=None):
+    """Creates and returns a sqlite3 connection to `path` (default: the current stream's database)."""
+    path = path or get_db_path()
     try:
-        # Ensure the directory for DB_PATH exists
-        db_dir = os.path.dirname(DB_PATH)
+        # Ensure the directory for the database exists
+        db_dir = os.path.dirname(path)
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
             
-        conn = sqlite3.connect(DB_PATH, timeout=30) 
+        conn = sqlite3.connect(path, timeout=30, factory=TracedConnection if SQL_TRACE else sqlite3.Connection)
         conn.row_factory = sqlite3.Row
         return conn
     except Exception as e:
@@ -37,6 +94,125 @@ def get_db_connection():
         conn.row_factory = sqlite3.Row
         return conn
 
+_writers = {} # database path -> DBWriter
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """Returns the single-writer actor that serializes all writes to the current stream's database."""
+    path = get_db_path()
+    writer = _writers.get(path)
+    if writer is None:
+        with _writer_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = _writers[path] = DBWriter(lambda: get_db_connection(path))
+    return writer
+
+def submit_write(op, *args):
+    """Queues `op(conn, *args)` on the writer thread and returns a Future."""
+    if SQL_TRACE: op = tracer.attach(op)
+    return get_writer().submit(op, *args)
+
+def get_writer_stats():
+    return get_writer().get_stats()
+
+_histories = {} # database path -> HistoryStore
+
+def get_history_store(create=True):
+    """
+    Returns the memory-mapped full history, kept in sync by the writer after every
+    commit (add_trade, delete_trade, archive ...). Returns None if it can't be opened,
+    or with create=False if it hasn't been opened yet (the catch-up sync must not run
+    inside the writer's open transaction).
+    """
+    path = get_db_path()
+    store = _histories.get(path)
+    if store is None and create:
+        writer = get_writer()
+        with _writer_lock:
+            store = _histories.get(path)
+            if store is None:
+                try:
+                    store = HistoryStore(os.path.splitext(path)[0] + '.history')
+                except (OSError, ValueError) as e:
+                    print(f"History Store Error: {e}")
+                    return None
+                writer.add_commit_hook(store.sync)
+                # Catch up with anything committed before the hook was registered
+                writer.execute(store.sync)
+                _histories[path] = store
+    return store
+
+_frames = {} # database path -> TradeFrame
+_frame_lock = threading.Lock()
+
+def get_trade_frame():
+    """
+    Returns the shared columnar trade frame (utils/trade_frame.py), caught up with
+    every change committed so far by any worker: one indexed lookup on the change
+    log when nothing changed, a bulk load the first time.
+    """
+    path = get_db_path()
+    with _frame_lock:
+        frame = _frames.get(path)
+        if frame is None:
+            frame = _frames[path] = TradeFrame()
+        conn = get_db_connection(path)
+        try:
+            frame.sync(conn)
+        finally:
+            conn.close()
+        return frame
+
+def get_query_stats(top=25):
+    """Traced statements by total time, per-endpoint counts and recent slow queries (SQL_TRACE=1)."""
+    return dict(tracer.snapshot(top), enabled=SQL_TRACE, slow_ms=tracer.slow_ms)
+
+# Queries on the request/training hot path, by name: (sql, sample params).
+# check_query_plans() EXPLAINs each one; registered next to the code that runs it.
+HOT_QUERIES = {}
+
+def register_hot_query(name, sql, params=()):
+    HOT_QUERIES[name] = (sql, tuple(params))
+    return sql
+
+def check_query_plans(conn=None):
+    """
+    Runs EXPLAIN QUERY PLAN on every registered hot query. Returns {name: [plan
+    steps]} for the ones that scan a table (see sql_trace.plan_problems); empty if all are indexed.
+    """
+    own_conn = conn is None
+    if own_conn: conn = get_db_connection()
+    try:
+        failures = {}
+        for name, (sql, params) in HOT_QUERIES.items():
+            problems = plan_problems(conn, sql, params)
+            if problems: failures[name] = problems
+        return failures
+    finally:
+        if own_conn: conn.close()
+
+# Change-log followers (history store, trade frame) run these after every commit
+register_hot_query('history_store_changes', HistoryStore.CHANGES, (0,))
+register_hot_query('trade_frame_changes', TradeFrame.CHANGES, (0,))
+register_hot_query('trade_frame_rows', f'{TradeFrame.SELECT} WHERE id IN (?, ?)', (1, 2))
+
+DATA_REVISION = register_hot_query('data_revision', 'SELECT MAX(seq) FROM trade_changes')
+
+def get_data_revision(conn=None):
+    """
+    Database-wide data revision: the newest trade_changes seq. Every trade insert,
+    update, delete and archive advances it, whichever worker committed it. Pass the
+    writer's `conn` to read the revision a write is producing.
+    """
+    own_conn = conn is None
+    if own_conn: conn = get_db_connection()
+    try:
+        row = conn.execute(DATA_REVISION).fetchone()
+        return row[0] or 0
+    finally:
+        if own_conn: conn.close()
+
 def init_db():
     """Initializes the database schema."""
     conn = get_db_connection()
@@ -55,7 +231,8 @@ def init_db():
         user_choice TEXT,
         actual_result TEXT,
         bet_amount REAL,
-        is_archived INTEGER DEFAULT 0
+        is_archived INTEGER DEFAULT 0,
+        epoch INTEGER NOT NULL DEFAULT 0
     )
     ''')
     
@@ -80,79 +257,225 @@ def init_db():
     )
     ''')
     
+    # Sessions are epochs: live trades are those of the newest epoch, archiving starts a new one.
+    # is_archived is kept for old exports only and is no longer maintained.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS epochs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    columns = [r[1] for r in cursor.execute('PRAGMA table_info(trades)')]
+    if 'epoch' not in columns:
+        cursor.execute('ALTER TABLE trades ADD COLUMN epoch INTEGER NOT NULL DEFAULT 0')
+    if not cursor.execute('SELECT 1 FROM epochs LIMIT 1').fetchone():
+        # One-time migration: unarchived rows become the first live epoch
+        cursor.execute('INSERT INTO epochs DEFAULT VALUES')
+        cursor.execute('UPDATE trades SET epoch = ? WHERE is_archived = 0', (cursor.lastrowid,))
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades(timestamp)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_epoch ON trades(epoch, timestamp)')
+    # Live trades in insertion order (get_trade_changes resets) without sorting the epoch
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_epoch_id ON trades(epoch, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_correction_last_seen ON correction_table(last_seen)')
+    
+    # Change log for incremental trade sync: every insert/update/delete gets a monotonic seq
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS trade_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        trade_pk INTEGER NOT NULL,
+        trade_id TEXT NOT NULL,
+        op TEXT NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trades_log_insert AFTER INSERT ON trades BEGIN
+        INSERT INTO trade_changes (trade_pk, trade_id, op) VALUES (NEW.id, NEW.trade_id, 'upsert');
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trades_log_update AFTER UPDATE ON trades BEGIN
+        INSERT INTO trade_changes (trade_pk, trade_id, op) VALUES (NEW.id, NEW.trade_id, 'upsert');
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trades_log_delete AFTER DELETE ON trades BEGIN
+        INSERT INTO trade_changes (trade_pk, trade_id, op) VALUES (OLD.id, OLD.trade_id, 'delete');
+    END
+    ''')
+    
+    # Per-hour/per-day accuracy rollups for the admin analytics, maintained by triggers
+    from utils.analytics import init_rollups
+    init_rollups(cursor)
+    
+    # Model state (patterns, error matrix, Markov tables, strategy weights)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS model_patterns (
+        pattern TEXT PRIMARY KEY,
+        big REAL NOT NULL,
+        small REAL NOT NULL,
+        version INTEGER NOT NULL
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS model_error_matrix (
+        pattern TEXT PRIMARY KEY,
+        wins REAL NOT NULL,
+        losses REAL NOT NULL,
+        version INTEGER NOT NULL
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS model_markov (
+        state TEXT PRIMARY KEY,
+        big REAL NOT NULL,
+        small REAL NOT NULL,
+        version INTEGER NOT NULL
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS model_weights (
+        strategy TEXT PRIMARY KEY,
+        weight REAL NOT NULL,
+        version INTEGER NOT NULL
+    )
+    ''')
+    
+    # Append-only model changes since the snapshot held in the tables above
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS model_journal (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        version INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        delta TEXT NOT NULL
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS model_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    ''')
+    
     conn.commit()
     conn.close()
 
-def add_trade(trade_data):
-    """Adds a new trade entry."""
-    conn = None
+# Scalar subquery for the live epoch; evaluated once per statement through the epochs primary key
+CURRENT_EPOCH = '(SELECT MAX(id) FROM epochs)'
+
+def get_current_epoch(conn=None):
+    own_conn = conn is None
+    if own_conn: conn = get_db_connection()
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        timestamp = trade_data.get('timestamp')
-        if not timestamp:
-            ist_offset = timezone(timedelta(hours=5, minutes=30))
-            timestamp = datetime.now(tz=ist_offset).strftime('%Y-%m-%d %H:%M:%S')
-
-        cursor.execute('SELECT 1 FROM trades WHERE trade_id = ?', (trade_data['trade_id'],))
-        if cursor.fetchone(): return False
-
-        cursor.execute('''
-        INSERT INTO trades (user_id, session_id, trade_id, timestamp, ai_prediction, ai_confidence, signal_source, user_choice, actual_result, bet_amount)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            trade_data['user_id'], trade_data['session_id'], trade_data['trade_id'], timestamp,
-            trade_data['ai_prediction'], trade_data['ai_confidence'], trade_data['signal_source'], 
-            trade_data.get('user_choice'), trade_data.get('actual_result'), trade_data.get('bet_amount')
-        ))
-        conn.commit()
-        return True
+        return conn.execute(f'SELECT {CURRENT_EPOCH}').fetchone()[0] or 0
+    finally:
+        if own_conn: conn.close()
+
+TRADE_EXISTS = register_hot_query('trade_exists', 'SELECT 1 FROM trades WHERE trade_id = ?', ('t_1',))
+
+def _insert_trade(conn, trade_data):
+    cursor = conn.cursor()
+    cursor.execute(TRADE_EXISTS, (trade_data['trade_id'],))
+    if cursor.fetchone(): return False
+
+    cursor.execute(f'''
+    INSERT INTO trades (user_id, session_id, trade_id, timestamp, ai_prediction, ai_confidence, signal_source, user_choice, actual_result, bet_amount, epoch)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {CURRENT_EPOCH})
+    ''', (
+        trade_data['user_id'], trade_data['session_id'], trade_data['trade_id'], trade_data['timestamp'],
+        trade_data['ai_prediction'], trade_data['ai_confidence'], trade_data['signal_source'], 
+        trade_data.get('user_choice'), trade_data.get('actual_result'), trade_data.get('bet_amount')
+    ))
+    return True
+
+def _with_timestamp(trade_data):
+    if trade_data.get('timestamp'): return trade_data
+    return dict(trade_data, timestamp=datetime.now(tz=IST).strftime(TIMESTAMP_FORMAT))
+
+# Number of change-log entries kept for /api/trades?since=; older cursors get a full resync
+TRADE_CHANGES_RETAINED = 10000
+
+PRUNE_TRADE_CHANGES = register_hot_query('prune_trade_changes', 'DELETE FROM trade_changes WHERE seq <= (SELECT MAX(seq) FROM trade_changes) - ?', (TRADE_CHANGES_RETAINED,))
+
+def _prune_trade_changes(conn):
+    conn.execute(PRUNE_TRADE_CHANGES, (TRADE_CHANGES_RETAINED,))
+
+def _insert_trades(conn, trades, then=None):
+    results = [_insert_trade(conn, t) for t in trades]
+    if then and any(results): then(conn)
+    _prune_trade_changes(conn)
+    return results
+
+def _insert_one(conn, trade_data, then=None):
+    if not _insert_trades(conn, [trade_data], then)[0]: return False
+    return get_data_revision(conn)
+
+def add_trade(trade_data, then=None):
+    """
+    Adds a new trade entry.
+    `then(conn)` runs after a successful insert, inside the same write transaction.
+    Returns the data revision the insert produced (see get_data_revision), or
+    False if the trade already existed or could not be saved.
+    """
+    try:
+        return submit_write(_insert_one, _with_timestamp(trade_data), then).result()
     except Exception as e:
         print(f"DB Error: {e}")
         return False
-    finally:
-        if conn: conn.close()
+
+def add_trades(trades, then=None):
+    """Adds several trades in one transaction, then runs `then(conn)` once if any were new."""
+    try:
+        return submit_write(_insert_trades, [_with_timestamp(t) for t in trades], then).result()
+    except Exception as e:
+        print(f"DB Error: {e}")
+        return [False] * len(trades)
+
+RECENT_TRADES = register_hot_query('recent_trades', f'SELECT * FROM trades WHERE epoch = {CURRENT_EPOCH} ORDER BY timestamp DESC LIMIT ?', (10,))
 
 def get_recent_trades(limit=10, include_archived=False):
     conn = get_db_connection()
     try:
-        query = 'SELECT * FROM trades ORDER BY timestamp DESC LIMIT ?' if include_archived else \
-                'SELECT * FROM trades WHERE is_archived = 0 ORDER BY timestamp DESC LIMIT ?'
+        query = 'SELECT * FROM trades ORDER BY timestamp DESC LIMIT ?' if include_archived else RECENT_TRADES
         trades = conn.execute(query, (limit,)).fetchall()
         return [dict(row) for row in trades]
     finally:
         conn.close()
 
-def archive_all_trades():
-    conn = get_db_connection()
-    try:
-        conn.execute('UPDATE trades SET is_archived = 1 WHERE is_archived = 0')
-        conn.commit()
-    finally:
-        conn.close()
+def _archive_all(conn, then=None):
+    # O(1): no trade rows change, the live filter simply moves to the new epoch
+    conn.execute('INSERT INTO epochs DEFAULT VALUES')
+    # Marker for incremental sync clients: everything before it left the live list
+    conn.execute("INSERT INTO trade_changes (trade_pk, trade_id, op) VALUES (0, '', 'epoch')")
+    if then: then(conn)
 
-def delete_trade(trade_id):
-    conn = get_db_connection()
-    try:
-        conn.execute('DELETE FROM trades WHERE trade_id = ?', (trade_id,))
-        conn.commit()
-    finally:
-        conn.close()
+def archive_all_trades(then=None):
+    submit_write(_archive_all, then).result()
+
+def _delete_trade(conn, trade_id, then=None):
+    deleted = conn.execute('DELETE FROM trades WHERE trade_id = ?', (trade_id,)).rowcount
+    if then and deleted: then(conn)
+    return deleted
+
+def delete_trade(trade_id, then=None):
+    return submit_write(_delete_trade, trade_id, then).result()
+
+def _clear_trades(conn):
+    conn.execute('DELETE FROM trades')
 
 def clear_db():
-    conn = get_db_connection()
-    try:
-        conn.execute('DELETE FROM trades')
-        conn.commit()
-    finally:
-        conn.close()
+    submit_write(_clear_trades).result()
+
+LIVE_TRADE_COUNT = register_hot_query('live_trade_count', f'SELECT COUNT(*) FROM trades WHERE epoch = {CURRENT_EPOCH}')
 
 def get_total_trades_count(include_archived=False):
     conn = get_db_connection()
     try:
-        query = 'SELECT COUNT(*) FROM trades' if include_archived else \
-                'SELECT COUNT(*) FROM trades WHERE is_archived = 0'
+        query = 'SELECT COUNT(*) FROM trades' if include_archived else LIVE_TRADE_COUNT
         row = conn.execute(query).fetchone()
         return row[0] if row else 0
     finally:
@@ -165,3 +488,64 @@ def get_session_trades(session_id):
         return [dict(row) for row in trades]
     finally:
         conn.close()
+
+# Columns clients may request through the `fields` projection of get_trade_changes
+SYNC_FIELDS = ('id', 'user_id', 'session_id', 'trade_id', 'timestamp', 'ai_prediction', 'ai_confidence',
+               'signal_source', 'user_choice', 'actual_result', 'bet_amount')
+
+# Separate subqueries: MIN and MAX in one SELECT scan the whole log
+CHANGE_LOG_BOUNDS = register_hot_query('change_log_bounds', 'SELECT (SELECT MIN(seq) FROM trade_changes), (SELECT MAX(seq) FROM trade_changes)')
+CHANGES_SINCE = register_hot_query('changes_since', 'SELECT seq, trade_pk, trade_id, op FROM trade_changes WHERE seq > ? AND seq <= ? ORDER BY seq', (0, 10))
+LIVE_TRADES_BY_ID = 'SELECT {} FROM trades WHERE epoch = ' + CURRENT_EPOCH + ' ORDER BY id DESC LIMIT ?'
+register_hot_query('live_trades_by_id', LIVE_TRADES_BY_ID.format(', '.join(SYNC_FIELDS)), (10,))
+register_hot_query('trades_by_id', f"SELECT {', '.join(SYNC_FIELDS)}, epoch AS live_epoch FROM trades WHERE id IN (?, ?)", (1, 2))
+
+def get_trade_changes(since=0, limit=10, fields=None):
+    """
+    Incremental sync of the live trade list.
+    Returns the live trades inserted or changed after change-log cursor `since`,
+    the trade_ids that were deleted or archived, and the new cursor. A missing or
+    expired cursor, or a new session (epoch) since the cursor, returns the newest
+    `limit` live trades with reset=True.
+    Rows are ordered by id (insertion order), not by the timestamp string.
+    """
+    cols = [f for f in (fields or SYNC_FIELDS) if f in SYNC_FIELDS]
+    for required in ('trade_id', 'id'):
+        if required not in cols: cols.insert(0, required)
+    select = ', '.join(cols)
+    
+    conn = get_db_connection()
+    try:
+        row = conn.execute(CHANGE_LOG_BOUNDS).fetchone()
+        min_seq, cursor = (row[0] or 0), (row[1] or 0)
+        
+        changes = []
+        if since and min_seq - 1 <= since <= cursor:
+            changes = conn.execute(CHANGES_SINCE, (since, cursor)).fetchall()
+        # A new epoch (session) replaces the whole live list
+        if not since or since < min_seq - 1 or since > cursor or any(c[3] == 'epoch' for c in changes):
+            trades = conn.execute(LIVE_TRADES_BY_ID.format(select), (limit,)).fetchall()
+            return {"cursor": cursor, "reset": True, "upserts": [dict(r) for r in trades], "deleted": []}
+        
+        epoch = get_current_epoch(conn)
+        latest = {}
+        for seq, trade_pk, trade_id, op in changes:
+            latest[trade_pk] = (trade_id, op)
+        
+        deleted = [trade_id for trade_id, op in latest.values() if op == 'delete']
+        upserts = []
+        ids = [pk for pk, (_, op) in latest.items() if op == 'upsert']
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i+500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(f'SELECT {select}, epoch AS live_epoch FROM trades WHERE id IN ({placeholders})', chunk).fetchall()
+            for r in rows:
+                item = dict(r)
+                if item.pop('live_epoch') != epoch:
+                    deleted.append(item['trade_id'])
+                else:
+                    upserts.append(item)
+        upserts.sort(key=lambda t: t['id'], reverse=True)
+        return {"cursor": cursor, "reset": False, "upserts": upserts[:limit], "deleted": deleted}
+    finally:
+        conn.close()
@@ -0,0 +1,159 @@
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class DBWriter:
+    """
+    Single-writer actor for SQLite.
+    Every write is queued as an operation `op(conn, *args)` and executed by one
+    background thread, which drains whatever is pending and commits it as one
+    group commit. Each operation runs inside its own SAVEPOINT, so a failing
+    operation is rolled back alone and its Future carries the exception.
+    """
+    def __init__(self, connect, max_batch=128):
+        self._connect = connect
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._conn = None
+        self.max_batch = max_batch
+        # The writer thread runs in the creator's context (e.g. its stream, see db_manager)
+        self._context = contextvars.copy_context()
+        # Bumped after every successful group commit; cheap "has anything changed" key
+        self.revision = 0
+        # Called as hook(conn) on the writer thread after each successful commit
+        self._commit_hooks = []
+        # undo() callbacks registered by the operations of the open transaction
+        self._undo = []
+        self.stats = {"operations": 0, "batches": 0, "errors": 0, "max_batch_size": 0, "last_commit_ms": 0.0}
+
+    def submit(self, op, *args):
+        """Queues a write operation and returns a Future with its result."""
+        future = Future()
+        if threading.current_thread() is self._thread and self._conn is not None:
+            # Re-entrant call from inside an operation: run on the open transaction
+            result, error = self._run_op(self._conn, op, args)
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+            return future
+        self._ensure_started()
+        self._queue.put((op, args, future))
+        return future
+
+    def execute(self, op, *args):
+        """Queues a write operation and waits for its committed result."""
+        return self.submit(op, *args).result()
+
+    def add_commit_hook(self, hook):
+        """Registers `hook(conn)` to run after every group commit (read-only use of conn)."""
+        self._commit_hooks.append(hook)
+
+    def on_rollback(self, undo):
+        """
+        From inside an operation: registers `undo()` to run if that operation's
+        writes are rolled back (its own failure or a failed commit), so in-memory
+        state set alongside the writes can be reverted.
+        """
+        if threading.current_thread() is self._thread and self._conn is not None:
+            self._undo.append(undo)
+
+    def _rollback_to(self, mark):
+        undo, self._undo[mark:] = self._undo[mark:], []
+        for fn in reversed(undo):
+            try:
+                fn()
+            except Exception as e:
+                print(f"DB Writer Rollback Hook Error: {e}")
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["queue_depth"] = self.queue_depth()
+        stats["revision"] = self.revision
+        return stats
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive(): return
+        with self._lock:
+            if self._thread and self._thread.is_alive(): return
+            self._thread = threading.Thread(target=self._context.run, args=(self._loop,), name="db-writer", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit_batch(batch)
+
+    def _run_op(self, conn, op, args):
+        conn.execute("SAVEPOINT op")
+        mark = len(self._undo)
+        try:
+            result = op(conn, *args)
+            conn.execute("RELEASE SAVEPOINT op")
+            return result, None
+        except Exception as e:
+            conn.execute("ROLLBACK TO SAVEPOINT op")
+            conn.execute("RELEASE SAVEPOINT op")
+            self._rollback_to(mark)
+            self.stats["errors"] += 1
+            return None, e
+
+    def _commit_batch(self, batch):
+        start = time.perf_counter()
+        done = []
+        conn = None
+        try:
+            # A fresh connection per batch keeps the writer valid if the file is replaced
+            conn = self._connect()
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            self._conn = conn
+            for op, args, future in batch:
+                result, error = self._run_op(conn, op, args)
+                if error is None:
+                    done.append((future, result))
+                elif not future.done():
+                    future.set_exception(error)
+            conn.execute("COMMIT")
+            self._undo = []
+            self.revision += 1
+            for hook in self._commit_hooks:
+                try:
+                    hook(conn)
+                except Exception as e:
+                    print(f"DB Writer Commit Hook Error: {e}")
+        except Exception as e:
+            print(f"DB Writer Commit Error: {e}")
+            try:
+                if conn: conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            self._rollback_to(0)
+            for op, args, future in batch:
+                if not future.done():
+                    self.stats["errors"] += 1
+                    future.set_exception(e)
+            done = []
+        finally:
+            self._conn = None
+            if conn: conn.close()
+
+        for future, result in done:
+            if not future.done():
+                future.set_result(result)
+
+        self.stats["operations"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+        self.stats["last_commit_ms"] = round((time.perf_counter() - start) * 1000, 2)
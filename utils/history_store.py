@@ -0,0 +1,240 @@
+import os
+import threading
+import numpy as np
+
+# Per-trade flag bits, packed two trades (one nibble each) per byte
+HAS_RESULT = 1    # actual_result is set
+RESULT_BIG = 2    # actual_result == BIG
+HAS_PREDICTION = 4 # a real AI prediction (not INITIAL / bulk input)
+PREDICTED_BIG = 8 # ai_prediction == BIG
+
+MAGIC = 0x31484d4941 # "AIMH1"
+HEADER_WORDS = 8     # magic, capacity, high, cursor, cursor_pk, reserved...
+HEADER_BYTES = HEADER_WORDS * 8
+
+def encode_flags(actual, prediction):
+    if actual not in ("BIG", "SMALL"): return 0
+    flags = HAS_RESULT | (RESULT_BIG if actual == "BIG" else 0)
+    if prediction in ("BIG", "SMALL"):
+        flags |= HAS_PREDICTION | (PREDICTED_BIG if prediction == "BIG" else 0)
+    return flags
+
+def _decode(ids, flags):
+    return [("BIG" if f & RESULT_BIG else "SMALL",
+             ("BIG" if f & PREDICTED_BIG else "SMALL") if f & HAS_PREDICTION else None, i)
+            for i, f in zip(ids.tolist(), flags.tolist())]
+
+class HistoryStore:
+    """
+    Append-only, bit-packed copy of the full trade history, memory-mapped as NumPy arrays.
+    Slot i holds the 4 flag bits of trades.id == i, so appends, undo and archive updates
+    are O(1) byte writes, and millions of results take a few hundred KB.
+    The store follows the trade_changes log (cursor kept in the header) and rebuilds
+    itself from the trades table when the log no longer covers its cursor.
+    """
+    def __init__(self, path, grow=1 << 16):
+        self.path = path
+        self.grow = grow
+        self._lock = threading.RLock()
+        self._open()
+
+    def _open(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER_BYTES:
+            with open(self.path, "wb") as f:
+                f.truncate(HEADER_BYTES)
+        self.header = np.memmap(self.path, dtype=np.uint64, mode="r+", shape=(HEADER_WORDS,))
+        if int(self.header[0]) != MAGIC:
+            self.header[:] = 0
+            self.header[0] = MAGIC
+        self._map(int(self.header[1]))
+
+    def _map(self, capacity):
+        size = HEADER_BYTES + capacity // 2
+        if os.path.getsize(self.path) < size:
+            with open(self.path, "r+b") as f:
+                f.truncate(size)
+        self.header[1] = capacity
+        # Readers keep whatever array they already hold; the file only ever grows
+        self.data = np.memmap(self.path, dtype=np.uint8, mode="r+", offset=HEADER_BYTES, shape=(capacity // 2,)) if capacity else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return int(self.header[2])
+
+    @property
+    def cursor(self):
+        return int(self.header[3])
+
+    def _ensure(self, slot):
+        capacity = int(self.header[1])
+        if slot < capacity: return
+        while capacity <= slot:
+            capacity = max(capacity * 2, self.grow)
+        self._map(capacity)
+
+    def _set(self, slot, flags):
+        self._ensure(slot)
+        byte, shift = slot >> 1, (slot & 1) * 4
+        data = self.data
+        data[byte] = (int(data[byte]) & (0xF0 >> shift)) | (flags << shift)
+        if slot >= self.header[2] and flags:
+            self.header[2] = slot + 1
+
+    def _set_many(self, slots, flags):
+        """Vectorized write of many (slot, flags) pairs; used by rebuild."""
+        if not len(slots): return
+        self._ensure(int(slots.max()))
+        data = self.data
+        for parity in (0, 1):
+            pick = (slots & 1) == parity
+            idx = slots[pick] >> 1
+            keep = 0xF0 if parity == 0 else 0x0F
+            data[idx] = (data[idx] & keep) | (flags[pick].astype(np.uint8) << (4 * parity))
+        self.header[2] = max(int(self.header[2]), int(slots.max()) + 1)
+
+    def rebuild(self, conn, chunk=50000):
+        """Rewrites the store from the trades table, streaming it in chunks."""
+        with self._lock:
+            seq = conn.execute("SELECT seq, trade_pk FROM trade_changes ORDER BY seq DESC LIMIT 1").fetchone()
+            self.data[:] = 0
+            self.header[2] = 0
+            cursor = conn.execute("SELECT id, actual_result, ai_prediction FROM trades ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(chunk)
+                if not rows: break
+                slots = np.array([r[0] for r in rows], dtype=np.int64)
+                flags = np.array([encode_flags(r[1], r[2]) for r in rows], dtype=np.uint8)
+                self._set_many(slots, flags)
+            self.header[3] = seq[0] if seq else 0
+            self.header[4] = seq[1] if seq else 0
+            self.flush()
+
+    CHANGES = """
+        SELECT c.seq, c.trade_pk, c.op, t.actual_result, t.ai_prediction
+        FROM trade_changes c LEFT JOIN trades t ON t.id = c.trade_pk
+        WHERE c.seq > ? ORDER BY c.seq
+    """
+
+    def sync(self, conn):
+        """Applies trade changes committed since the stored cursor. Returns the number applied."""
+        with self._lock:
+            cursor, cursor_pk = int(self.header[3]), int(self.header[4])
+            # The cursor entry must still exist unchanged, otherwise the log was pruned
+            # past us or the database was replaced; a new store always starts with a rebuild
+            row = conn.execute("SELECT trade_pk FROM trade_changes WHERE seq = ?", (cursor,)).fetchone() if cursor else None
+            if not row or row[0] != cursor_pk:
+                self.rebuild(conn)
+                return -1
+            changes = conn.execute(self.CHANGES, (cursor,)).fetchall()
+            for seq, pk, op, actual, prediction in changes:
+                if op == "epoch": continue # session boundary marker, no trade row
+                self._set(pk, encode_flags(actual, prediction) if op == "upsert" else 0)
+            if changes:
+                self.header[3] = changes[-1][0]
+                self.header[4] = changes[-1][1]
+            return len(changes)
+
+    def flags(self, start=0, stop=None):
+        """Unpacked flag nibbles for slots [start, stop) as a uint8 array."""
+        data = self.data
+        stop = len(self) if stop is None else min(stop, len(self))
+        if stop <= start: return np.zeros(0, dtype=np.uint8)
+        packed = data[start >> 1:(stop + 1) >> 1]
+        out = np.empty(len(packed) * 2, dtype=np.uint8)
+        out[0::2] = packed & 0x0F
+        out[1::2] = packed >> 4
+        offset = start & 1
+        return out[offset:offset + stop - start]
+
+    def pending(self, conn):
+        """
+        {slot: flags} for the log entries past the cursor, read through `conn` without
+        applying them (they may belong to its still-open transaction). None if the log
+        no longer covers the cursor.
+        """
+        with self._lock:
+            cursor, cursor_pk = int(self.header[3]), int(self.header[4])
+            row = conn.execute("SELECT trade_pk FROM trade_changes WHERE seq = ?", (cursor,)).fetchone() if cursor else None
+            if not row or row[0] != cursor_pk: return None
+            overlay = {}
+            for seq, pk, op, actual, prediction in conn.execute(self.CHANGES, (cursor,)):
+                if op == "epoch": continue
+                overlay[pk] = encode_flags(actual, prediction) if op == "upsert" else 0
+            return overlay
+
+    def last(self, n, conn):
+        """
+        The newest `n` results as of `conn`, oldest first: [(actual_result, ai_prediction, id)],
+        with ai_prediction None when the trade had no real prediction. Outside a
+        transaction the store is synced first; inside one (the writer training on a
+        trade it just inserted) the uncommitted changes are overlaid instead, so a
+        rollback can't leave them in the file. None if the store can't answer.
+        """
+        with self._lock:
+            if conn.in_transaction:
+                overlay = self.pending(conn)
+                if overlay is None: return None
+            else:
+                self.sync(conn)
+                overlay = {}
+            top = max([len(self)] + [pk + 1 for pk in overlay])
+            ids, flags = [], []
+            found, stop = 0, top
+            block = max(2 * n, 4096)
+            # Walk back block by block until enough results are found (gaps are deleted trades)
+            while stop > 0 and found < n:
+                start = max(0, stop - block)
+                chunk = np.zeros(stop - start, dtype=np.uint8)
+                stored = self.flags(start, stop)
+                chunk[:len(stored)] = stored
+                for pk, f in overlay.items():
+                    if start <= pk < stop: chunk[pk - start] = f
+                hits = np.flatnonzero(chunk & HAS_RESULT)[-(n - found):]
+                ids.append(hits + start)
+                flags.append(chunk[hits])
+                found += len(hits)
+                stop = start
+        if not ids: return []
+        return _decode(np.concatenate(ids[::-1]), np.concatenate(flags[::-1]))
+
+    def page(self, after, n):
+        """The first `n` results with id > `after`, in the same form as last(); for keyset scans."""
+        with self._lock:
+            start = after + 1
+            ids, flags = [], []
+            while start < len(self) and sum(len(i) for i in ids) < n:
+                stop = start + max(2 * n, 4096)
+                chunk = self.flags(start, stop)
+                hits = np.flatnonzero(chunk & HAS_RESULT)
+                ids.append(hits + start)
+                flags.append(chunk[hits])
+                start = stop
+        if not ids: return []
+        return _decode(np.concatenate(ids)[:n], np.concatenate(flags)[:n])
+
+    def count(self):
+        """Number of stored results."""
+        with self._lock:
+            return int(np.count_nonzero(self.flags() & HAS_RESULT))
+
+    def packed(self):
+        """Zero-copy view of the packed bytes (two slots per byte, low nibble first)."""
+        return self.data[:(len(self) + 1) >> 1]
+
+    def results(self, last=None):
+        """Boolean array (True = BIG) of all results in insertion order, optionally only the last N."""
+        flags = self.flags()
+        flags = flags[(flags & HAS_RESULT) != 0]
+        if last: flags = flags[-last:]
+        return (flags & RESULT_BIG) != 0
+
+    def accuracy(self, last=None):
+        """Returns (predicted, correct) over results that carry a real AI prediction."""
+        flags = self.flags()
+        flags = flags[(flags & HAS_PREDICTION) != 0]
+        if last: flags = flags[-last:]
+        correct = ((flags & RESULT_BIG) != 0) == ((flags & PREDICTED_BIG) != 0)
+        return int(len(flags)), int(correct.sum())
+
+    def flush(self):
+        self.header.flush()
+        if isinstance(self.data, np.memmap): self.data.flush()
@@ -1,8 +1,19 @@
 import sqlite3
 import os
 import json
-from datetime import datetime
-from utils.db_manager import get_db_connection
+import threading
+import time
+from datetime import datetime, timedelta
+from utils.db_manager import get_db_connection, get_data_revision, get_trade_frame, register_hot_query, CURRENT_EPOCH, IST, TIMESTAMP_FORMAT
+from utils.rolling_stats import RollingStats, TimeBucketedAccuracy
+
+# Hot-path queries (checked by db_manager.check_query_plans)
+# These two stay on SQLite rather than the trade frame: they need trade_id (undo
+# removes rows by id) and the raw ai_prediction (INITIAL is skipped, SKIP/RISKY
+# counts as a miss), which the frame's BIG/SMALL codes drop, and they order by
+# timestamp while the frame is in id order. Each is one LIMIT 30-50 index read.
+ROLLING_WINDOW = register_hot_query("rolling_stats", f"SELECT trade_id, ai_prediction, actual_result, signal_source FROM trades WHERE epoch = {CURRENT_EPOCH} ORDER BY timestamp DESC LIMIT ?", (50,))
+RECENT_RESULTS = register_hot_query("recent_results", f"SELECT ai_prediction, actual_result, signal_source FROM trades WHERE epoch = {CURRENT_EPOCH} ORDER BY timestamp DESC LIMIT ?", (50,))
 
 class MultiManagerSystem:
     def __init__(self, model_a, db_path):
@@ -12,12 +23,96 @@ class MultiManagerSystem:
         self.max_loss_streak = 5
         self.win_zone_window = 20
         self.rolling_window = 10
+        self.dragon_window = 15
+        self.cid_pattern_lengths = [5, 4, 3] # longest first
+        # CID loss-rate thresholds when 7-day CID accuracy is >70%, >60%, otherwise
+        self.cid_thresholds = (0.55, 0.60, 0.70)
+        # Master selector: skip below this win rate, CID override / dragon priority cut-offs
+        self.skip_win_rate = 45.0
+        self.cid_override_confidence = 75
+        self.dragon_priority_streak = 5
+        # O(1) live-sequence statistics; loaded lazily, then maintained per result
+        self.rolling = RollingStats(capacity=30, win_window=self.win_zone_window, vol_window=self.rolling_window,
+                                    streak_window=self.rolling_window, dragon_window=self.dragon_window)
+        self._stats_lock = threading.Lock()
+        # 7-day CID signal accuracy in hourly buckets (feeds adaptive_threshold)
+        self.cid_stats = TimeBucketedAccuracy(horizon_seconds=7 * 86400, bucket_seconds=3600)
+
+    def _load_rolling(self):
+        stats = self.rolling
+        with self._stats_lock:
+            conn = get_db_connection()
+            try:
+                # Revision and rows from one read snapshot, so the rows are exactly that revision
+                conn.execute("BEGIN")
+                revision = get_data_revision(conn)
+                rows = conn.execute(ROLLING_WINDOW, (stats.capacity,)).fetchall()
+                stats.load([tuple(r) for r in rows], revision)
+            finally:
+                conn.close()
+
+    def get_rolling_stats(self):
+        """Returns the rolling statistics, loading them on first use (sync() catches them up)."""
+        if not self.rolling.loaded:
+            self._load_rolling()
+        return self.rolling
+
+    def sync(self):
+        """
+        Reloads the rolling statistics (one small query) and drops the CID accuracy
+        if any worker changed the trades since they were loaded, and returns the
+        data revision they reflect. Results fed in through record_result(trade,
+        revision) need no reload, and the revision only moves once the statistics
+        include the new trade, so it is a safe signal cache key.
+        """
+        stats = self.rolling
+        revision = get_data_revision()
+        if not stats.loaded or stats.version != revision:
+            self._load_rolling()
+        cid = self.cid_stats
+        if cid.loaded and cid.version != revision:
+            cid.invalidate()
+        return stats.version
+
+    def record_result(self, trade_data, revision=None):
+        """
+        Feeds a committed trade into the rolling and CID statistics. `revision` is the data
+        revision its write produced (db_manager.get_data_revision on the writer's
+        conn): the trade is applied only on top of the revision just before it;
+        if the statistics were already reloaded with it, or missed another
+        write, sync() takes care of them instead.
+        """
+        stats = self.rolling
+        with self._stats_lock:
+            cid = self.cid_stats
+            if cid.loaded and (revision is None or cid.version == revision - 1):
+                if "CID" in trade_data["signal_source"] and trade_data.get("actual_result"):
+                    cid.add(time.time(), trade_data["ai_prediction"] == trade_data["actual_result"])
+                if revision is not None: cid.version = revision
+            if not stats.loaded: return
+            if revision is not None:
+                if stats.version != revision - 1: return
+                stats.version = revision
+            if not any(r.trade_id == trade_data["trade_id"] for r in stats.rows):
+                stats.push(trade_data["trade_id"], trade_data["ai_prediction"], trade_data.get("actual_result"), trade_data["signal_source"])
+
+    def forget_result(self, trade_id):
+        """Reverses a deleted trade (undo)."""
+        stats = self.rolling
+        with self._stats_lock:
+            if not stats.loaded: return
+            stats.remove(trade_id)
+
+    def reset_session(self):
+        """All live trades were archived: the live sequence starts empty."""
+        with self._stats_lock:
+            self.rolling.load([], self.rolling.version)
 
     def get_recent_results(self, limit=50):
         conn = get_db_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT ai_prediction, actual_result, signal_source FROM trades WHERE is_archived = 0 ORDER BY timestamp DESC LIMIT ?", (limit,))
+            cursor.execute(RECENT_RESULTS, (limit,))
             rows = cursor.fetchall()
             return [tuple(row) for row in rows]
         finally:
@@ -27,19 +122,7 @@ class MultiManagerSystem:
         """
         Analyzes the current loss streak to trigger auto-adaptation.
         """
-        results = self.get_recent_results(10)
-        if not results: return 0
-        
-        streak = 0
-        # Results are ordered by timestamp DESC, so first item is most recent
-        for pred, actual, source in results:
-            if pred == "INITIAL" or actual is None:
-                continue
-            if pred != actual:
-                streak += 1
-            else:
-                break
-        return streak
+        return self.get_rolling_stats().loss_streak()
 
     def main_engine(self, prediction_data):
         """Engine 1: Normal Logic (Base AI Prediction)"""
@@ -50,28 +133,30 @@ class MultiManagerSystem:
         """
         Engine 2: Enhanced CID Scanner (Reverse Logic / Pattern Trap Detector)
         """
-        results = self.get_recent_results(30)
+        results = self.get_rolling_stats().recent(30)
         if not results: 
             prediction_data["cid_engine_pred"] = prediction_data["prediction"]
             prediction_data["cid_trap_detected"] = False
             prediction_data["cid_confidence"] = 0
             return prediction_data
         
-        recent_data = ["B" if r[1] == "BIG" else "S" for r in reversed(results)]
-        error_matrix = self.model_a.patterns.get("error_matrix", {})
+        recent_data = ["B" if r.actual == "BIG" else "S" for r in reversed(results)]
+        error_matrix = self.model_a.patterns["error_matrix"]
         
         # Adaptive threshold based on performance
         threshold = self.adaptive_threshold()
         
-        for pattern_length in [5, 4, 3]:
-            if len(recent_data) >= pattern_length:
+        # Single backward walk over the error-matrix trie, longest context first
+        matches = dict(error_matrix.suffix_matches(recent_data, max(self.cid_pattern_lengths)))
+        for pattern_length in self.cid_pattern_lengths:
+            if pattern_length in matches:
                 pattern = "".join(recent_data[-pattern_length:])
-                pattern_stats = error_matrix.get(pattern, {"wins": 0, "losses": 0})
+                wins, losses = matches[pattern_length]
                 
-                total_occurrences = pattern_stats["wins"] + pattern_stats["losses"]
+                total_occurrences = wins + losses
                 
                 if total_occurrences >= 5:
-                    loss_rate = pattern_stats["losses"] / total_occurrences
+                    loss_rate = losses / total_occurrences
                     
                     if loss_rate > threshold:
                         original = prediction_data["prediction"]
@@ -83,7 +168,7 @@ class MultiManagerSystem:
                         prediction_data["cid_trap_detected"] = True
                         prediction_data["cid_confidence"] = round(confidence, 1)
                         prediction_data["cid_pattern_length"] = pattern_length
-                        prediction_data["cid_occurrences"] = total_occurrences
+                        prediction_data["cid_occurrences"] = round(total_occurrences, 1)
                         prediction_data["cid_loss_rate"] = round(loss_rate * 100, 1)
                         
                         validation = self.multi_layer_validation(pattern, original)
@@ -100,23 +185,18 @@ class MultiManagerSystem:
     def multi_layer_validation(self, pattern, prediction):
         validations = []
         error_matrix = self.model_a.patterns.get("error_matrix", {})
-        pattern_stats = error_matrix.get(pattern, {"wins": 0, "losses": 0})
+        wins, losses = error_matrix.get(pattern, (0, 0))
         
-        if pattern_stats["losses"] > pattern_stats["wins"]:
+        if losses > wins:
             validations.append({"layer": "error_matrix", "passed": True})
         
         correction = self.model_a.get_correction(pattern)
         if correction and correction["reliability"] > 0.6:
             validations.append({"layer": "correction_table", "passed": True})
         
-        results = self.get_recent_results(10)
-        if len(results) >= 5:
-            changes = 0
-            for i in range(len(results) - 1):
-                if results[i][1] != results[i+1][1]:
-                    changes += 1
-            
-            volatility = changes / (len(results) - 1)
+        changes, pairs = self.get_rolling_stats().volatility()
+        if pairs >= 4:
+            volatility = changes / pairs
             if volatility > 0.5:
                 validations.append({"layer": "volatility", "passed": True})
         
@@ -129,59 +209,52 @@ class MultiManagerSystem:
             "details": validations
         }
 
+    def _load_cid_stats(self):
+        # Timestamps are IST strings, so the cutoff must be computed in IST too
+        cutoff = (datetime.now(tz=IST) - timedelta(days=7)).strftime(TIMESTAMP_FORMAT)
+        frame = get_trade_frame()
+        with frame.locked():
+            # The cursor is the data revision the timeline reflects
+            revision = frame.cursor
+            times, correct = frame.timeline(live=False, since=cutoff, source="CID")
+        self.cid_stats.load(zip(times.tolist(), correct.tolist()), revision)
+
     def track_cid_performance(self):
-        conn = get_db_connection()
+        """7-day CID accuracy from the in-memory bucketed aggregate (loaded once, then updated per result)."""
         try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN ai_prediction = actual_result THEN 1 ELSE 0 END) as correct
-                FROM trades 
-                WHERE signal_source LIKE '%CID%' 
-                AND actual_result IS NOT NULL
-                AND timestamp > datetime('now', '-7 days')
-            """)
-            
-            row = cursor.fetchone()
-            if row and row[0] > 0:
-                accuracy = (row[1] / row[0]) * 100
+            stats = self.cid_stats
+            if not stats.loaded:
+                with self._stats_lock:
+                    self._load_cid_stats()
+            total, correct = stats.snapshot(time.time())
+            if total > 0:
+                accuracy = (correct / total) * 100
                 return {
                     "cid_accuracy": round(accuracy, 1),
-                    "cid_total_signals": row[0],
-                    "cid_correct_signals": row[1]
+                    "cid_total_signals": total,
+                    "cid_correct_signals": correct
                 }
         except Exception as e:
             print(f"Error tracking CID performance: {e}")
-        finally:
-            conn.close()
         
         return {"cid_accuracy": 0, "cid_total_signals": 0, "cid_correct_signals": 0}
 
     def adaptive_threshold(self):
         perf = self.track_cid_performance()
+        high, mid, low = self.cid_thresholds
         if perf["cid_accuracy"] > 70:
-            return 0.55
+            return high
         elif perf["cid_accuracy"] > 60:
-            return 0.60
+            return mid
         else:
-            return 0.70
+            return low
 
     def trend_follower_engine(self, prediction_data):
         """Engine 3: Trend Follower (Dragon / Streak Detector)"""
-        results = self.get_recent_results(15)
-        if not results: 
+        last_val, streak = self.get_rolling_stats().dragon()
+        if not streak: 
             prediction_data["trend_engine_pred"] = prediction_data["prediction"]
             return prediction_data
-            
-        recent_results = [r[1] for r in results]
-        streak = 1
-        last_val = recent_results[0]
-        for i in range(1, len(recent_results)):
-            if recent_results[i] == last_val:
-                streak += 1
-            else:
-                break
         
         if streak >= 3:
             prediction_data["trend_engine_pred"] = last_val
@@ -192,16 +265,17 @@ class MultiManagerSystem:
             
         return prediction_data
 
-    def calculate_volatility(self, results):
-        if len(results) < 10: return 20, "STABLE"
-        
-        changes = 0
-        recent_results = [r[1] for r in results[:10]]
-        for i in range(len(recent_results) - 1):
-            if recent_results[i] != recent_results[i+1]:
-                changes += 1
+    def calculate_volatility(self, results=None):
+        """Volatility over the last 10 results; uses the rolling counters unless `results` is given."""
+        if results is None:
+            changes, pairs = self.get_rolling_stats().volatility()
+        else:
+            recent_results = [r[1] for r in results[:10]]
+            pairs = len(recent_results) - 1
+            changes = sum(1 for i in range(pairs) if recent_results[i] != recent_results[i+1])
+        if pairs < 9: return 20, "STABLE"
         
-        volatility_score = (changes / (len(recent_results) - 1)) * 100
+        volatility_score = (changes / pairs) * 100
         
         if volatility_score > 70:
             status = "EXTREME"
@@ -218,26 +292,21 @@ class MultiManagerSystem:
         """
         Enhanced Master Selector with Error Analysis and Auto-Adaptation.
         """
-        results = self.get_recent_results(20)
-        vol_score, vol_status = self.calculate_volatility(results)
+        stats = self.get_rolling_stats()
+        vol_score, vol_status = self.calculate_volatility()
         signal["volatility_score"] = vol_score
         signal["volatility_status"] = vol_status
         
         # Error Analysis: Check for loss streaks
-        loss_streak = self.analyze_loss_streak()
+        loss_streak = stats.loss_streak()
         signal["loss_streak"] = loss_streak
         
-        completed_trades = [r for r in results if r[0] != "INITIAL" and r[1] is not None]
-        if not completed_trades:
-            win_rate = 100.0
-        else:
-            wins = sum(1 for pred, actual, source in completed_trades if pred == actual)
-            win_rate = (wins / len(completed_trades)) * 100
+        win_rate = stats.win_rate()
             
         signal["current_win_rate"] = round(win_rate, 1)
         
         # Auto-Adaptation: If losing streak > 3, force SKIP or switch mode
-        if loss_streak >= 3 or win_rate < 45.0:
+        if loss_streak >= self.loss_threshold or win_rate < self.skip_win_rate:
             signal["prediction"] = "SKIP/RISKY"
             signal["source"] = f"Master Selector (Loss Streak: {loss_streak})"
             signal["confidence"] = win_rate
@@ -257,7 +326,7 @@ class MultiManagerSystem:
             signal["source"] = "Master Selector (Consensus: SMALL)"
         
         # CID Scanner override with high confidence
-        if signal.get("cid_trap_detected") and signal.get("cid_confidence", 0) > 75:
+        if signal.get("cid_trap_detected") and signal.get("cid_confidence", 0) > self.cid_override_confidence:
             validation = signal.get("cid_validation", {})
             if validation.get("validated", False):
                 signal["prediction"] = signal["cid_engine_pred"]
@@ -266,7 +335,7 @@ class MultiManagerSystem:
                 signal["risk_alert"] = f"CID সতর্কতা: প্যাটার্ন ট্র্যাপ সনাক্ত ({signal['cid_loss_rate']}% ক্ষতি হার)"
         
         # Dragon Priority
-        if signal.get("dragon_streak", 0) >= 5:
+        if signal.get("dragon_streak", 0) >= self.dragon_priority_streak:
             signal["prediction"] = signal["trend_engine_pred"]
             signal["source"] = f"Master Selector (Dragon Priority {signal['dragon_streak']}x)"
             signal["confidence"] = min(99.0, 85.0 + signal["dragon_streak"])
@@ -274,6 +343,7 @@ class MultiManagerSystem:
         return signal
 
     def process_signal(self, raw_signal):
+        self.sync()
         signal = self.main_engine(raw_signal)
         signal = self.cid_scanner_engine(signal)
         signal = self.trend_follower_engine(signal)
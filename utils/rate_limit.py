@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+class Throttled(Exception):
+    """A call was refused; `retry_after` is the suggested wait in seconds."""
+    def __init__(self, retry_after, reason):
+        super().__init__(f"Too many requests ({reason}).")
+        self.retry_after = retry_after
+        self.reason = reason
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`; refilled lazily on access."""
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        return self.tokens
+
+    def wait_time(self, now):
+        """Seconds until one token is available (0 if one is available now)."""
+        missing = 1.0 - self.refill(now)
+        return max(0.0, missing / self.rate) if missing > 0 else 0.0
+
+class RateLimiter:
+    """
+    Per-endpoint backpressure for write/training calls, applied to two keys at once:
+    the caller's session and the caller's user (user limits are the session limits
+    times `user_factor`, since one user may run several sessions).
+    Each endpoint spec has a token bucket (`rate` calls/s, `burst`) and a
+    concurrency limit (`concurrency` calls in flight) with a bounded wait queue
+    (`queue` callers, each waiting at most `wait` seconds). A zero rate or
+    concurrency disables that part. Limits are per process.
+    """
+    def __init__(self, limits, user_factor=3, max_keys=10000):
+        self.limits = limits
+        self.user_factor = user_factor
+        self.max_keys = max_keys
+        self._buckets = OrderedDict() # (endpoint, key) -> TokenBucket, least recently used first
+        self._inflight = {}           # (endpoint, key) -> [running, waiting]
+        self._cond = threading.Condition()
+        self.stats = {}
+
+    def _scaled(self, spec, scope, name):
+        value = spec.get(name, 0)
+        return value * self.user_factor if scope == "user" else value
+
+    def _bucket(self, endpoint, scope, key, spec, now):
+        bucket_key = (endpoint, key)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = TokenBucket(self._scaled(spec, scope, "rate"), self._scaled(spec, scope, "burst") or 1, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(bucket_key)
+        return bucket
+
+    def _count(self, endpoint, name):
+        stats = self.stats.setdefault(endpoint, {"allowed": 0, "throttled": 0, "rate_limited": 0, "concurrency_limited": 0, "queued": 0})
+        stats[name] += 1
+
+    def _reject(self, endpoint, name, retry_after):
+        self._count(endpoint, "throttled")
+        self._count(endpoint, name)
+        raise Throttled(retry_after, name.replace("_", " "))
+
+    def _has_room(self, endpoint, spec, keys):
+        return all(self._inflight.get((endpoint, key), (0, 0))[0] < self._scaled(spec, scope, "concurrency") for scope, key in keys)
+
+    def _rate_buckets(self, endpoint, spec, keys, now):
+        if not spec.get("rate"): return []
+        return [self._bucket(endpoint, scope, key, spec, now) for scope, key in keys]
+
+    def _check_rate(self, endpoint, spec, keys):
+        now = time.monotonic()
+        buckets = self._rate_buckets(endpoint, spec, keys, now)
+        retry_after = max([b.wait_time(now) for b in buckets] + [0.0])
+        if retry_after > 0:
+            self._reject(endpoint, "rate_limited", retry_after)
+
+    @contextmanager
+    def limit(self, endpoint, session_key, user_key):
+        """Runs the body within the endpoint's limits, or raises Throttled."""
+        spec = self.limits.get(endpoint)
+        if not spec:
+            yield
+            return
+        keys = (("session", session_key), ("user", user_key))
+        with self._cond:
+            # Token buckets: checked first, but only spent once the call is admitted,
+            # so a call refused for concurrency costs the caller nothing
+            self._check_rate(endpoint, spec, keys)
+
+            # Concurrency: run now, wait in a bounded queue, or refuse
+            limited = spec.get("concurrency", 0) > 0
+            if limited and not self._has_room(endpoint, spec, keys):
+                slots = [self._inflight.setdefault((endpoint, key), [0, 0]) for _, key in keys]
+                if any(slot[1] >= self._scaled(spec, scope, "queue") for slot, (scope, _) in zip(slots, keys)):
+                    self._release(endpoint, keys, 0)
+                    self._reject(endpoint, "concurrency_limited", 1.0)
+                self._count(endpoint, "queued")
+                for slot in slots: slot[1] += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self._has_room(endpoint, spec, keys), timeout=spec.get("wait", 0))
+                finally:
+                    for slot in slots: slot[1] -= 1
+                if not admitted:
+                    self._release(endpoint, keys, 0)
+                    self._reject(endpoint, "concurrency_limited", max(1.0, spec.get("wait", 0)))
+                # Other callers may have spent the tokens while this one waited
+                try:
+                    self._check_rate(endpoint, spec, keys)
+                except Throttled:
+                    self._release(endpoint, keys, 0)
+                    raise
+            # Both keys must have a token before either is spent
+            for b in self._rate_buckets(endpoint, spec, keys, time.monotonic()): b.tokens -= 1
+            if limited:
+                for _, key in keys:
+                    self._inflight.setdefault((endpoint, key), [0, 0])[0] += 1
+            self._count(endpoint, "allowed")
+        try:
+            yield
+        finally:
+            if limited:
+                with self._cond:
+                    self._release(endpoint, keys, 1)
+                    self._cond.notify_all()
+
+    def _release(self, endpoint, keys, running):
+        for _, key in keys:
+            slot = self._inflight.get((endpoint, key))
+            if slot is None: continue
+            slot[0] -= running
+            if slot == [0, 0]: del self._inflight[(endpoint, key)]
+
+    def throttled_total(self):
+        return sum(s["throttled"] for s in self.stats.values())
@@ -0,0 +1,195 @@
+from collections import deque, namedtuple
+
+Row = namedtuple("Row", ["trade_id", "prediction", "actual", "source", "loss_run", "dragon_run"])
+
+def _skipped(row):
+    # Bulk/initial entries and pending trades never count as wins or losses
+    return row.prediction == "INITIAL" or row.actual is None
+
+class RollingStats:
+    """
+    Rolling statistics for one live result sequence (newest first).
+    Loss streak, windowed win rate, alternation count (volatility) and dragon
+    streak are kept as counters that are updated in O(1) when a result is pushed
+    and reversed in O(1) when the newest result is undone.
+    """
+    def __init__(self, capacity=30, win_window=20, vol_window=10, streak_window=10, dragon_window=15):
+        self.capacity = capacity
+        self.win_window = win_window
+        self.vol_window = vol_window
+        self.streak_window = streak_window
+        self.dragon_window = dragon_window
+        self.loaded = False
+        self.version = None
+        self.reset()
+
+    def reset(self):
+        self.rows = deque()
+        self.complete = True # True when `rows` holds the whole live sequence
+        self.completed = 0   # non-skipped rows in the win-rate window
+        self.wins = 0
+        self.changes = 0     # result flips between adjacent rows in the volatility window
+        self.nonskip = 0     # non-skipped rows in the loss-streak window
+
+    def load(self, rows, version=None, complete=None):
+        """Rebuilds from (trade_id, prediction, actual, source) rows, newest first."""
+        self.reset()
+        for trade_id, prediction, actual, source in reversed(rows):
+            self.push(trade_id, prediction, actual, source)
+        self.complete = len(rows) < self.capacity if complete is None else complete
+        self.loaded = True
+        self.version = version
+
+    def invalidate(self):
+        self.loaded = False
+
+    def _win_add(self, row, sign=1):
+        if _skipped(row): return
+        self.completed += sign
+        if row.prediction == row.actual:
+            self.wins += sign
+
+    def push(self, trade_id, prediction, actual, source):
+        rows = self.rows
+        prev = rows[0] if rows else None
+        row = Row(trade_id, prediction, actual, source, 0, 1)
+        if not _skipped(row):
+            loss_run = (prev.loss_run if prev else 0) + 1 if prediction != actual else 0
+        else:
+            loss_run = prev.loss_run if prev else 0
+        dragon_run = prev.dragon_run + 1 if prev and prev.actual == actual else 1
+        row = row._replace(loss_run=loss_run, dragon_run=dragon_run)
+
+        n = len(rows)
+        if n >= self.win_window: self._win_add(rows[self.win_window - 1], -1)
+        self._win_add(row)
+        if n >= self.streak_window: self.nonskip -= not _skipped(rows[self.streak_window - 1])
+        self.nonskip += not _skipped(row)
+        if n >= self.vol_window: self.changes -= rows[self.vol_window - 2].actual != rows[self.vol_window - 1].actual
+        if prev: self.changes += prev.actual != actual
+
+        rows.appendleft(row)
+        if len(rows) > self.capacity:
+            rows.pop()
+            self.complete = False
+
+    def pop_newest(self):
+        """Reverses the last push."""
+        rows = self.rows
+        row = rows.popleft()
+        n = len(rows)
+        self._win_add(row, -1)
+        if n >= self.win_window: self._win_add(rows[self.win_window - 1])
+        self.nonskip -= not _skipped(row)
+        if n >= self.streak_window: self.nonskip += not _skipped(rows[self.streak_window - 1])
+        if rows: self.changes -= rows[0].actual != row.actual
+        if n >= self.vol_window: self.changes += rows[self.vol_window - 2].actual != rows[self.vol_window - 1].actual
+        # Without older history the windows can no longer be refilled
+        if not self.complete and n < max(self.win_window, self.vol_window, self.dragon_window):
+            self.loaded = False
+        return row
+
+    def remove(self, trade_id):
+        """Undo support: O(1) for the newest result, otherwise forces a reload."""
+        if self.rows and self.rows[0].trade_id == trade_id:
+            self.pop_newest()
+        elif any(r.trade_id == trade_id for r in self.rows):
+            self.loaded = False
+
+    def recent(self, n):
+        return [self.rows[i] for i in range(min(n, len(self.rows)))]
+
+    def loss_streak(self):
+        if not self.rows: return 0
+        return min(self.rows[0].loss_run, self.nonskip)
+
+    def win_rate(self):
+        if not self.completed: return 100.0
+        return (self.wins / self.completed) * 100
+
+    def volatility(self):
+        """Returns (flips, adjacent pairs) over the volatility window."""
+        return self.changes, max(min(len(self.rows), self.vol_window) - 1, 0)
+
+    def dragon(self):
+        """Returns (last actual result, streak length capped at the dragon window)."""
+        if not self.rows: return None, 0
+        return self.rows[0].actual, min(self.rows[0].dragon_run, self.dragon_window)
+
+class TimeBucketedAccuracy:
+    """
+    Rolling correct/total counters over a time horizon (default 7 days), kept in
+    fixed-width time buckets so adding a result is O(1) and expiry only drops
+    whole buckets from the old end.
+    """
+    def __init__(self, horizon_seconds=7 * 86400, bucket_seconds=3600):
+        self.horizon = horizon_seconds
+        self.bucket_seconds = bucket_seconds
+        self.loaded = False
+        self.version = None
+        self.reset()
+
+    def reset(self):
+        self.buckets = deque() # [bucket_start, total, correct], oldest first
+        self.total = 0
+        self.correct = 0
+
+    def load(self, results, version=None):
+        """Rebuilds from (epoch_seconds, is_correct) pairs."""
+        self.reset()
+        for ts, correct in sorted(results):
+            self.add(ts, correct)
+        self.loaded = True
+        self.version = version
+
+    def invalidate(self):
+        self.loaded = False
+
+    def add(self, ts, correct, sign=1):
+        start = int(ts // self.bucket_seconds) * self.bucket_seconds
+        buckets = self.buckets
+        if buckets and buckets[-1][0] == start:
+            bucket = buckets[-1]
+        elif not buckets or buckets[-1][0] < start:
+            bucket = [start, 0, 0]
+            buckets.append(bucket)
+        else:
+            # Out-of-order timestamp (rare): find or insert its bucket
+            bucket = next((b for b in buckets if b[0] == start), None)
+            if bucket is None:
+                bucket = [start, 0, 0]
+                idx = next(i for i, b in enumerate(buckets) if b[0] > start)
+                buckets.insert(idx, bucket)
+        bucket[1] += sign
+        bucket[2] += sign if correct else 0
+        self.total += sign
+        self.correct += sign if correct else 0
+
+    def expire(self, now):
+        cutoff = now - self.horizon
+        buckets = self.buckets
+        while buckets and buckets[0][0] + self.bucket_seconds <= cutoff:
+            _, total, correct = buckets.popleft()
+            self.total -= total
+            self.correct -= correct
+
+    def snapshot(self, now):
+        """Returns (total, correct) within the horizon ending at `now`."""
+        self.expire(now)
+        return self.total, self.correct
+
+class LatencyWindow:
+    """Last `size` latency samples (ms) for cheap recent-percentile reporting."""
+    def __init__(self, size=1024):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def record(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+
+    def percentile(self, p):
+        samples = sorted(self.samples)
+        if not samples: return 0.0
+        idx = min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))
+        return round(samples[idx], 2)
@@ -0,0 +1,254 @@
+import math
+import os
+import struct
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+import numpy as np
+
+try:
+    from PIL import Image # Optional: faster decoding and JPEG support
+except ImportError:
+    Image = None
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Largest image decoded (a 1440x3200 phone screenshot is 4.6M): a few KB of
+# compressed zeros can otherwise claim gigabytes once inflated
+MAX_PIXELS = 16 * 1024 * 1024
+# Unfiltering works in row tiles: the diagonal buffer stays under this many int16
+# values (32 MB) and the number of diagonal steps under the limit, whatever the
+# image's aspect ratio
+UNFILTER_BUDGET = 16 * 1024 * 1024
+MAX_UNFILTER_STEPS = 250000
+# Hue ranges (degrees) for the result badges: BIG is orange/red, SMALL is blue
+DEFAULT_PALETTE = {"B": [(0, 45), (330, 360)], "S": [(190, 250)]}
+
+class ScreenshotBusy(Exception):
+    """Raised when the image pool already has its maximum number of pending jobs."""
+
+def decode_png(data):
+    """Decodes an 8-bit PNG (gray, RGB, RGBA, palette) to an (H, W, 3) uint8 array without external libraries."""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Unsupported image format (expected PNG)")
+    pos = len(PNG_SIGNATURE)
+    idat = []
+    palette = None
+    header = None
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if ctype == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif ctype == b"PLTE":
+            palette = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, 3)
+        elif ctype == b"IDAT":
+            idat.append(chunk)
+        elif ctype == b"IEND":
+            break
+    if not header:
+        raise ValueError("Corrupt PNG (missing header)")
+    width, height, depth, color_type, _, _, interlace = header
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}.get(color_type)
+    if depth != 8 or interlace or channels is None:
+        raise ValueError("Unsupported PNG (only 8-bit, non-interlaced images)")
+    if not width or not height or width * height > MAX_PIXELS:
+        raise ValueError(f"Image too large ({width}x{height})")
+    _tile_height(height, width, channels) # refuse awkward shapes before inflating
+    stride = width * channels
+    size = height * (stride + 1)
+    # Inflate no more than the header says the image needs
+    try:
+        raw = zlib.decompressobj().decompress(b"".join(idat), size)
+    except zlib.error as e:
+        raise ValueError(f"Corrupt PNG ({e})")
+    if len(raw) < size:
+        raise ValueError("Corrupt PNG (truncated image data)")
+    raw = np.frombuffer(raw, dtype=np.uint8).reshape(height, stride + 1)
+    pixels = _unfilter(raw[:, 0], raw[:, 1:], channels)
+    pixels = pixels.reshape(height, width, channels)
+
+    if color_type == 3:
+        if palette is None: raise ValueError("Corrupt PNG (missing palette)")
+        return palette[pixels[:, :, 0]]
+    if channels in (1, 2):
+        return np.repeat(pixels[:, :, :1], 3, axis=2)
+    return pixels[:, :, :3]
+
+def _tile_height(height, width, bpp):
+    """
+    Rows unfiltered per tile: the largest that keeps the (tile + width) x tile
+    anti-diagonal buffer within UNFILTER_BUDGET. Raises ValueError when an image's
+    shape would need more than that, or more than MAX_UNFILTER_STEPS diagonals.
+    """
+    cells = UNFILTER_BUDGET // bpp
+    # (tile + 1) * (tile + width + 1) <= cells
+    tile = min(height, (math.isqrt(width * width + 4 * cells) - width) // 2 - 1)
+    if tile < 1 or -(-height // tile) * (tile + width) > MAX_UNFILTER_STEPS:
+        raise ValueError(f"Image shape not supported ({width}x{height})")
+    return tile
+
+def _unfilter(filters, rows, bpp):
+    """
+    Reverses the PNG row filters. A byte depends on the decoded bytes to its left,
+    above and above-left, so pixels on one anti-diagonal (x + y = const) are
+    independent: each step decodes a whole diagonal with array operations, for
+    every filter type at once. Rows are decoded in tiles of _tile_height rows;
+    diagonal d of a tile is stored as skew[d], indexed by row, with row 0 holding
+    the last row of the previous tile and zero padding standing in for the
+    neighbours outside the image.
+    """
+    height = rows.shape[0]
+    width = rows.shape[1] // bpp
+    tile = _tile_height(height, width, bpp)
+    ftype = np.asarray(filters, dtype=np.int16).reshape(-1, 1)
+    if (ftype > 4).any():
+        raise ValueError("Corrupt PNG (unknown row filter)")
+    out = np.empty_like(rows)
+    skew = np.zeros((tile + width + 1, tile + 1, bpp), dtype=np.int16)
+    for top in range(0, height, tile):
+        count = min(tile, height - top)
+        # Pixel (y, x) of the tile lives at skew[x + y + 2, y + 1]
+        skew[1:width + 1, 0] = out[top - 1].reshape(width, bpp) if top else 0
+        for y in range(count):
+            skew[y + 2:y + 2 + width, y + 1] = rows[top + y].reshape(width, bpp)
+        ftile = ftype[top:top + count]
+        for d in range(2, count + width + 1):
+            lo, hi = max(1, d - width), min(count, d - 1) + 1
+            a = skew[d - 1, lo:hi]         # left
+            b = skew[d - 1, lo - 1:hi - 1] # up
+            c = skew[d - 2, lo - 1:hi - 1] # up-left
+            f = ftile[lo - 1:hi - 1]
+            pred = np.where(f == 1, a, np.where(f == 2, b, np.where(f == 3, (a + b) >> 1, 0)))
+            paeth = f == 4
+            if paeth.any():
+                pa, pb, pc = np.abs(b - c), np.abs(a - c), np.abs(a + b - 2 * c)
+                pred = np.where(paeth, np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c)), pred)
+            cur = skew[d, lo:hi]
+            cur += pred
+            cur &= 0xFF
+        for y in range(count):
+            out[top + y] = skew[y + 2:y + 2 + width, y + 1].reshape(-1)
+    return out
+
+def decode_image(data):
+    if Image is not None:
+        import io
+        with Image.open(io.BytesIO(data)) as img:
+            # The header is read lazily: check the size before any pixel data is decoded
+            if img.width * img.height > MAX_PIXELS:
+                raise ValueError(f"Image too large ({img.width}x{img.height})")
+            return np.asarray(img.convert("RGB"))
+    return decode_png(data)
+
+def classify_pixels(rgb, palette=None, min_saturation=0.45, min_value=0.35):
+    """Returns an int8 label map: 0 = background, 1 = BIG colour, 2 = SMALL colour."""
+    palette = palette or DEFAULT_PALETTE
+    arr = rgb.astype(np.float32) / 255.0
+    cmax = arr.max(axis=2)
+    delta = cmax - arr.min(axis=2)
+    sat = np.where(cmax > 0, delta / np.maximum(cmax, 1e-6), 0)
+    r, g, b = arr[:, :, 0], arr[:, :, 1], arr[:, :, 2]
+    safe = np.maximum(delta, 1e-6)
+    hue = np.where(cmax == r, ((g - b) / safe) % 6, np.where(cmax == g, (b - r) / safe + 2, (r - g) / safe + 4)) * 60
+    vivid = (sat >= min_saturation) & (cmax >= min_value) & (delta > 0)
+
+    labels = np.zeros(hue.shape, dtype=np.int8)
+    for code, key in ((1, "B"), (2, "S")):
+        mask = np.zeros(hue.shape, dtype=bool)
+        for lo, hi in palette[key]:
+            mask |= (hue >= lo) & (hue < hi)
+        labels[vivid & mask] = code
+    return labels
+
+def _runs(active, min_len):
+    """[start, end) index runs of True values at least `min_len` long."""
+    padded = np.concatenate(([False], active, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return [(s, e) for s, e in zip(edges[::2], edges[1::2]) if e - s >= min_len]
+
+def detect_cells(labels, min_fill=0.25):
+    """
+    Grid detection: horizontal bands of coloured pixels are result rows; inside each
+    band, column runs are cells. Returns (top, bottom, left, right, label) newest first
+    (top-to-bottom, left-to-right). Banners and specks are dropped by size.
+    """
+    height, width = labels.shape
+    colored = labels > 0
+    row_hits = colored.sum(axis=1)
+    min_px = max(2, width // 200)
+    cells = []
+    for top, bottom in _runs(row_hits >= min_px, max(3, height // 400)):
+        band = colored[top:bottom]
+        for left, right in _runs(band.any(axis=0), max(3, width // 200)):
+            block = labels[top:bottom, left:right]
+            big = int((block == 1).sum())
+            small = int((block == 2).sum())
+            if (big + small) < block.size * min_fill: continue
+            cells.append((top, bottom, left, right, "B" if big >= small else "S"))
+    if not cells: return []
+
+    # Keep cells close to the typical cell size (drops headers, buttons and noise)
+    widths = np.array([c[3] - c[2] for c in cells])
+    heights = np.array([c[1] - c[0] for c in cells])
+    mw, mh = np.median(widths), np.median(heights)
+    return [c for c, w, h in zip(cells, widths, heights) if 0.4 * mw <= w <= 2.5 * mw and 0.4 * mh <= h <= 2.5 * mh]
+
+def read_results(data, palette=None, max_side=900):
+    """Image bytes -> ["B"/"S", ...] newest first. Runs inside a pool worker."""
+    rgb = decode_image(data)
+    # Downsample large screenshots by striding; badges stay many pixels wide
+    step = max(1, int(np.ceil(max(rgb.shape[:2]) / max_side)))
+    if step > 1: rgb = rgb[::step, ::step]
+    return [c[4] for c in detect_cells(classify_pixels(rgb, palette))]
+
+class ScreenshotReader:
+    """
+    Bounded process pool for screenshot decoding/classification so image work never
+    runs on request threads. At most `max_pending` jobs are queued; extra uploads
+    fail fast with ScreenshotBusy instead of piling up.
+    """
+    def __init__(self, workers=None, max_pending=None, timeout=30.0, max_bytes=8 * 1024 * 1024, palette=None):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or self.workers * 4
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.palette = palette
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.stats = {"processed": 0, "rejected": 0, "failed": 0}
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def read(self, data):
+        if len(data) > self.max_bytes:
+            raise ValueError("Image too large")
+        if not self._slots.acquire(blocking=False):
+            self.stats["rejected"] += 1
+            raise ScreenshotBusy("Screenshot queue is full, try again shortly")
+        try:
+            future = self._get_pool().submit(read_results, data, self.palette)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is freed when the worker finishes, even if this request gave up waiting
+        future.add_done_callback(lambda f: self._slots.release())
+        try:
+            results = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self.stats["failed"] += 1
+            raise ValueError("Screenshot processing timed out")
+        except Exception as e:
+            self.stats["failed"] += 1
+            raise ValueError(f"Could not read screenshot: {e}")
+        self.stats["processed"] += 1
+        return results
+
+    def shutdown(self):
+        if self._pool: self._pool.shutdown(wait=False)
@@ -0,0 +1,86 @@
+import contextvars
+import copy
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+class SignalPrecomputer:
+    """
+    Speculative next-signal cache.
+    After each result the next signal is computed in the background and stored
+    under the state key it was computed for (model version + data revision).
+    get() returns it when the key still matches, otherwise computes synchronously.
+    Computations are single-flight per key: concurrent misses (and a precompute
+    already running) share one in-flight result instead of each running predict.
+    """
+    def __init__(self, compute, key_fn):
+        self._compute = compute
+        self._key_fn = key_fn
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="signal-precompute")
+        self._lock = threading.Lock()
+        self._entry = None
+        self._inflight = {} # key -> Future of the computation running for it
+        self._flight_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "precomputed": 0, "discarded": 0}
+
+    def schedule(self):
+        """Queues a background precompute for the current state (in the caller's context, e.g. its stream)."""
+        self._executor.submit(contextvars.copy_context().run, self._precompute)
+
+    def _precompute(self):
+        try:
+            key = self._key_fn()
+            entry = self._entry
+            if entry and entry[0] == key: return
+            _, leader, stored = self._compute_shared(key)
+            if leader:
+                self.stats["precomputed" if stored else "discarded"] += 1
+        except Exception as e:
+            print(f"Signal Precompute Error: {e}")
+
+    def _compute_shared(self, key):
+        """
+        Returns (signal, leader, stored). The first caller for `key` computes;
+        callers arriving while it runs wait for the same result.
+        """
+        with self._flight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result(), False, False
+        try:
+            signal = self._compute()
+            stored = self._store(key, signal)
+            future.set_result(signal)
+            return signal, True, stored
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._flight_lock:
+                self._inflight.pop(key, None)
+
+    def _store(self, key, signal):
+        # Only keep the result if nothing was written while it was being computed
+        with self._lock:
+            if self._key_fn() != key: return False
+            self._entry = (key, signal)
+            return True
+
+    def get(self):
+        """Returns a private copy of the signal for the current state."""
+        key = self._key_fn()
+        entry = self._entry
+        if entry and entry[0] == key:
+            self.stats["hits"] += 1
+            return copy.deepcopy(entry[1])
+        signal, leader, _ = self._compute_shared(key)
+        self.stats["misses" if leader else "coalesced"] += 1
+        return copy.deepcopy(signal)
+
+    def hit_ratio(self):
+        """Share of get() calls served without running their own computation."""
+        served = self.stats["hits"] + self.stats["coalesced"]
+        total = served + self.stats["misses"]
+        return round(served / total, 3) if total else 0.0
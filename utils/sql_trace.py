@@ -0,0 +1,187 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Normalized statement text: literals become ?, IN lists collapse, whitespace is squeezed."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?+)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+class QueryTracer:
+    """
+    Aggregates statement timings by fingerprint, keeps a log of recent slow
+    statements and counts statements per request (per thread between
+    begin_request and end_request). Time is execute plus fetch calls.
+    """
+    def __init__(self, slow_ms=50.0, slow_log_size=200):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.slow_log = deque(maxlen=slow_log_size)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.statements = {} # fingerprint -> [count, total_ms, max_ms]
+            self.requests = {}   # endpoint -> [requests, statements, total_ms]
+            self.slow_log.clear()
+
+    def record(self, sql, ms, new_statement):
+        fp = fingerprint(sql)
+        with self._lock:
+            entry = self.statements.get(fp)
+            if entry is None:
+                entry = self.statements[fp] = [0, 0.0, 0.0]
+            entry[0] += new_statement
+            entry[1] += ms
+            entry[2] = max(entry[2], ms)
+        current = getattr(self._local, "request", None)
+        if current is not None:
+            current[0] += new_statement
+            current[1] += ms
+
+    def slow(self, sql, ms):
+        fp = fingerprint(sql)
+        self.slow_log.append({"at": time.time(), "ms": round(ms, 2), "sql": fp})
+        print(f"Slow Query ({ms:.1f} ms): {fp}")
+
+    def begin_request(self):
+        self._local.request = [0, 0.0]
+
+    def attach(self, op):
+        """Wraps `op` so the statements it runs on another thread (the DB writer) count towards this thread's request."""
+        current = getattr(self._local, "request", None)
+        if current is None: return op
+        def traced(*args):
+            previous = getattr(self._local, "request", None)
+            self._local.request = current
+            try:
+                return op(*args)
+            finally:
+                self._local.request = previous
+        return traced
+
+    def end_request(self, endpoint):
+        """Returns (statements, ms) for this thread's request and adds them to the per-endpoint totals."""
+        current = getattr(self._local, "request", None)
+        self._local.request = None
+        if current is None: return 0, 0.0
+        with self._lock:
+            totals = self.requests.setdefault(endpoint or "unknown", [0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += current[0]
+            totals[2] += current[1]
+        return current[0], current[1]
+
+    def snapshot(self, top=25):
+        with self._lock:
+            ranked = sorted(self.statements.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+            return {
+                "statements": [{"sql": fp, "count": c, "total_ms": round(t, 2), "avg_ms": round(t / c, 3) if c else 0.0,
+                                "max_ms": round(m, 2)} for fp, (c, t, m) in ranked],
+                "requests": {ep: {"requests": r, "statements": s, "avg_statements": round(s / r, 1), "total_ms": round(t, 2)}
+                             for ep, (r, s, t) in self.requests.items()},
+                "slow": list(self.slow_log)
+            }
+
+tracer = QueryTracer()
+
+class TracedCursor(sqlite3.Cursor):
+    """sqlite3 cursor that reports execute/fetch time to `tracer` (row iteration is not timed)."""
+    _sql = None
+    _elapsed = 0.0
+    _logged = False
+
+    def _timed(self, start, sql=None):
+        ms = (time.perf_counter() - start) * 1000
+        if sql is not None:
+            self._sql, self._elapsed, self._logged = sql, 0.0, False
+        if self._sql is None: return
+        self._elapsed += ms
+        tracer.record(self._sql, ms, sql is not None)
+        if not self._logged and self._elapsed >= tracer.slow_ms:
+            self._logged = True
+            tracer.slow(self._sql, self._elapsed)
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._timed(start, sql)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._timed(start, sql)
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._timed(start, sql_script)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._timed(start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._timed(start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._timed(start)
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors (including conn.execute shortcuts) are TracedCursors."""
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+def plan_problems(conn, sql, params=()):
+    """
+    EXPLAIN QUERY PLAN check: full table scans and temp-b-tree sorts are problems;
+    an index-order SCAN is only accepted when a LIMIT bounds it.
+    """
+    details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    bounded = " LIMIT " in fingerprint(sql).upper()
+    problems = []
+    for detail in details:
+        if detail == "SCAN CONSTANT ROW": continue
+        if detail.startswith("SCAN ") and (" USING " not in detail or not bounded):
+            problems.append(detail)
+        elif detail.startswith("USE TEMP B-TREE"):
+            problems.append(detail)
+    return problems
@@ -0,0 +1,292 @@
+import functools
+import itertools
+import multiprocessing
+import os
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+def shard_for(stream_id, shards):
+    """Owning shard of a stream (crc32 is stable across processes, unlike hash())."""
+    return zlib.crc32(stream_id.encode()) % shards
+
+class StreamEngine:
+    """
+    Training and signal state of the streams owned by one process: a ModelACore,
+    MultiManagerSystem and signal cache per stream, each bound to the stream's
+    own database (see db_manager.stream_context). The app modules are imported
+    lazily so a spawned shard can set DATABASE_PATH first.
+    """
+    def __init__(self):
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def _state(self, stream_id):
+        # Called inside the stream's context
+        state = self._streams.get(stream_id)
+        if state is None:
+            with self._lock:
+                state = self._streams.get(stream_id)
+                if state is None:
+                    from models.model_a_core import ModelACore
+                    from utils.db_manager import init_db, get_history_store
+                    from utils.multi_manager import MultiManagerSystem
+                    from utils.signal_cache import SignalPrecomputer
+                    init_db()
+                    get_history_store()
+                    model = ModelACore()
+                    manager = MultiManagerSystem(model, model.db_path)
+                    cache = SignalPrecomputer(compute=lambda: manager.process_signal(model.predict()),
+                                              key_fn=lambda: (model.get_model_version(), manager.sync()))
+                    state = self._streams[stream_id] = (model, manager, cache)
+        return state
+
+    def _existing(self, stream_id):
+        # Reads never create a stream: None until its first write made the database
+        from utils.db_manager import stream_exists
+        if stream_id in self._streams or stream_exists(stream_id):
+            return self._state(stream_id)
+        return None
+
+    def signal(self, stream_id):
+        """The stream's next signal, or None if it has no data yet."""
+        from utils.db_manager import stream_context
+        with stream_context(stream_id):
+            state = self._existing(stream_id)
+            return state[2].get() if state else None
+
+    def submit(self, stream_id, trade_data, votes=None):
+        """Stores a result for the stream and trains its model in the same write; returns False if not saved."""
+        from utils.db_manager import stream_context, add_trade
+        with stream_context(stream_id):
+            model, manager, cache = self._state(stream_id)
+            actual = trade_data.get("actual_result")
+            revision = add_trade(trade_data, then=lambda conn: model.train_from_db(conn=conn, votes=votes, actual=actual))
+            if not revision:
+                return False
+            manager.record_result(trade_data, revision)
+            cache.schedule()
+            return True
+
+    def bulk(self, stream_id, trades):
+        """Stores initial results (oldest first) and trains once; returns the number saved."""
+        from utils.db_manager import stream_context, add_trades
+        with stream_context(stream_id):
+            model, manager, cache = self._state(stream_id)
+            saved = add_trades(trades, then=lambda conn: model.train_from_db(conn=conn))
+            for trade_data, ok in zip(trades, saved):
+                if ok: manager.record_result(trade_data)
+            cache.schedule()
+            return sum(1 for ok in saved if ok)
+
+    def undo(self, stream_id, trade_id):
+        """Deletes a trade and retrains; returns False if there was nothing to delete."""
+        from utils.db_manager import stream_context, delete_trade
+        with stream_context(stream_id):
+            state = self._existing(stream_id)
+            if not state: return False
+            model, manager, cache = state
+            deleted = delete_trade(trade_id, then=lambda conn: model.train_from_db(conn=conn))
+            if deleted: manager.forget_result(trade_id)
+            cache.schedule()
+            return bool(deleted)
+
+    def new_session(self, stream_id):
+        """Archives the stream's live trades (a stream without data has none)."""
+        from utils.db_manager import stream_context, archive_all_trades
+        with stream_context(stream_id):
+            state = self._existing(stream_id)
+            if not state: return
+            model, manager, cache = state
+            archive_all_trades(then=lambda conn: model.train_from_db(include_archived=True, conn=conn))
+            manager.reset_session()
+            cache.schedule()
+
+    def dashboard(self, stream_id, with_trades=True):
+        """The /api/dashboard-data figures for the stream, or None if it has no data yet."""
+        from utils.db_manager import stream_context, get_recent_trades, get_total_trades_count, get_trade_frame
+        with stream_context(stream_id):
+            state = self._existing(stream_id)
+            if not state: return None
+            manager = state[1]
+            completed, correct = get_trade_frame().accuracy(last=50)
+            vol_score, vol_status = manager.calculate_volatility()
+            data = {
+                "total_collected": get_total_trades_count(),
+                "accuracy": round(correct / completed * 100, 1) if completed else 0.0,
+                "volatility_score": vol_score,
+                "volatility_status": vol_status,
+                "loss_streak": manager.analyze_loss_streak(),
+                "learning_percent": 100
+            }
+            if with_trades: data["trades"] = get_recent_trades(10)
+            return data
+
+    def recent(self, stream_id, limit=10):
+        """The stream's newest live trades, or None if it has no data yet."""
+        from utils.db_manager import stream_context, get_recent_trades
+        with stream_context(stream_id):
+            return get_recent_trades(limit) if self._existing(stream_id) else None
+
+    def stats(self, stream_id=None):
+        return {"pid": os.getpid(), "streams": {s: {"model_version": model.model_version, "signal_cache": dict(cache.stats)}
+                                                for s, (model, _, cache) in list(self._streams.items())}}
+
+class StreamLanes:
+    """
+    Runs calls on a small thread pool, in order per key (stream): calls for one
+    stream wait on each other, calls for different streams run side by side, so
+    a slow retrain only holds up its own stream.
+    """
+    def __init__(self, threads=4):
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="stream-lane")
+        self._lanes = {} # key -> calls waiting behind the running one
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn):
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is not None:
+                lane.append(fn)
+                return
+            self._lanes[key] = deque([fn])
+        self._pool.submit(self._drain, key)
+
+    def _drain(self, key):
+        while True:
+            with self._lock:
+                lane = self._lanes[key]
+                if not lane:
+                    del self._lanes[key]
+                    return
+                fn = lane.popleft()
+            fn()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+def _reply(engine, replies, call_id, op, stream_id, args):
+    try:
+        replies.put((call_id, True, getattr(engine, op)(stream_id, *args)))
+    except Exception as e:
+        replies.put((call_id, False, f"{type(e).__name__}: {e}"))
+
+def _shard_main(index, inbox, replies, db_path, threads):
+    # Must happen before the app modules are imported (spawn starts a fresh interpreter)
+    if db_path: os.environ["DATABASE_PATH"] = db_path
+    engine = StreamEngine()
+    lanes = StreamLanes(threads)
+    while True:
+        call_id, op, stream_id, args = inbox.get()
+        if op is None: break
+        lanes.submit(stream_id, functools.partial(_reply, engine, replies, call_id, op, stream_id, args))
+    lanes.shutdown()
+
+class ShardPool:
+    """
+    Routes per-stream calls to the process that owns the stream.
+    With shards=0 one StreamEngine runs in this process. Otherwise `shards`
+    spawned worker processes each run a StreamEngine for the streams that hash
+    to them: every stream has exactly one owner, and streams on different
+    shards train and predict on different cores. Inside a shard, calls run on
+    `threads` threads in order per stream (StreamLanes): streams on the same
+    shard share one core, but a slow call only delays its own stream. Shards
+    start on first use and are restarted if they die (their pending calls fail).
+    The pool belongs to the process that created it, so ownership only holds
+    with a single web worker process (threads are fine): several workers would
+    each start shards for the same streams.
+    """
+    OPS = ("signal", "submit", "bulk", "undo", "new_session", "dashboard", "recent", "stats")
+
+    def __init__(self, shards=0, db_path=None, timeout=30.0, threads=4):
+        self.shards = shards
+        self.db_path = db_path
+        self.timeout = timeout
+        self.threads = threads
+        self._engine = StreamEngine() if shards == 0 else None
+        self._procs = [None] * shards
+        self._inboxes = [None] * shards
+        self._replies = None
+        self._pending = {} # call id -> (shard, Future)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "timeouts": 0, "restarts": 0}
+
+    def _start(self, index):
+        ctx = multiprocessing.get_context("spawn")
+        if self._replies is None:
+            self._replies = ctx.Queue()
+            threading.Thread(target=self._collect, name="shard-replies", daemon=True).start()
+        if self._procs[index] is not None:
+            self.stats["restarts"] += 1
+            for call_id, (shard, future) in list(self._pending.items()):
+                if shard == index:
+                    del self._pending[call_id]
+                    future.set_exception(RuntimeError(f"Stream shard {index} exited"))
+        inbox = ctx.Queue()
+        proc = ctx.Process(target=_shard_main, args=(index, inbox, self._replies, self.db_path, self.threads),
+                           name=f"stream-shard-{index}", daemon=True)
+        proc.start()
+        self._procs[index], self._inboxes[index] = proc, inbox
+
+    def _collect(self):
+        while True:
+            call_id, ok, value = self._replies.get()
+            with self._lock:
+                entry = self._pending.pop(call_id, None)
+            if entry is None: continue # timed out or its shard was restarted
+            if ok:
+                entry[1].set_result(value)
+            else:
+                entry[1].set_exception(RuntimeError(value))
+
+    def _send(self, index, op, stream_id, args):
+        future = Future()
+        with self._lock:
+            proc = self._procs[index]
+            if proc is None or not proc.is_alive():
+                self._start(index)
+            call_id = next(self._ids)
+            self._pending[call_id] = (index, future)
+            self._inboxes[index].put((call_id, op, stream_id, args))
+        return call_id, future
+
+    def _wait(self, call_id, future):
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            self.stats["timeouts"] += 1
+            with self._lock:
+                self._pending.pop(call_id, None)
+            raise
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+
+    def call(self, stream_id, op, *args):
+        """Runs `op` (one of OPS) for `stream_id` on its owning shard and returns the result."""
+        if op not in self.OPS:
+            raise ValueError(f"Unknown stream operation: {op}")
+        self.stats["calls"] += 1
+        if self._engine is not None:
+            try:
+                return getattr(self._engine, op)(stream_id, *args)
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+        return self._wait(*self._send(shard_for(stream_id, self.shards), op, stream_id, args))
+
+    def shard_stats(self):
+        """Per-shard process id and owned streams (only shards that have started)."""
+        if self._engine is not None:
+            return [self._engine.stats()]
+        calls = [(i, self._send(i, "stats", None, ())) for i, proc in enumerate(self._procs) if proc is not None]
+        return [dict(self._wait(*sent), shard=i) for i, sent in calls]
+
+    def close(self):
+        with self._lock:
+            for proc, inbox in zip(self._procs, self._inboxes):
+                if proc is not None and proc.is_alive():
+                    inbox.put((0, None, None, ()))
+            self._procs = [None] * self.shards
@@ -0,0 +1,222 @@
+import threading
+import numpy as np
+
+# Column codes: outcome / prediction
+NONE, SMALL, BIG = -1, 0, 1
+CODES = {"BIG": BIG, "SMALL": SMALL}
+NAT = np.iinfo(np.int64).min
+IST_OFFSET = 19800 # trades.timestamp is naive IST (UTC+05:30)
+
+class TradeFrame:
+    """
+    Columnar in-memory copy of the trades table: one NumPy array per column
+    (trades.id, outcome, prediction, source code, confidence, time, epoch), in
+    insertion order. Loaded in bulk, then kept current by following the
+    trade_changes log like HistoryStore. Stats are vectorized over a window
+    chosen with select(): the last N trades, the live epoch only, and/or since
+    a timestamp. Reads hold the frame lock, so a concurrent sync is never seen
+    half-applied; locked() keeps several reads on one state.
+    Times are naive IST seconds (the trades.timestamp strings, parsed as-is).
+    """
+    COLUMNS = (("pk", np.int64), ("outcome", np.int8), ("prediction", np.int8), ("source", np.int32),
+               ("confidence", np.float32), ("ts", np.int64), ("epoch", np.int32), ("alive", np.bool_))
+
+    def __init__(self, grow=4096):
+        self.grow = grow
+        self._lock = threading.RLock()
+        self.sources = []      # code -> signal_source
+        self._source_codes = {}
+        self.cursor = 0        # last trade_changes.seq applied
+        self.cursor_key = (0, "") # (trade_pk, trade_id) of that change
+        self.current_epoch = 0
+        self.loaded = False
+        self._allocate(0)
+
+    def _allocate(self, capacity):
+        self.size = 0
+        self.capacity = capacity
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def _ensure(self, extra):
+        needed = self.size + extra
+        if needed <= self.capacity: return
+        capacity = max(self.capacity * 2, needed, self.grow)
+        for name, dtype in self.COLUMNS:
+            column = np.zeros(capacity, dtype=dtype)
+            column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def _source_code(self, source):
+        code = self._source_codes.get(source)
+        if code is None:
+            code = self._source_codes[source] = len(self.sources)
+            self.sources.append(source)
+        return code
+
+    def _columns(self, rows):
+        """Converts (id, actual, prediction, source, confidence, timestamp, epoch) rows to arrays."""
+        return {
+            "pk": np.fromiter((r[0] for r in rows), np.int64, len(rows)),
+            "outcome": np.fromiter((CODES.get(r[1], NONE) for r in rows), np.int8, len(rows)),
+            "prediction": np.fromiter((CODES.get(r[2], NONE) for r in rows), np.int8, len(rows)),
+            "source": np.fromiter((self._source_code(r[3]) for r in rows), np.int32, len(rows)),
+            "confidence": np.fromiter((r[4] or 0.0 for r in rows), np.float32, len(rows)),
+            "ts": np.array([r[5] for r in rows], dtype="datetime64[s]").astype(np.int64),
+            "epoch": np.fromiter((r[6] or 0 for r in rows), np.int32, len(rows)),
+            "alive": np.ones(len(rows), dtype=np.bool_),
+        }
+
+    def _append(self, rows):
+        if not rows: return
+        columns = self._columns(rows)
+        self._ensure(len(rows))
+        start, stop = self.size, self.size + len(rows)
+        for name, values in columns.items():
+            getattr(self, name)[start:stop] = values
+        self.size = stop
+
+    def _update(self, index, row):
+        for name, values in self._columns([row]).items():
+            getattr(self, name)[index] = values[0]
+
+    SELECT = "SELECT id, actual_result, ai_prediction, signal_source, ai_confidence, timestamp, epoch FROM trades"
+    CHANGES = "SELECT seq, trade_pk, op, trade_id FROM trade_changes WHERE seq > ? ORDER BY seq"
+
+    def rebuild(self, conn, chunk=50000):
+        """Reloads every column from the trades table in chunks."""
+        with self._lock:
+            seq = conn.execute("SELECT seq, trade_pk, trade_id FROM trade_changes ORDER BY seq DESC LIMIT 1").fetchone()
+            count = conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+            self.sources, self._source_codes = [], {}
+            self._allocate(max(count, self.grow))
+            cursor = conn.execute(f"{self.SELECT} ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(chunk)
+                if not rows: break
+                self._append(rows)
+            self.cursor, self.cursor_key = (seq[0], (seq[1], seq[2])) if seq else (0, (0, ""))
+            self.current_epoch = conn.execute("SELECT COALESCE(MAX(id), 0) FROM epochs").fetchone()[0]
+            self.loaded = True
+
+    def sync(self, conn):
+        """Applies trade changes committed since the cursor. Returns the number applied (-1 = rebuilt)."""
+        with self._lock:
+            # Same rule as HistoryStore: a missing or different cursor entry means the
+            # log was pruned past us or the database was replaced
+            if self.cursor:
+                row = conn.execute("SELECT trade_pk, trade_id FROM trade_changes WHERE seq = ?", (self.cursor,)).fetchone()
+                stale = not row or tuple(row) != self.cursor_key
+            else:
+                stale = not self.loaded # loaded from an empty log
+            if stale:
+                self.rebuild(conn)
+                return -1
+            changes = conn.execute(self.CHANGES, (self.cursor,)).fetchall()
+            if not changes: return 0
+            pks = sorted({pk for _, pk, op, _ in changes if op == "upsert"})
+            current = {}
+            for i in range(0, len(pks), 500):
+                batch = pks[i:i + 500]
+                placeholders = ", ".join("?" * len(batch))
+                current.update((r[0], r) for r in conn.execute(f"{self.SELECT} WHERE id IN ({placeholders})", batch))
+            appended = {}
+            last_pk = int(self.pk[self.size - 1]) if self.size else 0
+            for _, pk, op, _ in changes:
+                if op == "epoch":
+                    self.current_epoch = conn.execute("SELECT COALESCE(MAX(id), 0) FROM epochs").fetchone()[0]
+                    continue
+                # Trades only ever get larger ids, so existing rows are found by binary search
+                index = int(np.searchsorted(self.pk[:self.size], pk)) if pk <= last_pk else self.size
+                exists = index < self.size and self.pk[index] == pk
+                if op == "delete":
+                    if exists: self.alive[index] = False
+                elif pk in current:
+                    if exists:
+                        self._update(index, current[pk])
+                    elif pk > last_pk:
+                        appended[pk] = current[pk]
+            self._append([appended[pk] for pk in sorted(appended)])
+            self.cursor, self.cursor_key = changes[-1][0], (changes[-1][1], changes[-1][3])
+            return len(changes)
+
+    def locked(self):
+        """The frame lock as a context manager: no sync lands while it is held."""
+        return self._lock
+
+    def select(self, last=None, live=True, since=None, source=None):
+        """
+        Indices of the window: trades of the live epoch (live=True), at or after
+        `since` (an IST 'YYYY-MM-DD HH:MM:SS' string), whose source contains
+        `source`, then the last `last` of those.
+        """
+        with self._lock:
+            mask = self.alive[:self.size].copy()
+            if live: mask &= self.epoch[:self.size] == self.current_epoch
+            if since is not None: mask &= self.ts[:self.size] >= np.datetime64(since, "s").astype(np.int64)
+            if source is not None:
+                codes = [code for code, name in enumerate(self.sources) if name and source in name]
+                mask &= np.isin(self.source[:self.size], codes)
+            index = np.flatnonzero(mask)
+            return index[-last:] if last else index
+
+    def _completed(self, index, predicted):
+        index = index[self.outcome[index] != NONE]
+        if predicted: index = index[self.prediction[index] != NONE]
+        return index
+
+    def accuracy(self, predicted=False, **window):
+        """
+        Returns (completed, correct) over trades with a result in the window.
+        predicted=True counts only real BIG/SMALL predictions (bulk/INITIAL skipped).
+        """
+        with self._lock:
+            index = self._completed(self.select(**window), predicted)
+            return int(len(index)), int((self.outcome[index] == self.prediction[index]).sum())
+
+    def streak_distribution(self, **window):
+        """{run length: count} of same-result runs in the window (dragons are the long tail)."""
+        with self._lock:
+            outcomes = self.outcome[self._completed(self.select(**window), False)]
+            if not len(outcomes): return {}
+            bounds = np.concatenate(([0], np.flatnonzero(np.diff(outcomes)) + 1, [len(outcomes)]))
+            lengths, counts = np.unique(np.diff(bounds), return_counts=True)
+            return dict(zip(lengths.tolist(), counts.tolist()))
+
+    def source_accuracy(self, **window):
+        """{signal_source: (total, correct)} over real predictions in the window."""
+        with self._lock:
+            index = self._completed(self.select(**window), True)
+            codes = self.source[index]
+            totals = np.bincount(codes, minlength=len(self.sources))
+            correct = np.bincount(codes, weights=self.outcome[index] == self.prediction[index], minlength=len(self.sources))
+            return {self.sources[c]: (int(totals[c]), int(correct[c])) for c in np.flatnonzero(totals)}
+
+    def calibration(self, width=10, **window):
+        """
+        Confidence calibration over real predictions in the window: one entry per
+        `width`-point confidence band with total, correct, mean confidence and accuracy.
+        """
+        with self._lock:
+            index = self._completed(self.select(**window), True)
+            confidence = self.confidence[index]
+            band = np.clip(confidence // width, 0, 100 // width).astype(np.int64)
+            hits = self.outcome[index] == self.prediction[index]
+            totals = np.bincount(band)
+            correct = np.bincount(band, weights=hits, minlength=len(totals))
+            conf_sum = np.bincount(band, weights=confidence, minlength=len(totals))
+            return [{
+                "band": f"{b * width:02d}-{b * width + width - 1:02d}",
+                "total": int(totals[b]),
+                "correct": int(correct[b]),
+                "mean_confidence": round(float(conf_sum[b] / totals[b]), 1),
+                "accuracy": round(float(correct[b] * 100.0 / totals[b]), 1)
+            } for b in np.flatnonzero(totals)]
+
+    def timeline(self, predicted=False, **window):
+        """(UTC epoch seconds, correct) arrays for completed trades in the window."""
+        with self._lock:
+            index = self._completed(self.select(**window), predicted)
+            index = index[self.ts[index] != NAT]
+            return self.ts[index] - IST_OFFSET, self.outcome[index] == self.prediction[index]